@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Pipeline Latency Report
+
+Scans the review-metadata table for traced reviews and prints hop-level
+latency percentiles (stage processing time and S3 notification delays)
+across a run.
+
+Usage:
+    python scripts/analyze_latency.py [--table review-metadata]
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+import boto3
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.tracing import STAGES, percentile
+
+# LocalStack configuration
+ENDPOINT_URL = "http://localhost:4566"
+REGION = "us-east-1"
+AWS_ACCESS_KEY_ID = "test"
+AWS_SECRET_ACCESS_KEY = "test"
+
+REVIEW_TABLE = "review-metadata"
+PERCENTILES = (50, 90, 95, 99)
+
+
+def hop_order():
+    """Hops in pipeline order, matching utils.tracing.latency_breakdown."""
+    hops = [f"upload->{STAGES[0]}"]
+    for i, stage in enumerate(STAGES):
+        if i > 0:
+            hops.append(f"{STAGES[i - 1]}->{stage}")
+        hops.append(stage)
+    return hops
+
+
+def collect_latencies(ddb, table):
+    """Return (totals, hops) latency lists for every traced review in *table*."""
+    totals = []
+    hops = defaultdict(list)
+
+    paginator = ddb.get_paginator("scan")
+    for page in paginator.paginate(
+        TableName=table,
+        ProjectionExpression="traceId, totalLatencyMs, hopLatencyMs",
+        FilterExpression="attribute_exists(traceId)"
+    ):
+        for item in page.get("Items", []):
+            if "totalLatencyMs" in item:
+                totals.append(int(item["totalLatencyMs"]["N"]))
+            for hop, value in item.get("hopLatencyMs", {}).get("M", {}).items():
+                hops[hop].append(int(value["N"]))
+    return totals, hops
+
+
+def print_report(totals, hops):
+    """Print percentile table for the collected latencies."""
+    print("=" * 78)
+    print("PIPELINE LATENCY REPORT (milliseconds)")
+    print("=" * 78)
+    header = f"{'hop':<42}{'n':>7}" + "".join(f"{'p' + str(p):>7}" for p in PERCENTILES) + f"{'max':>8}"
+    print(header)
+
+    rows = [(hop, hops[hop]) for hop in hop_order() if hop in hops]
+    rows.append(("TOTAL (upload -> sentiment_analysis)", totals))
+
+    for name, values in rows:
+        values = sorted(values)
+        if not values:
+            continue
+        line = f"{name:<42}{len(values):>7}"
+        line += "".join(f"{percentile(values, p):>7}" for p in PERCENTILES)
+        line += f"{values[-1]:>8}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hop-level latency percentiles of the review pipeline")
+    parser.add_argument("--table", default=REVIEW_TABLE, help="review metadata table name")
+    args = parser.parse_args()
+
+    ddb = boto3.client(
+        "dynamodb",
+        endpoint_url=ENDPOINT_URL,
+        region_name=REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    )
+
+    totals, hops = collect_latencies(ddb, args.table)
+    if not totals and not hops:
+        print(f"No traced reviews found in {args.table}.")
+        return
+
+    print_report(totals, hops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+API Cost Report
+
+Aggregates the per-invocation "[API_ACCOUNTING]" log lines written by the
+Lambda handlers (deployed with API_ACCOUNTING=1) and prints a per-review
+model of S3 requests, DynamoDB capacity units and their cost.
+
+Usage:
+    python scripts/api_cost_report.py                 # read LocalStack CloudWatch logs
+    python scripts/api_cost_report.py --file run.log  # read saved log output
+"""
+import argparse
+import json
+import os
+import sys
+
+import boto3
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.api_accounting import LOG_PREFIX, merge_snapshots, cost_model, print_cost_model
+
+# LocalStack configuration
+ENDPOINT_URL = "http://localhost:4566"
+REGION = "us-east-1"
+AWS_ACCESS_KEY_ID = "test"
+AWS_SECRET_ACCESS_KEY = "test"
+
+FUNCTIONS = ["preprocessing", "profanity_check", "sentiment_analysis"]
+
+
+def parse_lines(lines):
+    """Yield accounting snapshots found in log *lines*."""
+    for line in lines:
+        idx = line.find(LOG_PREFIX)
+        if idx == -1:
+            continue
+        try:
+            yield json.loads(line[idx + len(LOG_PREFIX):])
+        except ValueError:
+            continue
+
+
+def read_cloudwatch_lines():
+    """Yield accounting log messages of all pipeline functions."""
+    logs = boto3.client(
+        "logs",
+        endpoint_url=ENDPOINT_URL,
+        region_name=REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    )
+    paginator = logs.get_paginator("filter_log_events")
+    for name in FUNCTIONS:
+        try:
+            for page in paginator.paginate(logGroupName=f"/aws/lambda/{name}",
+                                           filterPattern=f'"{LOG_PREFIX}"'):
+                for event in page.get("events", []):
+                    yield event["message"]
+        except logs.exceptions.ResourceNotFoundException:
+            print(f"⚠ No log group for {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-review API cost model of the review pipeline")
+    parser.add_argument("--file", action="append", help="log file to read (repeatable, '-' for stdin)")
+    args = parser.parse_args()
+
+    if args.file:
+        lines = []
+        for path in args.file:
+            if path == "-":
+                lines.extend(sys.stdin)
+            else:
+                with open(path, encoding="utf-8") as f:
+                    lines.extend(f)
+    else:
+        lines = read_cloudwatch_lines()
+
+    stages = merge_snapshots(parse_lines(lines))
+    if not stages:
+        print("No API accounting records found. Deploy with API_ACCOUNTING=1 and run the pipeline.")
+        return
+
+    print_cost_model(cost_model(stages))
+
+
+if __name__ == "__main__":
+    main()
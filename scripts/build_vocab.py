@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Build a Token Vocabulary
+
+Writes src/utils/vocab/<version>.txt: the lemmas preprocessing emits,
+most frequent first, for TOKEN_ENCODING=vocab. Frequencies come from a
+JSONL review dataset when --input is given. The sentiment and profanity
+lexicons and a list of common review words are always included. An
+existing version is never overwritten, because objects already encoded
+with it decode against it.
+
+Usage:
+    python scripts/build_vocab.py --version v2 --input data/reviews_devset.json --size 8000
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.text_preprocessing import preprocess
+from utils.sentiment import POSITIVE_WORDS, NEGATIVE_WORDS
+from utils.profanity import BAD_WORDS
+from utils.vocab import VOCAB_DIR
+
+# Frequent words in product reviews, roughly by frequency (used without --input)
+COMMON_WORDS = """
+product great good work use love well time buy quality price one would like get
+easy recommend really fit nice little much also bought look make need size well
+item order arrived came perfect first set small fine light color year day week
+month battery box package packaging shipping delivery fast seller amazon money value
+cheap expensive worth sturdy durable broke broken return refund replacement disappointed
+happy pleased excellent better best worse bad poor terrible awful horrible cheaply
+design material plastic metal fabric comfortable size large big long short heavy
+screen sound phone case cable charger charge power light bright kid child gift
+daughter son wife husband family home kitchen car office book read story author
+character series movie film music song album game play toy game card fun hour
+minute problem issue defective stopped working instruction install setup easily
+described picture expected feature function button tool review star recommended
+purchase purchased ordered received arrive love loved hate hated waste clean
+water size smell taste flavor coffee food bottle bag cover strap handle lid
+""".split()
+
+
+def read_lemmas(path):
+    counts = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            review = json.loads(line)
+            for field in ("summary", "reviewText"):
+                counts.update(preprocess(review.get(field, "")))
+    return counts
+
+
+def build_vocab(counts, size, seeds):
+    """The *size* most frequent lemmas of *counts*, then any *seeds* not among them."""
+    words = [word for word, _ in counts.most_common(size)]
+    chosen = set(words)
+    for seed in seeds:
+        for lemma in preprocess(seed):
+            if lemma not in chosen:
+                chosen.add(lemma)
+                words.append(lemma)
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a versioned lemma vocabulary for TOKEN_ENCODING=vocab")
+    parser.add_argument("--version", required=True, help="vocabulary version, e.g. v2")
+    parser.add_argument("--input", help="JSONL review dataset to count lemmas in")
+    parser.add_argument("--size", type=int, default=8000, help="most frequent lemmas to keep from --input")
+    args = parser.parse_args()
+
+    path = os.path.join(VOCAB_DIR, f"{args.version}.txt")
+    if os.path.exists(path):
+        sys.exit(f"❌ {path} exists; vocabulary versions are immutable, choose a new --version")
+
+    counts = read_lemmas(args.input) if args.input else Counter()
+    seeds = COMMON_WORDS + sorted(POSITIVE_WORDS) + sorted(NEGATIVE_WORDS) + sorted(BAD_WORDS)
+    words = build_vocab(counts, args.size, seeds)
+
+    os.makedirs(VOCAB_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(words) + "\n")
+    print(f"✅ Wrote {len(words):,} lemmas to {path}")
+
+
+if __name__ == "__main__":
+    main()
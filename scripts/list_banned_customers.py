@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+List Banned Customers
+
+Pages through the sparse banned-customer index of the customer-stats
+table in LocalStack. Only banned customers are in the index, so this reads
+one index entry per ban instead of scanning every customer.
+
+Usage:
+    python scripts/list_banned_customers.py [--page-size 100] [--count]
+"""
+import argparse
+import os
+import sys
+
+import boto3
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.customer_stats import banned_customer_pages
+
+# LocalStack configuration
+ENDPOINT_URL = "http://localhost:4566"
+REGION = "us-east-1"
+AWS_ACCESS_KEY_ID = "test"
+AWS_SECRET_ACCESS_KEY = "test"
+
+STATS_TABLE = "customer-stats"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List banned customers from the sparse customer-stats index")
+    parser.add_argument("--table", default=STATS_TABLE, help="customer stats table")
+    parser.add_argument("--page-size", type=int, default=100, help="index entries per Query page")
+    parser.add_argument("--count", action="store_true", help="only print the number of banned customers")
+    args = parser.parse_args()
+
+    ddb = boto3.client(
+        "dynamodb",
+        endpoint_url=ENDPOINT_URL,
+        region_name=REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    )
+
+    total = 0
+    for page in banned_customer_pages(ddb, args.table, args.page_size):
+        total += len(page)
+        if not args.count:
+            for customer_id in page:
+                print(customer_id)
+    print(f"🚫 Banned customers: {total}", file=sys.stderr if not args.count else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
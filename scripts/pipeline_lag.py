@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Pipeline Reconciliation and Lag Monitor
+
+Lists the four pipeline buckets in parallel and merge-joins the sorted
+key listings to find objects that reached one stage but not the next.
+Prints the backlog and the age of the oldest stuck object per stage,
+and cross-checks review-metadata for rows missing isUnpolite or
+sentiment. Memory stays bounded however many keys there are.
+
+Usage:
+    python scripts/pipeline_lag.py [--page-size 1000] [--segments 4] [--sample 5]
+"""
+import argparse
+import os
+import sys
+
+import boto3
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.reconcile import reconcile_buckets, metadata_gaps
+
+# LocalStack configuration
+ENDPOINT_URL = "http://localhost:4566"
+REGION = "us-east-1"
+AWS_ACCESS_KEY_ID = "test"
+AWS_SECRET_ACCESS_KEY = "test"
+
+REVIEW_TABLE = "review-metadata"
+
+
+def format_age(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def print_report(report, gaps):
+    """Print per-stage backlog and the metadata cross-check."""
+    print("=" * 78)
+    print("PIPELINE RECONCILIATION")
+    print("=" * 78)
+    for bucket, count in report["objects"].items():
+        print(f"   {bucket:<24}{count:>12,} objects")
+
+    print(f"\n{'stage':<22}{'backlog':>10}{'oldest':>10}   oldest key")
+    for entry in report["stages"]:
+        print(f"{entry['stage']:<22}{entry['backlog']:>10,}{format_age(entry['oldest_age_seconds']):>10}"
+              f"   {entry['oldest_key'] or ''}")
+        for key in entry["sample"]:
+            print(f"{'':<45}· {key}")
+
+    print(f"\n🗄️  {REVIEW_TABLE}: {gaps['rows']:,} rows")
+    print(f"   missing isUnpolite: {gaps['missing_isUnpolite']:,}")
+    print(f"   missing sentiment:  {gaps['missing_sentiment']:,} (includes banned customers' reviews under SKIP_BANNED)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage backlog and lag of the review pipeline")
+    parser.add_argument("--page-size", type=int, default=1000, help="keys per listing page")
+    parser.add_argument("--segments", type=int, default=4, help="parallel scan segments for review-metadata")
+    parser.add_argument("--sample", type=int, default=5, help="stuck keys to show per stage")
+    args = parser.parse_args()
+
+    def client(service):
+        return boto3.client(
+            service,
+            endpoint_url=ENDPOINT_URL,
+            region_name=REGION,
+            aws_access_key_id=AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+        )
+
+    report = reconcile_buckets(client("s3"), page_size=args.page_size, sample=args.sample)
+    gaps = metadata_gaps(client("dynamodb"), REVIEW_TABLE, args.segments)
+    print_report(report, gaps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Polarity Distribution Report
+
+Reads the polarity quantile sketch and histogram saved by run_analysis.py
+and prints percentiles plus the sentiment counts under other
+classification thresholds, without rescoring any review.
+
+Usage:
+    python scripts/polarity_report.py [--results data/analysis_results.json]
+                                      [--thresholds 0.05 0.1 0.2]
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.quantiles import KLLSketch, PolarityHistogram
+from utils.sentiment import POSITIVE_THRESHOLD
+
+PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polarity percentiles and re-bucketed sentiment counts")
+    parser.add_argument("--results", default="data/analysis_results.json", help="analysis results file")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.05, POSITIVE_THRESHOLD, 0.2, 0.3],
+                        help="symmetric thresholds t: positive > t, negative < -t")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.results):
+        print(f"❌ {args.results} not found. Run 'python run_analysis.py' first.")
+        sys.exit(1)
+    with open(args.results, encoding="utf-8") as f:
+        results = json.load(f)
+    if "polarity" not in results:
+        print(f"❌ {args.results} has no polarity distribution; re-run the analysis.")
+        sys.exit(1)
+
+    sketch = KLLSketch.from_dict(results["polarity"]["sketch"])
+    histogram = PolarityHistogram.from_dict(results["polarity"]["histogram"])
+
+    print("=" * 60)
+    print(f"📐 POLARITY DISTRIBUTION ({histogram.total:,} reviews)")
+    print("=" * 60)
+    if histogram.total == 0 or sketch.n == 0:
+        print("   No polarities recorded; nothing to report.")
+        return
+    for p, value in zip(PERCENTILES, sketch.quantiles([p / 100 for p in PERCENTILES])):
+        print(f"   p{p:<3} {value:+.3f}")
+
+    print(f"\n🎭 SENTIMENT COUNTS BY THRESHOLD:")
+    print(f"   {'threshold':>10} {'positive':>10} {'neutral':>10} {'negative':>10}")
+    for threshold in args.thresholds:
+        try:
+            counts = histogram.classify_counts(threshold, -threshold)
+        except ValueError as e:
+            print(f"   {threshold:>10} skipped: {e}")
+            continue
+        marker = "  (current)" if threshold == POSITIVE_THRESHOLD else ""
+        print(f"   {threshold:>10} {counts['positive']:>10,} {counts['neutral']:>10,} {counts['negative']:>10,}{marker}")
+
+
+if __name__ == "__main__":
+    main()
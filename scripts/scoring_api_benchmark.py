@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Scoring API Latency Benchmark
+
+Sends POST requests with --batch reviews each to the synchronous scoring
+API and prints p50/p90/p99 request latency and throughput. Without --url
+the handler is served by a local stand-in: an HTTP server in this process
+that turns each request into a function-URL event. This measures the
+handler and HTTP overhead without Lambda or LocalStack.
+
+Usage:
+    python scripts/scoring_api_benchmark.py --requests 2000 --batch 1 --concurrency 4
+    python scripts/scoring_api_benchmark.py --url http://<url-id>.lambda-url.us-east-1.localhost.localstack.cloud:4566/
+"""
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add src and src/tests to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'tests'))
+
+from utils.tracing import percentile
+from local_pipeline import synthetic_reviews, file_reviews
+
+HANDLER_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'lambdas', 'scoring_api', 'handler.py')
+PERCENTILES = (50, 90, 99)
+
+
+def load_scoring_handler():
+    spec = importlib.util.spec_from_file_location("scoring_api_handler", HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def function_url_event(method, path, body):
+    """A Lambda function URL (payload format 2.0) event for one HTTP request."""
+    return {
+        "version": "2.0",
+        "rawPath": path,
+        "headers": {"content-type": "application/json"},
+        "requestContext": {"http": {"method": method, "path": path}},
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+
+def serve_locally(module):
+    """Start an HTTP stand-in for the function URL on a free local port. Returns ``(server, url)``."""
+    class Handler(BaseHTTPRequestHandler):
+        def _dispatch(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8") if length else None
+            result = module.handler(function_url_event(self.command, self.path, body), None)
+            payload = result["body"].encode("utf-8")
+            self.send_response(result["statusCode"])
+            for name, value in result.get("headers", {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def post(url, body):
+    """POST *body* (bytes) and return ``(status, seconds)``."""
+    request = urllib.request.Request(url, data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def run_benchmark(url, reviews, requests, batch, concurrency):
+    """Send *requests* POSTs of *batch* reviews; returns latencies (ms, sorted), failures and seconds."""
+    cycle = itertools.cycle(reviews)
+    bodies = [json.dumps({"reviews": [next(cycle) for _ in range(batch)]}).encode("utf-8")
+              for _ in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda body: post(url, body), bodies))
+    seconds = time.perf_counter() - start
+    latencies = sorted(elapsed * 1000 for status, elapsed in results if status == 200)
+    return latencies, sum(1 for status, _ in results if status != 200), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p99 latency of the synchronous scoring API")
+    parser.add_argument("--url", help="function URL to benchmark (default: local stand-in)")
+    parser.add_argument("--requests", type=int, default=1000, help="requests to send")
+    parser.add_argument("--batch", type=int, default=1, help="reviews per request")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight")
+    parser.add_argument("--input", help="JSONL reviews to send instead of synthetic ones")
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent before measuring")
+    args = parser.parse_args()
+
+    reviews = file_reviews(args.input, 10000) if args.input else synthetic_reviews(1000)
+    server = None
+    url = args.url
+    if not url:
+        server, url = serve_locally(load_scoring_handler())
+
+    try:
+        run_benchmark(url, reviews, args.warmup, args.batch, 1)
+        latencies, failures, seconds = run_benchmark(url, reviews, args.requests, args.batch, args.concurrency)
+    finally:
+        if server:
+            server.shutdown()
+
+    target = args.url or "local stand-in"
+    print("=" * 60)
+    print(f"SCORING API LATENCY ({target})")
+    print("=" * 60)
+    print(f"   Requests: {args.requests:,} × {args.batch} reviews, concurrency {args.concurrency} "
+          f"({failures} failed)")
+    for pct in PERCENTILES:
+        value = percentile(latencies, pct)
+        print(f"   p{pct}: {value:.2f} ms" if value is not None else f"   p{pct}: -")
+    if latencies:
+        print(f"   max: {latencies[-1]:.2f} ms")
+    print(f"   Throughput: {args.requests / seconds:,.0f} requests/s, "
+          f"{args.requests * args.batch / seconds:,.0f} reviews/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,63 +2,133 @@
 """
 Show Review Analysis Results
 
-This script displays the key findings from the review analysis.
+This script displays the key findings from the review analysis, either from
+the local analysis results file or from what the Lambda pipeline wrote to
+DynamoDB.
+
+Usage:
+    python show_results.py                                   # data/analysis_results.json
+    python show_results.py --source dynamodb [--segments 8]  # LocalStack tables
+    python show_results.py --source aggregates               # live counters, no scans
 """
 
+import argparse
 import json
 import os
+import sys
 
-def show_results():
-    """Display the analysis results."""
-    results_file = "data/analysis_results.json"
-    
-    if not os.path.exists(results_file):
-        print("❌ Analysis results not found. Run 'python run_analysis.py' first.")
-        return
-    
-    with open(results_file, 'r') as f:
-        data = json.load(f)
-    
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+# LocalStack configuration
+ENDPOINT_URL = "http://localhost:4566"
+REGION = "us-east-1"
+AWS_ACCESS_KEY_ID = "test"
+AWS_SECRET_ACCESS_KEY = "test"
+
+REVIEW_TABLE = "review-metadata"
+STATS_TABLE = "customer-stats"
+AGGREGATES_TABLE = "review-aggregates"
+
+def print_summary(data):
+    """Print the summary of an analysis results dict."""
     summary = data['summary']
     banned_customers = data['banned_customers']
-    
+
     print("=" * 60)
     print("📊 REVIEW ANALYSIS SUMMARY")
     print("=" * 60)
-    
+
     # Sentiment breakdown
     print(f"\n🎭 SENTIMENT DISTRIBUTION:")
     total = summary['total_reviews']
     positive = summary['sentiment_counts']['positive']
     neutral = summary['sentiment_counts']['neutral']
     negative = summary['sentiment_counts']['negative']
-    
+    if not total:
+        print("   No reviews found.")
+        return
+
     print(f"   📈 Positive: {positive:,} ({(positive/total*100):.1f}%)")
     print(f"   ➖ Neutral:  {neutral:,} ({(neutral/total*100):.1f}%)")
     print(f"   📉 Negative: {negative:,} ({(negative/total*100):.1f}%)")
-    
+    if summary.get('unscored_reviews'):
+        print(f"   ⏳ Not scored: {summary['unscored_reviews']:,}")
+
     # Profanity analysis
     profane = summary['profane_reviews']
     print(f"\n🚫 PROFANITY ANALYSIS:")
     print(f"   Profane Reviews: {profane:,} ({(profane/total*100):.1f}%)")
-    
+
     # Customer analysis
     print(f"\n👥 CUSTOMER ANALYSIS:")
     print(f"   Banned Customers: {len(banned_customers)}")
-    
+
     if banned_customers:
         print(f"\n🚨 BANNED CUSTOMER LIST:")
         for i, customer_id in enumerate(banned_customers, 1):
             print(f"   {i}. {customer_id}")
-    
+
     # Key insights
     print(f"\n💡 KEY INSIGHTS:")
     print(f"   • {(positive/total*100):.1f}% of reviews are positive")
     print(f"   • {(profane/total*100):.1f}% of reviews contain profanity")
     print(f"   • {len(banned_customers)} customers have been banned")
-    
+
     if len(banned_customers) > 0:
         print(f"   • Ban rate: {(len(banned_customers)/total*100):.3f}% of customers")
 
+def load_file_results(results_file):
+    """Analysis results written by run_analysis.py, or None if missing."""
+    if not os.path.exists(results_file):
+        print("❌ Analysis results not found. Run 'python run_analysis.py' first.")
+        return None
+
+    with open(results_file, 'r') as f:
+        return json.load(f)
+
+def dynamodb_client():
+    import boto3
+
+    return boto3.client(
+        "dynamodb",
+        endpoint_url=ENDPOINT_URL,
+        region_name=REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    )
+
+def load_dynamodb_results(segments):
+    """Summary of the pipeline's review-metadata and customer-stats tables."""
+    from utils.ddb_report import pipeline_results
+
+    return pipeline_results(dynamodb_client(), REVIEW_TABLE, STATS_TABLE, segments)
+
+def load_aggregate_results():
+    """Summary from the pipeline's sharded aggregate counters."""
+    from utils.ddb_report import aggregate_results
+
+    return aggregate_results(dynamodb_client(), AGGREGATES_TABLE, STATS_TABLE)
+
+def show_results(argv=None):
+    """Display the analysis results."""
+    parser = argparse.ArgumentParser(description="Show review analysis results")
+    parser.add_argument("--source", choices=["file", "dynamodb", "aggregates"], default="file",
+                        help="local results file, a scan of the pipeline's DynamoDB tables, "
+                             "or its aggregate counters")
+    parser.add_argument("--results", default="data/analysis_results.json", help="results file (--source file)")
+    parser.add_argument("--segments", type=int, default=4,
+                        help="parallel scan segments per table (--source dynamodb)")
+    args = parser.parse_args(argv)
+
+    if args.source == "dynamodb":
+        data = load_dynamodb_results(args.segments)
+    elif args.source == "aggregates":
+        data = load_aggregate_results()
+    else:
+        data = load_file_results(args.results)
+    if data is not None:
+        print_summary(data)
+
 if __name__ == "__main__":
-    show_results() 
\ No newline at end of file
+    show_results()
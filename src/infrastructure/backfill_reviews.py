@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Backfill / Replay Reviews
+
+Re-runs a pipeline function over objects already in a bucket (by default
+every review in reviews-processed), without re-uploading anything or
+waiting for S3 notifications. Use it after changing BAD_WORDS or the
+sentiment lexicons.
+
+The bucket's key space is split into ranges at --boundaries; the ranges
+are listed in parallel, each by its own paginator. Keys are sent to the
+function in batches of --batch-size records per event, either by calling
+the handler in this process or by asynchronous Lambda Invoke. At most
+--concurrency ranges are in flight at once. After each batch, the last
+key of its range is saved to --checkpoint, and a re-run resumes after it.
+
+Usage:
+    python src/infrastructure/backfill_reviews.py --function sentiment_analysis --rescore
+    python src/infrastructure/backfill_reviews.py --function profanity_check --mode invoke
+    python src/infrastructure/backfill_reviews.py --dry-run
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+# LocalStack endpoints
+ENDPOINT_URL = "http://localhost:4566"
+REGION = "us-east-1"  # Default region for LocalStack
+
+# Dummy credentials for LocalStack
+AWS_ACCESS_KEY_ID = "test"
+AWS_SECRET_ACCESS_KEY = "test"
+
+S3_PROCESSED_BUCKET = "reviews-processed"
+FUNCTIONS = ["preprocessing", "profanity_check", "sentiment_analysis"]
+# Pipeline buckets in stage order: FUNCTIONS[i] reads PIPELINE_BUCKETS[i],
+# and every key in a bucket is also in the ones before it
+PIPELINE_BUCKETS = ["reviews-input", "reviews-preprocessed", "reviews-checked", S3_PROCESSED_BUCKET]
+LAMBDAS_DIR = os.path.join(os.path.dirname(__file__), "..", "lambdas")
+
+# Pipeline keys are review_<uuid4>.json, so hex digits split them evenly
+DEFAULT_PREFIX = "review_"
+DEFAULT_BOUNDARIES = "123456789abcdef"
+
+
+def key_ranges(prefix, boundaries):
+    """
+    Split the keys under *prefix* into ``(after, upto)`` ranges at
+    ``prefix + c`` for each character of *boundaries*: a range holds the
+    keys with ``after < key <= upto`` (None meaning unbounded), so the
+    ranges cover every key exactly once.
+    """
+    edges = [prefix + c for c in sorted(set(boundaries))]
+    lows = [None] + edges
+    highs = edges + [None]
+    return list(zip(lows, highs))
+
+
+def list_range(s3, bucket, prefix, after, upto, page_size=1000):
+    """Yield the keys of *bucket* under *prefix* with ``after < key <= upto``, in order."""
+    kwargs = {"Bucket": bucket, "Prefix": prefix, "MaxKeys": page_size}
+    if after is not None:
+        kwargs["StartAfter"] = after
+    while True:
+        page = s3.list_objects_v2(**kwargs)
+        for obj in page.get("Contents", []):
+            if upto is not None and obj["Key"] > upto:
+                return
+            yield obj["Key"]
+        if not page.get("IsTruncated"):
+            return
+        kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+
+def batched(keys, size):
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def source_bucket(function_name, bucket):
+    """
+    The bucket *function_name* reads its objects from. Keys listed from
+    *bucket* are only found there if *bucket* is that bucket or a later
+    stage's; any other *bucket* raises ValueError.
+    """
+    stage = FUNCTIONS.index(function_name)
+    if bucket not in PIPELINE_BUCKETS[stage:]:
+        raise ValueError(f"{function_name} reads {PIPELINE_BUCKETS[stage]}, which need not hold the keys of "
+                         f"{bucket}; use --bucket {' or '.join(PIPELINE_BUCKETS[stage:])}")
+    return PIPELINE_BUCKETS[stage]
+
+
+def backfill_event(bucket, keys, rescore=False):
+    """S3-notification-shaped event for *keys*, marked as a backfill."""
+    return {
+        "Records": [{"eventSource": "aws:s3", "eventName": "Backfill",
+                     "s3": {"bucket": {"name": bucket}, "object": {"key": key}}} for key in keys],
+        "backfill": {"rescore": rescore},
+    }
+
+
+class BackfillCheckpoint:
+    """Last dispatched key per range, saved as JSON after every batch."""
+
+    def __init__(self, path, bucket, function_name):
+        self.path = path
+        self.identity = {"bucket": bucket, "function": function_name}
+        self.positions = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if {k: data.get(k) for k in self.identity} != self.identity:
+                raise ValueError(f"checkpoint {path} belongs to a different bucket or function")
+            self.positions = data["positions"]
+
+    @staticmethod
+    def range_id(after):
+        return after or ""
+
+    def start_after(self, after):
+        """Where listing of the range starting after *after* resumes."""
+        return self.positions.get(self.range_id(after), after)
+
+    def advance(self, after, last_key):
+        with self._lock:
+            self.positions[self.range_id(after)] = last_key
+            if self.path:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({**self.identity, "positions": self.positions}, f)
+                os.replace(tmp, self.path)
+
+
+def run_backfill(s3, bucket, dispatch, prefix=DEFAULT_PREFIX, boundaries=DEFAULT_BOUNDARIES,
+                 batch_size=10, concurrency=4, checkpoint=None, dry_run=False, page_size=1000):
+    """
+    List *bucket* range by range and call ``dispatch(keys)`` for each batch.
+
+    With *dry_run* nothing is dispatched and the checkpoint is left alone;
+    the returned stats then show the listing throughput, which bounds what
+    the backfill can achieve. Returns ``{keys, batches, seconds, keys_per_second}``.
+    """
+    checkpoint = checkpoint or BackfillCheckpoint(None, bucket, None)
+    totals = {"keys": 0, "batches": 0}
+    lock = threading.Lock()
+
+    def process(key_range):
+        after, upto = key_range
+        keys = list_range(s3, bucket, prefix, checkpoint.start_after(after), upto, page_size)
+        for batch in batched(keys, batch_size):
+            if not dry_run:
+                dispatch(batch)
+                checkpoint.advance(after, batch[-1])
+            with lock:
+                totals["keys"] += len(batch)
+                totals["batches"] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(process, key_ranges(prefix, boundaries)))
+    seconds = time.perf_counter() - start
+    totals["seconds"] = seconds
+    totals["keys_per_second"] = totals["keys"] / seconds if seconds else 0.0
+    return totals
+
+
+def inprocess_dispatcher(function_name, bucket, rescore, s3, ddb, ssm):
+    """Dispatch batches to ``src/lambdas/<function_name>/handler.py`` loaded in this process."""
+    path = os.path.join(LAMBDAS_DIR, function_name, "handler.py")
+    spec = importlib.util.spec_from_file_location(f"backfill_{function_name}_handler", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # The handlers target the in-container LocalStack endpoint; point them here
+    module.s3 = module.RetryingClient(s3, module.retry_policy)
+    if hasattr(module, "ddb"):
+        module.ddb = module.RetryingClient(ddb, module.retry_policy)
+    module.get_param = lambda name: ssm.get_parameter(Name=name)["Parameter"]["Value"]
+
+    def dispatch(keys):
+        # No context: in process there is no timeout to hand off before
+        module.handler(backfill_event(bucket, keys, rescore), None)
+    return dispatch
+
+
+def invoke_dispatcher(function_name, bucket, rescore, lambda_client):
+    """Dispatch batches as asynchronous (``Event``) Lambda invocations."""
+    def dispatch(keys):
+        lambda_client.invoke(FunctionName=function_name, InvocationType="Event",
+                             Payload=json.dumps(backfill_event(bucket, keys, rescore)).encode("utf-8"))
+    return dispatch
+
+
+def client(service):
+    return boto3.client(
+        service,
+        endpoint_url=ENDPOINT_URL,
+        region_name=REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay stored reviews through a pipeline function")
+    parser.add_argument("--function", choices=FUNCTIONS, default="sentiment_analysis", help="function to run")
+    parser.add_argument("--bucket", default=S3_PROCESSED_BUCKET,
+                        help="bucket whose keys are replayed: the function's source bucket or a later stage's")
+    parser.add_argument("--mode", choices=["inprocess", "invoke"], default="inprocess",
+                        help="call the handler here or invoke the deployed Lambda asynchronously")
+    parser.add_argument("--rescore", action="store_true",
+                        help="score reviews again even if already scored, bypassing the result cache")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="key prefix to replay")
+    parser.add_argument("--boundaries", default=DEFAULT_BOUNDARIES,
+                        help="characters after the prefix at which the key space is split into ranges")
+    parser.add_argument("--batch-size", type=int, default=10, help="records per handler event")
+    parser.add_argument("--concurrency", type=int, default=4, help="ranges processed at once")
+    parser.add_argument("--checkpoint", default="data/backfill_checkpoint.json",
+                        help="progress file; an existing one is resumed")
+    parser.add_argument("--dry-run", action="store_true", help="only list keys and report throughput")
+    args = parser.parse_args()
+    try:
+        source = source_bucket(args.function, args.bucket)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Keys are listed from --bucket; events name the bucket the function reads them from
+    s3 = client("s3")
+    if args.dry_run:
+        dispatch = None
+    elif args.mode == "invoke":
+        dispatch = invoke_dispatcher(args.function, source, args.rescore, client("lambda"))
+    else:
+        dispatch = inprocess_dispatcher(args.function, source, args.rescore,
+                                        s3, client("dynamodb"), client("ssm"))
+
+    checkpoint = BackfillCheckpoint(None if args.dry_run else args.checkpoint, args.bucket, args.function)
+    if checkpoint.positions:
+        print(f"🔄 Resuming from {args.checkpoint}")
+    stats = run_backfill(s3, args.bucket, dispatch, args.prefix, args.boundaries, args.batch_size,
+                         args.concurrency, checkpoint, args.dry_run)
+
+    action = "Would dispatch" if args.dry_run else "Dispatched"
+    print(f"✅ {action} {stats['keys']:,} keys in {stats['batches']:,} batches to {args.function} "
+          f"({args.mode}) in {stats['seconds']:.1f}s: {stats['keys_per_second']:,.0f} keys/s")
+    if args.dry_run:
+        print(f"   Listing throughput bounds the backfill at {stats['keys_per_second']:,.0f} keys/s "
+              f"with {args.concurrency} concurrent ranges")
+
+
+if __name__ == "__main__":
+    main()
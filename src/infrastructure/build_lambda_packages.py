@@ -9,7 +9,8 @@ def build_lambda_packages():
     lambda_dirs = [
         "src/lambdas/preprocessing",
         "src/lambdas/profanity_check", 
-        "src/lambdas/sentiment_analysis"
+        "src/lambdas/sentiment_analysis",
+        "src/lambdas/scoring_api"
     ]
     
     print("=== Building Lambda Packages (Simplified) ===")
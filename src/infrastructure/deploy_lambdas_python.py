@@ -32,6 +32,11 @@ def deploy_lambdas():
         {
             "name": "sentiment_analysis",
             "zip_file": "src/lambdas/sentiment_analysis/lambda.zip"
+        },
+        {
+            "name": "scoring_api",
+            "zip_file": "src/lambdas/scoring_api/lambda.zip",
+            "function_url": True
         }
     ]
     
@@ -65,13 +70,43 @@ def deploy_lambdas():
                 Timeout=30,
                 Environment={
                     'Variables': {
-                        'STAGE': 'local'
+                        'STAGE': 'local',
+                        'API_ACCOUNTING': os.getenv('API_ACCOUNTING', '0'),
+                        'RESULT_CACHE_SIZE': os.getenv('RESULT_CACHE_SIZE', '10000'),
+                        'RESULT_CACHE_PERSIST': os.getenv('RESULT_CACHE_PERSIST', '0'),
+                        'SKIP_BANNED': os.getenv('SKIP_BANNED', '0'),
+                        'BANNED_FILTER_TTL': os.getenv('BANNED_FILTER_TTL', '60'),
+                        'AGGREGATE_SHARDS': os.getenv('AGGREGATE_SHARDS', '10'),
+                        'HOT_CUSTOMER_RATE': os.getenv('HOT_CUSTOMER_RATE', '10'),
+                        'RETRY_MAX_ATTEMPTS': os.getenv('RETRY_MAX_ATTEMPTS', '8'),
+                        'RETRY_BASE_DELAY_MS': os.getenv('RETRY_BASE_DELAY_MS', '50'),
+                        'HANDOFF_MARGIN_MS': os.getenv('HANDOFF_MARGIN_MS', '5000'),
+                        'PAYLOAD_SCHEMA': os.getenv('PAYLOAD_SCHEMA', 'full'),
+                        'PAYLOAD_GZIP': os.getenv('PAYLOAD_GZIP', '0'),
+                        'TOKEN_ENCODING': os.getenv('TOKEN_ENCODING', 'list'),
+                        'VOCAB_VERSION': os.getenv('VOCAB_VERSION', 'v1')
                     }
                 }
             )
             print(f"  ✓ Created function: {name}")
         except Exception as e:
             print(f"  ✗ Error creating function {name}: {e}")
+            continue
+        
+        # Synchronous HTTP endpoint (public, like the rest of the local setup)
+        if config.get("function_url"):
+            try:
+                url = lambda_client.create_function_url_config(FunctionName=name, AuthType='NONE')["FunctionUrl"]
+                lambda_client.add_permission(
+                    FunctionName=name,
+                    StatementId='function-url-public',
+                    Action='lambda:InvokeFunctionUrl',
+                    Principal='*',
+                    FunctionUrlAuthType='NONE'
+                )
+                print(f"  ✓ Function URL: {url}")
+            except Exception as e:
+                print(f"  ✗ Error creating function URL for {name}: {e}")
     
     print("=== Lambda deployment complete ===")
 
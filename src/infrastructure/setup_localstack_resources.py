@@ -1,5 +1,13 @@
+import os
+import sys
+
 import boto3
 
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.customer_stats import BANNED_INDEX_DEFINITION, BANNED_STATUS_ATTR
+
 # LocalStack endpoints
 ENDPOINT_URL = "http://localhost:4566"
 REGION = "us-east-1"  # Default region for LocalStack
@@ -13,13 +21,17 @@ S3_INPUT_BUCKET = "reviews-input"
 S3_PROCESSED_BUCKET = "reviews-processed"
 DDB_REVIEW_METADATA = "review-metadata"
 DDB_CUSTOMER_STATS = "customer-stats"
+DDB_SCORE_CACHE = "review-score-cache"
+DDB_AGGREGATES = "review-aggregates"
 
 # SSM parameter names
 SSM_PARAMS = {
     "input_bucket": "/dic2025/a3/bucket/input",
     "processed_bucket": "/dic2025/a3/bucket/processed",
     "review_metadata_table": "/dic2025/a3/table/review_metadata",
-    "customer_stats_table": "/dic2025/a3/table/customer_stats"
+    "customer_stats_table": "/dic2025/a3/table/customer_stats",
+    "score_cache_table": "/dic2025/a3/table/score_cache",
+    "aggregates_table": "/dic2025/a3/table/aggregates"
 }
 
 def reset_s3(s3, bucket):
@@ -36,7 +48,7 @@ def reset_s3(s3, bucket):
     s3.create_bucket(Bucket=bucket)
     print(f"Created bucket: {bucket}")
 
-def reset_ddb(ddb, table_name, key_schema, attr_defs):
+def reset_ddb(ddb, table_name, key_schema, attr_defs, gsis=None):
     try:
         ddb.delete_table(TableName=table_name)
         waiter = ddb.get_waiter('table_not_exists')
@@ -45,11 +57,13 @@ def reset_ddb(ddb, table_name, key_schema, attr_defs):
     except ddb.exceptions.ResourceNotFoundException:
         pass
 
+    kwargs = {"GlobalSecondaryIndexes": gsis} if gsis else {}
     ddb.create_table(
         TableName=table_name,
         KeySchema=key_schema,
         AttributeDefinitions=attr_defs,
-        BillingMode='PAY_PER_REQUEST'
+        BillingMode='PAY_PER_REQUEST',
+        **kwargs
     )
     waiter = ddb.get_waiter('table_exists')
     waiter.wait(TableName=table_name)
@@ -109,7 +123,30 @@ def main():
             {"AttributeName": "customerId", "KeyType": "HASH"}
         ],
         attr_defs=[
-            {"AttributeName": "customerId", "AttributeType": "S"}
+            {"AttributeName": "customerId", "AttributeType": "S"},
+            {"AttributeName": BANNED_STATUS_ATTR, "AttributeType": "S"}
+        ],
+        # Sparse index: only banned customers carry its key attribute
+        gsis=[BANNED_INDEX_DEFINITION]
+    )
+
+    reset_ddb(
+        ddb, DDB_SCORE_CACHE,
+        key_schema=[
+            {"AttributeName": "textHash", "KeyType": "HASH"}
+        ],
+        attr_defs=[
+            {"AttributeName": "textHash", "AttributeType": "S"}
+        ]
+    )
+
+    reset_ddb(
+        ddb, DDB_AGGREGATES,
+        key_schema=[
+            {"AttributeName": "shardId", "KeyType": "HASH"}
+        ],
+        attr_defs=[
+            {"AttributeName": "shardId", "AttributeType": "S"}
         ]
     )
 
@@ -118,6 +155,8 @@ def main():
     put_ssm_param(ssm, SSM_PARAMS["processed_bucket"], S3_PROCESSED_BUCKET)
     put_ssm_param(ssm, SSM_PARAMS["review_metadata_table"], DDB_REVIEW_METADATA)
     put_ssm_param(ssm, SSM_PARAMS["customer_stats_table"], DDB_CUSTOMER_STATS)
+    put_ssm_param(ssm, SSM_PARAMS["score_cache_table"], DDB_SCORE_CACHE)
+    put_ssm_param(ssm, SSM_PARAMS["aggregates_table"], DDB_AGGREGATES)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
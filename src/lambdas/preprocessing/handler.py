@@ -1,5 +1,4 @@
 import os
-import json
 import boto3
 import sys
 
@@ -10,7 +9,13 @@ os.environ["STAGE"] = "local"
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from utils.text_preprocessing import preprocess
-from utils.ssm_utils import get_param
+from utils.ssm_utils import get_param, ssm
+from utils.api_accounting import ApiCallAccountant
+from utils.retry import RetryPolicy, RetryingClient, NO_SDK_RETRIES
+from utils.deadline import DeadlineGuard, hand_off
+from utils.tracing import enter_stage, exit_stage, s3_metadata
+from utils.payload import PayloadCodec, decode_review
+from utils.vocab import Vocabulary, TOKEN_VOCAB_FIELD
 
 # Use LocalStack endpoint for Lambda functions
 # When running inside LocalStack Lambda containers, use the internal endpoint
@@ -19,35 +24,75 @@ if os.getenv("STAGE") == "local":
 else:
     endpoint_url = None
 
-s3 = boto3.client("s3", endpoint_url=endpoint_url)
+s3 = boto3.client("s3", endpoint_url=endpoint_url, config=NO_SDK_RETRIES)
+
+# Opt-in API call accounting (API_ACCOUNTING=1)
+accountant = ApiCallAccountant.from_env("preprocessing")
+if accountant:
+    accountant.instrument(s3, ssm)
+
+# S3/DynamoDB calls retry throttling and transient errors with jittered backoff
+# within the invocation's remaining time (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY_MS)
+retry_policy = RetryPolicy.from_env()
+s3 = RetryingClient(s3, retry_policy)
+
+# Used to hand the rest of a batch to a new invocation near the deadline (HANDOFF_MARGIN_MS)
+lambda_client = RetryingClient(boto3.client("lambda", endpoint_url=endpoint_url, config=NO_SDK_RETRIES), retry_policy)
+
+# Fields written to the next bucket and their encoding (PAYLOAD_SCHEMA, PAYLOAD_GZIP)
+payload = PayloadCodec.from_env()
+
+# Token lists as lemma IDs of a versioned vocabulary (TOKEN_ENCODING=vocab, VOCAB_VERSION)
+vocabulary = Vocabulary.from_env()
 
 def handler(event, context):
+    retry_policy.start(context)
+    if accountant:
+        accountant.reset()
     try:
         input_bucket = get_param("/dic2025/a3/bucket/input")
         preprocessed_bucket = "reviews-preprocessed"
         print(f"Processing with input_bucket={input_bucket}, preprocessed_bucket={preprocessed_bucket}")
         
-        for record in event["Records"]:
+        # Near the deadline, stop between records and re-enqueue the rest
+        guard = DeadlineGuard.from_env(context)
+        result = {"status": "done"}
+        records = event["Records"]
+        for index, record in enumerate(records):
+            if guard.should_hand_off():
+                result = hand_off(lambda_client, context, event, records[index:])
+                break
             key = record["s3"]["object"]["key"]
             print(f"Processing key: {key}")
+            if accountant:
+                accountant.record_reviews()
             
             obj = s3.get_object(Bucket=input_bucket, Key=key)
-            review = json.loads(obj["Body"].read())
+            review = decode_review(obj)
+            trace = enter_stage(review, "preprocessing", record, obj.get("Metadata"))
+            print(f"Trace ID: {trace['traceId']}")
             
             for field in ["summary", "reviewText"]:
                 if field in review:
-                    review[f"{field}_clean"] = preprocess(review[field])
+                    tokens = preprocess(review[field])
+                    review[f"{field}_clean"] = vocabulary.encode(tokens) if vocabulary else tokens
+            if vocabulary:
+                review[TOKEN_VOCAB_FIELD] = vocabulary.version
             
             # Store cleaned review in processed bucket
+            exit_stage(review, "preprocessing")
             s3.put_object(
                 Bucket=preprocessed_bucket,
                 Key=key,
-                Body=json.dumps(review).encode("utf-8"),
-                ContentType="application/json"
+                **payload.encode(review),
+                Metadata=s3_metadata(review)
             )
             print(f"Successfully processed and stored {key}")
             
-        return {"status": "done"}
+        if accountant:
+            print(accountant.log_line())
+        print(retry_policy.stats_line())
+        return result
     except Exception as e:
         print(f"Error in preprocessing handler: {str(e)}")
         raise
\ No newline at end of file
@@ -1,5 +1,4 @@
 import os
-import json
 import boto3
 import sys
 
@@ -10,7 +9,16 @@ os.environ["STAGE"] = "local"
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from utils.profanity import check_profanity
-from utils.ssm_utils import get_param
+from utils.ssm_utils import get_param, ssm
+from utils.api_accounting import ApiCallAccountant
+from utils.retry import RetryPolicy, RetryingClient, NO_SDK_RETRIES
+from utils.deadline import DeadlineGuard, hand_off
+from utils.tracing import enter_stage, exit_stage, s3_metadata
+from utils.payload import PayloadCodec, decode_review
+from utils.result_cache import ResultCache, CACHE_TABLE_PARAM
+from utils.banned_filter import BannedCustomers, BANNED_REVIEW_FIELD
+from utils.customer_stats import CustomerCounters
+from utils.aggregates import AggregateCounters, AGGREGATES_TABLE_PARAM, COUNTED_UNPOLITE, COUNTED_BAN
 
 # Use LocalStack endpoint for Lambda functions
 # When running inside LocalStack Lambda containers, use the internal endpoint
@@ -19,123 +27,192 @@ if os.getenv("STAGE") == "local":
 else:
     endpoint_url = None
 
-s3 = boto3.client("s3", endpoint_url=endpoint_url)
-ddb = boto3.client("dynamodb", endpoint_url=endpoint_url)
+s3 = boto3.client("s3", endpoint_url=endpoint_url, config=NO_SDK_RETRIES)
+ddb = boto3.client("dynamodb", endpoint_url=endpoint_url, config=NO_SDK_RETRIES)
+
+# Opt-in API call accounting (API_ACCOUNTING=1)
+accountant = ApiCallAccountant.from_env("profanity_check")
+if accountant:
+    accountant.instrument(s3, ddb, ssm)
+
+# S3/DynamoDB calls retry throttling and transient errors with jittered backoff
+# within the invocation's remaining time (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY_MS)
+retry_policy = RetryPolicy.from_env()
+s3 = RetryingClient(s3, retry_policy)
+ddb = RetryingClient(ddb, retry_policy)
+
+# Used to hand the rest of a batch to a new invocation near the deadline (HANDOFF_MARGIN_MS)
+lambda_client = RetryingClient(boto3.client("lambda", endpoint_url=endpoint_url, config=NO_SDK_RETRIES), retry_policy)
+
+# Fields written to the next bucket and their encoding (PAYLOAD_SCHEMA, PAYLOAD_GZIP)
+payload = PayloadCodec.from_env()
+
+# Content-hash result cache, kept across warm invocations (RESULT_CACHE_SIZE, RESULT_CACHE_PERSIST)
+result_cache = ResultCache.from_env()
+
+# Bloom filter of banned customers, refreshed every BANNED_FILTER_TTL seconds (SKIP_BANNED=1)
+banned_customers = BannedCustomers.from_env()
+
+# Per-customer unpolite counters, sharded for customers above HOT_CUSTOMER_RATE writes/s
+customer_counters = CustomerCounters.from_env()
+
+# Sharded pipeline-wide counters (AGGREGATE_SHARDS, 0 disables them)
+aggregates = AggregateCounters.from_env()
 
 def handler(event, context):
+    retry_policy.start(context)
+    if accountant:
+        accountant.reset()
     try:
         preprocessed_bucket = "reviews-preprocessed"
         checked_bucket = "reviews-checked"
         review_table = get_param("/dic2025/a3/table/review_metadata")
         stats_table = get_param("/dic2025/a3/table/customer_stats")
+        aggregates_table = get_param(AGGREGATES_TABLE_PARAM) if aggregates else None
         
         print(f"Processing with preprocessed_bucket={preprocessed_bucket}, checked_bucket={checked_bucket}, review_table={review_table}, stats_table={stats_table}")
+        if result_cache and result_cache.persistent:
+            result_cache.attach(ddb, get_param(CACHE_TABLE_PARAM))
+        
+        # Backfill replays (src/infrastructure/backfill_reviews.py) may ask to rescore reviews
+        rescore = event.get("backfill", {}).get("rescore", False)
         
-        for record in event["Records"]:
+        # Near the deadline, stop between records and re-enqueue the rest
+        guard = DeadlineGuard.from_env(context)
+        result = {"status": "done"}
+        records = event["Records"]
+        for index, record in enumerate(records):
+            if guard.should_hand_off():
+                result = hand_off(lambda_client, context, event, records[index:])
+                break
             key = record["s3"]["object"]["key"]
             print(f"Processing key: {key}")
+            if accountant:
+                accountant.record_reviews()
             
             try:
                 obj = s3.get_object(Bucket=preprocessed_bucket, Key=key)
-                review = json.loads(obj["Body"].read())
+                review = decode_review(obj)
+                trace = enter_stage(review, "profanity_check", record, obj.get("Metadata"))
                 
+                print(f"Trace ID: {trace['traceId']}")
                 print(f"Review data: customerId={review['customerId']}, reviewId={review['reviewId']}")
                 print(f"Review text: '{review.get('reviewText', '')}'")
                 
                 # Check if this review has already been processed
+                review_key = {
+                    "customerId": {"S": review["customerId"]},
+                    "reviewId": {"S": review["reviewId"]}
+                }
+                previous_verdict = None
+                counted = None  # the verdict the aggregate counters reflect
+                resume = False
                 try:
-                    existing_review = ddb.get_item(
-                        TableName=review_table,
-                        Key={
-                            "customerId": {"S": review["customerId"]},
-                            "reviewId": {"S": review["reviewId"]}
-                        }
-                    )
+                    existing_review = ddb.get_item(TableName=review_table, Key=review_key)
                     
                     if "Item" in existing_review:
-                        # Only skip if 'isUnpolite' is already set
+                        counted = existing_review["Item"].get(COUNTED_UNPOLITE)
+                        # Only skip if 'isUnpolite' is already set (and counted)
                         if "isUnpolite" in existing_review["Item"]:
-                            print(f"Review {review['reviewId']} already processed for profanity, skipping")
-                            continue
+                            previous_verdict = existing_review["Item"]["isUnpolite"]["BOOL"]
+                            if rescore:
+                                print(f"Review {review['reviewId']} already processed for profanity, rescoring")
+                            elif aggregates and counted is None:
+                                # An earlier attempt failed after storing the verdict:
+                                # count it and pass the review on
+                                resume = True
+                                print(f"Review {review['reviewId']} checked for profanity but not counted, resuming")
+                            else:
+                                print(f"Review {review['reviewId']} already processed for profanity, skipping")
+                                continue
                         else:
                             print(f"Review {review['reviewId']} exists but not checked for profanity, updating")
                 except Exception as e:
                     print(f"Error checking existing review: {e}")
                 
-                # Check for profanity in review text
-                has_profanity = check_profanity(review.get("reviewText", ""))
+                # Check for profanity in review text (identical texts are served from the result cache)
+                review_text = review.get("reviewText", "")
+                if resume:
+                    has_profanity = previous_verdict
+                elif result_cache:
+                    has_profanity = result_cache.get_or_compute(review_text, "isUnpolite",
+                                                                lambda: check_profanity(review_text),
+                                                                refresh=rescore)
+                else:
+                    has_profanity = check_profanity(review_text)
                 print(f"Profanity check result: {has_profanity}")
                 
                 # Use update_item to only set isUnpolite, preserving other attributes
-                try:
-                    ddb.update_item(
-                        TableName=review_table,
-                        Key={
-                            "customerId": {"S": review["customerId"]},
-                            "reviewId": {"S": review["reviewId"]}
-                        },
-                        UpdateExpression="SET isUnpolite = :isUnpolite",
-                        ExpressionAttributeValues={
-                            ":isUnpolite": {"BOOL": has_profanity}
-                        }
-                    )
-                    print(f"Updated review metadata: isUnpolite={has_profanity}")
-                except Exception as e:
-                    print(f"Error updating review metadata: {e}")
-                    raise
-                
-                # Update customer stats only if there's profanity
-                if has_profanity:
-                    customer_id = review["customerId"]
-                    print(f"Updating stats for customer: {customer_id}")
-                    
-                    # Get current stats
+                if not resume:
                     try:
-                        response = ddb.get_item(
-                            TableName=stats_table,
-                            Key={"customerId": {"S": customer_id}}
+                        ddb.update_item(
+                            TableName=review_table,
+                            Key=review_key,
+                            UpdateExpression="SET isUnpolite = :isUnpolite",
+                            ExpressionAttributeValues={
+                                ":isUnpolite": {"BOOL": has_profanity}
+                            }
                         )
-                        
-                        if "Item" in response:
-                            current_count = int(response["Item"]["unpoliteCount"]["N"])
-                            is_banned = response["Item"]["banned"]["BOOL"]
-                            print(f"Current stats: count={current_count}, banned={is_banned}")
-                        else:
-                            current_count = 0
-                            is_banned = False
-                            print(f"No existing stats, starting with count=0")
-                            
+                        print(f"Updated review metadata: isUnpolite={has_profanity}")
                     except Exception as e:
-                        print(f"Error getting customer stats: {e}")
-                        current_count = 0
-                        is_banned = False
-                    
-                    # Update count and check for banning
-                    new_count = current_count + 1
-                    should_ban = new_count > 3
+                        print(f"Error updating review metadata: {e}")
+                        raise
+                
+                # Reviews of banned customers skip the stats update and sentiment scoring
+                customer_id = review["customerId"]
+                if banned_customers and banned_customers.is_banned(ddb, stats_table, customer_id):
+                    review[BANNED_REVIEW_FIELD] = True
+                    print(f"Customer {customer_id} is banned, skipping stats update")
+                
+                # Update customer stats only if there's profanity (a rescore leaves
+                # the customer counts and bans alone, and a resumed review was
+                # counted for its customer by the attempt that stored the verdict)
+                newly_banned = False
+                if resume:
+                    print(f"Resumed review: isUnpolite={has_profanity}, customer stats unchanged")
+                    if aggregates and has_profanity:
+                        stats_row = ddb.get_item(TableName=stats_table, Key={"customerId": {"S": customer_id}},
+                                                 ConsistentRead=True).get("Item", {})
+                        newly_banned = (stats_row.get("banned", {}).get("BOOL", False)
+                                        and COUNTED_BAN not in stats_row)
+                elif previous_verdict is not None:
+                    print(f"Rescored review: isUnpolite {previous_verdict} -> {has_profanity}, customer stats unchanged")
+                elif has_profanity and not review.get(BANNED_REVIEW_FIELD):
+                    print(f"Updating stats for customer: {customer_id}")
                     
+                    # Atomic count; hot customers' counts are spread over sharded items
                     try:
-                        ddb.put_item(
-                            TableName=stats_table,
-                            Item={
-                                "customerId": {"S": customer_id},
-                                "unpoliteCount": {"N": str(new_count)},
-                                "banned": {"BOOL": should_ban}
-                            }
-                        )
-                        print(f"Updated customer stats: count={new_count}, banned={should_ban}")
+                        new_count, is_banned, newly_banned = customer_counters.record_unpolite(
+                            ddb, stats_table, customer_id)
+                        print(f"Updated customer stats: count={new_count}, banned={is_banned}")
+                        if is_banned and banned_customers:
+                            banned_customers.add(customer_id)
                     except Exception as e:
                         print(f"Error updating customer stats: {e}")
                         raise
-                else:
+                elif not has_profanity:
                     print(f"No profanity detected, skipping stats update")
                 
+                # Count the ban, then the review, each once (retries and rescores
+                # only add what the markers say is not yet counted)
+                if aggregates and newly_banned:
+                    aggregates.add(ddb, aggregates_table, stats_table, {"customerId": {"S": customer_id}},
+                                   COUNTED_BAN, {"BOOL": True}, banned=1)
+                if aggregates:
+                    if counted is None:
+                        increments = {"reviews": 1, "profane": int(has_profanity)}
+                    else:
+                        increments = {"profane": int(has_profanity) - int(counted["BOOL"])}
+                    aggregates.add(ddb, aggregates_table, review_table, review_key,
+                                   COUNTED_UNPOLITE, {"BOOL": has_profanity}, counted, **increments)
+                
                 # Write to next bucket for chaining
+                exit_stage(review, "profanity_check")
                 s3.put_object(
                     Bucket=checked_bucket,
                     Key=key,
-                    Body=json.dumps(review).encode("utf-8"),
-                    ContentType="application/json"
+                    **payload.encode(review),
+                    Metadata=s3_metadata(review)
                 )
                 print(f"Successfully processed and stored {key} in checked bucket")
                 
@@ -143,7 +220,14 @@ def handler(event, context):
                 print(f"Error processing record {key}: {e}")
                 raise
             
-        return {"status": "done"}
+        if accountant:
+            print(accountant.log_line())
+        print(retry_policy.stats_line())
+        if result_cache:
+            print(result_cache.stats_line())
+        if banned_customers:
+            print(banned_customers.stats_line())
+        return result
     except Exception as e:
         print(f"Error in profanity check handler: {str(e)}")
         raise
\ No newline at end of file
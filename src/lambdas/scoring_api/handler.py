@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import base64
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.profanity import check_profanity
+from utils.sentiment import analyze_sentiment, classify_sentiment
+from utils.result_cache import ResultCache
+
+# Synchronous scoring behind a Lambda function URL (or an API Gateway proxy
+# integration): reviews in the request body, verdicts in the response. It
+# touches neither S3 nor DynamoDB, so nothing is stored or counted per customer.
+
+# Reviews accepted in one request (SCORING_MAX_REVIEWS)
+MAX_REVIEWS = int(os.getenv("SCORING_MAX_REVIEWS", "100"))
+
+# Identical texts are scored once per warm container (RESULT_CACHE_SIZE). The
+# cache is never attached to its DynamoDB table, to keep requests free of AWS calls.
+result_cache = ResultCache.from_env()
+
+
+def response(status, body):
+    return {
+        "statusCode": status,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps(body),
+    }
+
+
+def parse_reviews(event):
+    """
+    The reviews in the request body and whether a single one was sent.
+    The body is one review object, a list of them, or ``{"reviews": [...]}``;
+    each needs a string ``reviewText``.
+    """
+    body = event.get("body") or ""
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode("utf-8")
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"request body is not JSON: {e}")
+
+    if isinstance(payload, dict) and "reviews" in payload:
+        reviews, single = payload["reviews"], False
+    elif isinstance(payload, dict):
+        reviews, single = [payload], True
+    else:
+        reviews, single = payload, False
+    if not isinstance(reviews, list) or not reviews:
+        raise ValueError("expected a review object, a list of reviews or {\"reviews\": [...]}")
+    if len(reviews) > MAX_REVIEWS:
+        raise ValueError(f"at most {MAX_REVIEWS} reviews per request, got {len(reviews)}")
+    for i, review in enumerate(reviews):
+        if not isinstance(review, dict) or not isinstance(review.get("reviewText"), str):
+            raise ValueError(f"review {i} has no string reviewText")
+    return reviews, single
+
+
+def score(review):
+    """Profanity and sentiment verdicts for one review, as the pipeline computes them."""
+    text = review["reviewText"]
+    if result_cache:
+        unpolite = result_cache.get_or_compute(text, "isUnpolite", lambda: check_profanity(text))
+        polarity = result_cache.get_or_compute(text, "polarity", lambda: analyze_sentiment(text))
+    else:
+        unpolite = check_profanity(text)
+        polarity = analyze_sentiment(text)
+    result = {"isUnpolite": unpolite, "sentiment": polarity, "label": classify_sentiment(polarity)}
+    if "reviewId" in review:
+        result["reviewId"] = review["reviewId"]
+    return result
+
+
+def handler(event, context):
+    method = (event.get("requestContext", {}).get("http", {}).get("method")
+              or event.get("httpMethod") or "POST")
+    if method != "POST":
+        return response(405, {"error": "use POST with reviews in the JSON body"})
+    try:
+        reviews, single = parse_reviews(event)
+    except ValueError as e:
+        return response(400, {"error": str(e)})
+
+    results = [score(review) for review in reviews]
+    return response(200, results[0] if single else {"results": results})
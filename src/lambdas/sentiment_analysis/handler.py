@@ -1,7 +1,7 @@
 import os
-import json
 import boto3
 import sys
+from collections import Counter
 
 # Set environment for LocalStack
 os.environ["STAGE"] = "local"
@@ -9,8 +9,16 @@ os.environ["STAGE"] = "local"
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from utils.sentiment import analyze_sentiment
-from utils.ssm_utils import get_param
+from utils.sentiment import analyze_sentiment, classify_sentiment
+from utils.ssm_utils import get_param, ssm
+from utils.api_accounting import ApiCallAccountant
+from utils.retry import RetryPolicy, RetryingClient, NO_SDK_RETRIES
+from utils.deadline import DeadlineGuard, hand_off
+from utils.tracing import enter_stage, exit_stage, s3_metadata, latency_breakdown
+from utils.payload import PayloadCodec, decode_review
+from utils.result_cache import ResultCache, CACHE_TABLE_PARAM
+from utils.banned_filter import BANNED_REVIEW_FIELD
+from utils.aggregates import AggregateCounters, AGGREGATES_TABLE_PARAM, COUNTED_SENTIMENT
 
 # Use LocalStack endpoint for Lambda functions
 # When running inside LocalStack Lambda containers, use the internal endpoint
@@ -19,56 +27,121 @@ if os.getenv("STAGE") == "local":
 else:
     endpoint_url = None
 
-s3 = boto3.client("s3", endpoint_url=endpoint_url)
-ddb = boto3.client("dynamodb", endpoint_url=endpoint_url)
+s3 = boto3.client("s3", endpoint_url=endpoint_url, config=NO_SDK_RETRIES)
+ddb = boto3.client("dynamodb", endpoint_url=endpoint_url, config=NO_SDK_RETRIES)
+
+# Opt-in API call accounting (API_ACCOUNTING=1)
+accountant = ApiCallAccountant.from_env("sentiment_analysis")
+if accountant:
+    accountant.instrument(s3, ddb, ssm)
+
+# S3/DynamoDB calls retry throttling and transient errors with jittered backoff
+# within the invocation's remaining time (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY_MS)
+retry_policy = RetryPolicy.from_env()
+s3 = RetryingClient(s3, retry_policy)
+ddb = RetryingClient(ddb, retry_policy)
+
+# Used to hand the rest of a batch to a new invocation near the deadline (HANDOFF_MARGIN_MS)
+lambda_client = RetryingClient(boto3.client("lambda", endpoint_url=endpoint_url, config=NO_SDK_RETRIES), retry_policy)
+
+# Fields written to the next bucket and their encoding (PAYLOAD_SCHEMA, PAYLOAD_GZIP)
+payload = PayloadCodec.from_env()
+
+# Content-hash result cache, kept across warm invocations (RESULT_CACHE_SIZE, RESULT_CACHE_PERSIST)
+result_cache = ResultCache.from_env()
+
+# Sharded pipeline-wide counters (AGGREGATE_SHARDS, 0 disables them)
+aggregates = AggregateCounters.from_env()
 
 def handler(event, context):
+    retry_policy.start(context)
+    if accountant:
+        accountant.reset()
     try:
         checked_bucket = "reviews-checked"
         processed_bucket = "reviews-processed"
         review_table = get_param("/dic2025/a3/table/review_metadata")
+        aggregates_table = get_param(AGGREGATES_TABLE_PARAM) if aggregates else None
         print(f"Processing with checked_bucket={checked_bucket}, processed_bucket={processed_bucket}, review_table={review_table}")
+        if result_cache and result_cache.persistent:
+            result_cache.attach(ddb, get_param(CACHE_TABLE_PARAM))
+        
+        # Backfill replays (src/infrastructure/backfill_reviews.py) may bypass the result cache
+        rescore = event.get("backfill", {}).get("rescore", False)
         
-        for record in event["Records"]:
+        # Near the deadline, stop between records and re-enqueue the rest
+        guard = DeadlineGuard.from_env(context)
+        result = {"status": "done"}
+        records = event["Records"]
+        for index, record in enumerate(records):
+            if guard.should_hand_off():
+                result = hand_off(lambda_client, context, event, records[index:])
+                break
             key = record["s3"]["object"]["key"]
             print(f"Processing key: {key}")
+            if accountant:
+                accountant.record_reviews()
             print(f"Reading from bucket: {checked_bucket}")
             try:
                 obj = s3.get_object(Bucket=checked_bucket, Key=key)
-                review = json.loads(obj["Body"].read())
+                review = decode_review(obj)
+                trace = enter_stage(review, "sentiment_analysis", record, obj.get("Metadata"))
                 print(f"Successfully read review from {checked_bucket}: {review.get('customerId', 'N/A')}, {review.get('reviewId', 'N/A')}")
             except Exception as e:
                 print(f"Error reading from {checked_bucket}: {e}")
                 raise
             
-            # Analyze sentiment
-            sentiment_score = analyze_sentiment(review.get("reviewText", ""))
+            # Analyze sentiment (identical texts are served from the result cache);
+            # reviews profanity_check marked as coming from a banned customer are not scored
+            review_text = review.get("reviewText", "")
+            if review.get(BANNED_REVIEW_FIELD):
+                sentiment_score = None
+                print(f"Customer {review['customerId']} is banned, skipping sentiment analysis")
+            elif result_cache:
+                sentiment_score = result_cache.get_or_compute(review_text, "polarity",
+                                                              lambda: analyze_sentiment(review_text),
+                                                              refresh=rescore)
+            else:
+                sentiment_score = analyze_sentiment(review_text)
             print(f"Sentiment analysis result: {sentiment_score}")
             
-            # Update review metadata with sentiment
+            # Final stage: close the trace and derive end-to-end latencies
+            exit_stage(review, "sentiment_analysis")
+            total_latency, hop_latencies = latency_breakdown(trace)
+            print(f"Trace {trace['traceId']}: total={total_latency}ms hops={hop_latencies}")
+            latency_attrs = {
+                "traceId": {"S": trace["traceId"]},
+                "hopLatencyMs": {"M": {hop: {"N": str(ms)} for hop, ms in hop_latencies.items()}}
+            }
+            if total_latency is not None:
+                latency_attrs["totalLatencyMs"] = {"N": str(total_latency)}
+            review_attrs = dict(latency_attrs)
+            if sentiment_score is not None:
+                review_attrs["sentiment"] = {"N": str(sentiment_score)}
+            
+            # Update review metadata with sentiment (the class the aggregate counters
+            # reflect, if any, keeps them right when a review is scored again)
+            review_key = {
+                "customerId": {"S": review["customerId"]},
+                "reviewId": {"S": review["reviewId"]}
+            }
+            counted = None
             try:
-                ddb.update_item(
+                response = ddb.update_item(
                     TableName=review_table,
-                    Key={
-                        "customerId": {"S": review["customerId"]},
-                        "reviewId": {"S": review["reviewId"]}
-                    },
-                    UpdateExpression="SET sentiment = :sentiment",
-                    ExpressionAttributeValues={
-                        ":sentiment": {"N": str(sentiment_score)}
-                    }
+                    Key=review_key,
+                    UpdateExpression="SET " + ", ".join(f"{name} = :{name}" for name in review_attrs),
+                    ExpressionAttributeValues={f":{name}": value for name, value in review_attrs.items()},
+                    ReturnValues="ALL_OLD"
                 )
+                counted = response.get("Attributes", {}).get(COUNTED_SENTIMENT)
                 print(f"Successfully updated sentiment for {key}, sentiment={sentiment_score}")
             except ddb.exceptions.ClientError as e:
                 if e.response['Error']['Code'] == 'ValidationException':
                     print(f"Item does not exist, creating new item for {key}")
                     ddb.put_item(
                         TableName=review_table,
-                        Item={
-                            "customerId": {"S": review["customerId"]},
-                            "reviewId": {"S": review["reviewId"]},
-                            "sentiment": {"N": str(sentiment_score)}
-                        }
+                        Item={**review_key, **review_attrs}
                     )
                     print(f"Created review metadata with sentiment for {key}, sentiment={sentiment_score}")
                 else:
@@ -78,14 +151,24 @@ def handler(event, context):
                 print(f"Unexpected error updating DynamoDB: {e}")
                 raise
             
+            # Counted once per class change: a retry after a failed count still
+            # finds no marker, one after a counted attempt finds its own class
+            if aggregates and sentiment_score is not None:
+                label = classify_sentiment(sentiment_score)
+                increments = Counter({label: 1})
+                if counted is not None:
+                    increments[counted["S"]] -= 1
+                aggregates.add(ddb, aggregates_table, review_table, review_key,
+                               COUNTED_SENTIMENT, {"S": label}, counted, **increments)
+            
             # Write to final processed bucket
             print(f"Writing to bucket: {processed_bucket}")
             try:
                 s3.put_object(
                     Bucket=processed_bucket,
                     Key=key,
-                    Body=json.dumps(review).encode("utf-8"),
-                    ContentType="application/json"
+                    **payload.encode(review, final=True),
+                    Metadata=s3_metadata(review)
                 )
                 print(f"Successfully wrote to {processed_bucket}: {key}")
             except Exception as e:
@@ -94,7 +177,12 @@ def handler(event, context):
             
             print(f"Successfully processed and stored {key} in processed bucket")
         
-        return {"status": "done"}
+        if accountant:
+            print(accountant.log_line())
+        print(retry_policy.stats_line())
+        if result_cache:
+            print(result_cache.stats_line())
+        return result
     except Exception as e:
         print(f"Error in sentiment analysis handler: {str(e)}")
         raise 
\ No newline at end of file
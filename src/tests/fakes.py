@@ -0,0 +1,793 @@
+"""
+In-memory stand-ins for the S3, DynamoDB and Lambda clients used by the handlers.
+
+They implement the subset of the boto3 client API the pipeline uses, with
+the same request/response shapes and ClientError codes, so handler modules
+can run unchanged against them. All operations are guarded by a lock and
+are therefore atomic, like single-item operations in DynamoDB.
+"""
+import copy
+import io
+import json
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code, message, operation, status=400, **extra):
+    return {"Error": {"Code": code, "Message": message},
+            "ResponseMetadata": {"HTTPStatusCode": status}, **extra}, operation
+
+
+class _Exceptions:
+    """Mimics ``client.exceptions`` (every modeled error is a ClientError)."""
+
+    ClientError = ClientError
+
+    def __init__(self, codes):
+        self._by_code = {}
+        for code in codes:
+            cls = type(code, (ClientError,), {})
+            setattr(self, code, cls)
+            self._by_code[code] = cls
+
+    def raise_error(self, code, message, operation, status=400, **extra):
+        cls = self._by_code.get(code, ClientError)
+        raise cls(*_client_error(code, message, operation, status, **extra))
+
+
+class _Paginator:
+    def __init__(self, method, token_in, token_out, limit_param):
+        self._method = method
+        self._token_in = token_in
+        self._token_out = token_out
+        self._limit_param = limit_param
+
+    def paginate(self, PaginationConfig=None, **kwargs):
+        config = PaginationConfig or {}
+        if "PageSize" in config:
+            kwargs[self._limit_param] = config["PageSize"]
+        if config.get("StartingToken"):
+            kwargs[self._token_in] = config["StartingToken"]
+        while True:
+            page = self._method(**kwargs)
+            yield page
+            token = page.get(self._token_out)
+            if not token:
+                return
+            kwargs[self._token_in] = token
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def event_time(ts=None):
+    """S3 event time string, e.g. 2025-06-01T12:00:00.123Z."""
+    return (ts or _now()).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+# ----------------------------------------------------------------------
+# S3
+# ----------------------------------------------------------------------
+class InMemoryS3:
+    """Bucket/object store with synchronous ObjectCreated notifications."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._subscribers = defaultdict(list)
+        self._lock = threading.RLock()
+        self.exceptions = _Exceptions(["NoSuchKey", "NoSuchBucket", "BucketAlreadyOwnedByYou"])
+        self.call_counts = Counter()
+        self.bytes_in = Counter()
+        self.bytes_out = Counter()
+
+    # --- management ---------------------------------------------------
+    def create_bucket(self, Bucket, **kwargs):
+        with self._lock:
+            self.call_counts["CreateBucket"] += 1
+            self._buckets.setdefault(Bucket, {})
+        return {}
+
+    def head_bucket(self, Bucket, **kwargs):
+        self._bucket(Bucket, "HeadBucket")
+        return {}
+
+    def subscribe(self, bucket, callback):
+        """Call *callback(event)* with an S3 event for every object created in *bucket*."""
+        self._subscribers[bucket].append(callback)
+
+    def _bucket(self, name, operation):
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            self.exceptions.raise_error("NoSuchBucket", f"Bucket {name} does not exist", operation, 404)
+        return bucket
+
+    # --- objects ------------------------------------------------------
+    def put_object(self, Bucket, Key, Body=b"", ContentType=None, Metadata=None,
+                   ContentEncoding=None, **kwargs):
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        elif hasattr(Body, "read"):
+            Body = Body.read()
+        created = _now()
+        with self._lock:
+            self.call_counts["PutObject"] += 1
+            self.bytes_in[Bucket] += len(Body)
+            self._bucket(Bucket, "PutObject")[Key] = {
+                "Body": bytes(Body),
+                "ContentType": ContentType,
+                "ContentEncoding": ContentEncoding,
+                "Metadata": dict(Metadata or {}),
+                "LastModified": created,
+            }
+        self._notify(Bucket, Key, len(Body), created)
+        return {"ETag": f'"{hash(Body) & 0xffffffff:08x}"'}
+
+    def _notify(self, bucket, key, size, created):
+        callbacks = self._subscribers.get(bucket)
+        if not callbacks:
+            return
+        event = {"Records": [{
+            "eventSource": "aws:s3",
+            "eventName": "ObjectCreated:Put",
+            "eventTime": event_time(created),
+            "s3": {"bucket": {"name": bucket, "arn": f"arn:aws:s3:::{bucket}"},
+                   "object": {"key": key, "size": size}},
+        }]}
+        for callback in callbacks:
+            callback(event)
+
+    def _object(self, Bucket, Key, operation):
+        obj = self._bucket(Bucket, operation).get(Key)
+        if obj is None:
+            if operation == "HeadObject":
+                self.exceptions.raise_error("404", "Not Found", operation, 404)
+            self.exceptions.raise_error("NoSuchKey", "The specified key does not exist.", operation, 404)
+        return obj
+
+    def _head(self, obj):
+        head = {
+            "ContentLength": len(obj["Body"]),
+            "ContentType": obj["ContentType"],
+            "Metadata": dict(obj["Metadata"]),
+            "LastModified": obj["LastModified"],
+        }
+        if obj["ContentEncoding"]:
+            head["ContentEncoding"] = obj["ContentEncoding"]
+        return head
+
+    def get_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.call_counts["GetObject"] += 1
+            obj = self._object(Bucket, Key, "GetObject")
+            self.bytes_out[Bucket] += len(obj["Body"])
+            response = self._head(obj)
+            response["Body"] = io.BytesIO(obj["Body"])
+        return response
+
+    def head_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.call_counts["HeadObject"] += 1
+            return self._head(self._object(Bucket, Key, "HeadObject"))
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.call_counts["DeleteObject"] += 1
+            self._bucket(Bucket, "DeleteObject").pop(Key, None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", Delimiter=None, MaxKeys=1000,
+                        ContinuationToken=None, StartAfter=None, **kwargs):
+        with self._lock:
+            self.call_counts["ListObjectsV2"] += 1
+            bucket = self._bucket(Bucket, "ListObjectsV2")
+            keys = sorted(k for k in bucket if k.startswith(Prefix))
+            after = ContinuationToken or StartAfter
+            contents, prefixes = [], []
+            truncated = False
+            last = None
+            for key in keys:
+                if after is not None and key <= after:
+                    continue
+                if Delimiter:
+                    idx = key.find(Delimiter, len(Prefix))
+                    if idx != -1:
+                        common = key[:idx + len(Delimiter)]
+                        if prefixes and prefixes[-1] == common:
+                            continue
+                        if after is not None and common <= after:
+                            continue
+                        if len(contents) + len(prefixes) >= MaxKeys:
+                            truncated = True
+                            break
+                        prefixes.append(common)
+                        last = max(key, common)
+                        continue
+                if len(contents) + len(prefixes) >= MaxKeys:
+                    truncated = True
+                    break
+                obj = bucket[key]
+                contents.append({"Key": key, "Size": len(obj["Body"]),
+                                 "LastModified": obj["LastModified"]})
+                last = key
+
+        response = {"Name": Bucket, "Prefix": Prefix, "KeyCount": len(contents) + len(prefixes),
+                    "MaxKeys": MaxKeys, "IsTruncated": truncated}
+        if contents:
+            response["Contents"] = contents
+        if prefixes:
+            response["CommonPrefixes"] = [{"Prefix": p} for p in prefixes]
+        if truncated:
+            response["NextContinuationToken"] = last
+        return response
+
+    def get_paginator(self, operation):
+        if operation != "list_objects_v2":
+            raise NotImplementedError(operation)
+        return _Paginator(self.list_objects_v2, "ContinuationToken", "NextContinuationToken", "MaxKeys")
+
+
+# ----------------------------------------------------------------------
+# DynamoDB expressions
+# ----------------------------------------------------------------------
+_TOKEN_RE = re.compile(r"\s*(<>|<=|>=|[=<>(),+\-]|[#:]?[A-Za-z_][A-Za-z0-9_\-]*)")
+_KEYWORDS = {"AND", "OR", "NOT", "BETWEEN", "IN"}
+_FUNCTIONS = {"attribute_exists", "attribute_not_exists", "begins_with", "contains", "size",
+              "if_not_exists", "list_append"}
+
+
+def _tokenize(expression):
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match:
+            raise ValueError(f"Cannot parse expression near: {expression[pos:]!r}")
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+def _plain(value):
+    """Typed attribute value -> comparable Python value."""
+    (kind, raw), = value.items()
+    if kind == "N":
+        return Decimal(raw)
+    if kind in ("SS", "BS"):
+        return set(raw)
+    if kind == "NS":
+        return {Decimal(v) for v in raw}
+    return raw
+
+
+def _number(value):
+    return {"N": str(value).rstrip("0").rstrip(".") if "." in str(value) else str(value)}
+
+
+class _Expression:
+    """Tiny recursive-descent evaluator for condition/filter/key expressions."""
+
+    def __init__(self, expression, names, values):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if expected is not None and (token is None or token.upper() != expected):
+            raise ValueError(f"Expected {expected}, got {token}")
+        self.pos += 1
+        return token
+
+    def name(self, token):
+        return self.names[token] if token.startswith("#") else token
+
+    # --- grammar --------------------------------------------------------
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected token {self.peek()}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() and self.peek().upper() == "OR":
+            self.take()
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() and self.peek().upper() == "AND":
+            self.take()
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() and self.peek().upper() == "NOT":
+            self.take()
+            return ("not", self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        if self.peek() == "(":
+            self.take()
+            node = self.parse_or()
+            self.take(")")
+            return node
+
+        token = self.peek()
+        if token in ("attribute_exists", "attribute_not_exists", "begins_with", "contains"):
+            self.take()
+            self.take("(")
+            args = [self.parse_operand()]
+            while self.peek() == ",":
+                self.take()
+                args.append(self.parse_operand())
+            self.take(")")
+            return ("func", token, args)
+
+        left = self.parse_operand()
+        op = self.take()
+        if op.upper() == "BETWEEN":
+            low = self.parse_operand()
+            self.take("AND")
+            return ("between", left, low, self.parse_operand())
+        if op.upper() == "IN":
+            self.take("(")
+            options = [self.parse_operand()]
+            while self.peek() == ",":
+                self.take()
+                options.append(self.parse_operand())
+            self.take(")")
+            return ("in", left, options)
+        return ("cmp", op, left, self.parse_operand())
+
+    def parse_operand(self):
+        token = self.take()
+        if token == "size":
+            self.take("(")
+            path = self.parse_operand()
+            self.take(")")
+            return ("size", path)
+        if token.startswith(":"):
+            return ("value", self.values[token])
+        return ("path", self.name(token))
+
+    # --- evaluation -----------------------------------------------------
+    @staticmethod
+    def operand(node, item):
+        if node[0] == "value":
+            return node[1]
+        if node[0] == "size":
+            value = _Expression.operand(node[1], item)
+            return None if value is None else {"N": str(len(_plain(value)))}
+        return item.get(node[1])
+
+    @classmethod
+    def evaluate(cls, node, item):
+        kind = node[0]
+        if kind == "or":
+            return cls.evaluate(node[1], item) or cls.evaluate(node[2], item)
+        if kind == "and":
+            return cls.evaluate(node[1], item) and cls.evaluate(node[2], item)
+        if kind == "not":
+            return not cls.evaluate(node[1], item)
+        if kind == "func":
+            name, args = node[1], node[2]
+            first = cls.operand(args[0], item)
+            if name == "attribute_exists":
+                return first is not None
+            if name == "attribute_not_exists":
+                return first is None
+            second = cls.operand(args[1], item)
+            if first is None or second is None:
+                return False
+            if name == "begins_with":
+                return _plain(first).startswith(_plain(second))
+            return _plain(second) in _plain(first)
+        if kind == "between":
+            value = cls.operand(node[1], item)
+            if value is None:
+                return False
+            return _plain(cls.operand(node[2], item)) <= _plain(value) <= _plain(cls.operand(node[3], item))
+        if kind == "in":
+            value = cls.operand(node[1], item)
+            return value is not None and any(_plain(value) == _plain(cls.operand(o, item)) for o in node[2])
+
+        op, left, right = node[1], cls.operand(node[2], item), cls.operand(node[3], item)
+        if left is None or right is None:
+            return op == "<>" and (left is None) != (right is None)
+        a, b = _plain(left), _plain(right)
+        try:
+            return {"=": a == b, "<>": a != b, "<": a < b, "<=": a <= b,
+                    ">": a > b, ">=": a >= b}[op]
+        except TypeError:
+            return op == "<>"
+
+
+def _condition(expression, names, values):
+    return _Expression(expression, names, values).parse() if expression else None
+
+
+def _split_top_level(text, sep=","):
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+_CLAUSE_RE = re.compile(r"(?<![:#\w])(SET|ADD|REMOVE|DELETE)\b", re.I)
+
+
+def _apply_update(item, expression, names, values):
+    """Apply an UpdateExpression to *item* in place; return the updated attribute names."""
+    names = names or {}
+    values = values or {}
+
+    def name(token):
+        token = token.strip()
+        return names[token] if token.startswith("#") else token
+
+    def operand(text):
+        text = text.strip()
+        match = re.match(r"^(if_not_exists|list_append)\s*\((.*)\)$", text)
+        if match:
+            args = _split_top_level(match.group(2))
+            if match.group(1) == "if_not_exists":
+                existing = item.get(name(args[0]))
+                return existing if existing is not None else operand(args[1])
+            return {"L": operand(args[0])["L"] + operand(args[1])["L"]}
+        if text.startswith(":"):
+            return values[text]
+        return item.get(name(text))
+
+    def arithmetic(text):
+        parts = _split_top_level(text.replace(" + ", ",+,").replace(" - ", ",-,"))
+        if len(parts) == 1:
+            return operand(parts[0])
+        left, op, right = operand(parts[0]), parts[1], operand(parts[2])
+        a, b = Decimal(left["N"]), Decimal(right["N"])
+        return _number(a + b if op == "+" else a - b)
+
+    updated = []
+    pieces = _CLAUSE_RE.split(expression)
+    for clause, body in zip(pieces[1::2], pieces[2::2]):
+        clause = clause.upper()
+        for action in _split_top_level(body):
+            if clause == "SET":
+                target, value = action.split("=", 1)
+                item[name(target)] = copy.deepcopy(arithmetic(value))
+                updated.append(name(target))
+            elif clause == "REMOVE":
+                item.pop(name(action), None)
+            elif clause in ("ADD", "DELETE"):
+                target, value = action.split(None, 1)
+                target, value = name(target), values[value.strip()]
+                current = item.get(target)
+                if "N" in value:
+                    base = Decimal(current["N"]) if current else Decimal(0)
+                    delta = Decimal(value["N"])
+                    item[target] = _number(base + delta if clause == "ADD" else base - delta)
+                else:
+                    (kind, members), = value.items()
+                    existing = set(current[kind]) if current else set()
+                    result = existing | set(members) if clause == "ADD" else existing - set(members)
+                    if result:
+                        item[target] = {kind: sorted(result)}
+                    else:
+                        item.pop(target, None)
+                updated.append(target)
+    return updated
+
+
+def _project(item, projection, names):
+    if not projection:
+        return copy.deepcopy(item)
+    names = names or {}
+    wanted = [names.get(p.strip(), p.strip()) for p in projection.split(",")]
+    return {k: copy.deepcopy(item[k]) for k in wanted if k in item}
+
+
+# ----------------------------------------------------------------------
+# DynamoDB
+# ----------------------------------------------------------------------
+class InMemoryDynamoDB:
+    """Tables of typed items keyed by their primary key, with optional GSIs."""
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.RLock()
+        self.exceptions = _Exceptions([
+            "ConditionalCheckFailedException", "ResourceNotFoundException",
+            "ResourceInUseException", "ValidationException",
+            "ProvisionedThroughputExceededException", "TransactionCanceledException",
+        ])
+        self.call_counts = Counter()
+
+    # --- tables ---------------------------------------------------------
+    def create_table(self, TableName, KeySchema, AttributeDefinitions=None,
+                     GlobalSecondaryIndexes=None, **kwargs):
+        with self._lock:
+            self.call_counts["CreateTable"] += 1
+            if TableName in self._tables:
+                self.exceptions.raise_error("ResourceInUseException", f"Table already exists: {TableName}", "CreateTable")
+            indexes = {}
+            for gsi in GlobalSecondaryIndexes or []:
+                indexes[gsi["IndexName"]] = [k["AttributeName"] for k in gsi["KeySchema"]]
+            self._tables[TableName] = {
+                "key": [k["AttributeName"] for k in KeySchema],
+                "indexes": indexes,
+                "items": {},
+            }
+        return {"TableDescription": {"TableName": TableName, "TableStatus": "ACTIVE"}}
+
+    def _table(self, name, operation):
+        table = self._tables.get(name)
+        if table is None:
+            self.exceptions.raise_error("ResourceNotFoundException", f"Requested resource not found: {name}", operation)
+        return table
+
+    @staticmethod
+    def _key_of(table, key_or_item):
+        return tuple(_plain(key_or_item[k]) if k in key_or_item else None for k in table["key"])
+
+    def _check(self, item, kwargs, operation):
+        node = _condition(kwargs.get("ConditionExpression"), kwargs.get("ExpressionAttributeNames"),
+                          kwargs.get("ExpressionAttributeValues"))
+        if node is not None and not _Expression.evaluate(node, item or {}):
+            self.exceptions.raise_error("ConditionalCheckFailedException", "The conditional request failed", operation)
+
+    @staticmethod
+    def _consumed(table_name, kwargs, units):
+        if kwargs.get("ReturnConsumedCapacity") in ("TOTAL", "INDEXES"):
+            return {"ConsumedCapacity": {"TableName": table_name, "CapacityUnits": units}}
+        return {}
+
+    # --- single items -----------------------------------------------------
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        with self._lock:
+            self.call_counts["GetItem"] += 1
+            table = self._table(TableName, "GetItem")
+            item = table["items"].get(self._key_of(table, Key))
+            response = self._consumed(TableName, kwargs, 0.5)
+            if item is not None:
+                response["Item"] = _project(item, ProjectionExpression, ExpressionAttributeNames)
+            return response
+
+    def put_item(self, TableName, Item, ReturnValues="NONE", **kwargs):
+        with self._lock:
+            self.call_counts["PutItem"] += 1
+            table = self._table(TableName, "PutItem")
+            key = self._key_of(table, Item)
+            old = table["items"].get(key)
+            self._check(old, kwargs, "PutItem")
+            table["items"][key] = copy.deepcopy(Item)
+            response = self._consumed(TableName, kwargs, 1.0)
+            if ReturnValues == "ALL_OLD" and old is not None:
+                response["Attributes"] = old
+            return response
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues="NONE", **kwargs):
+        with self._lock:
+            self.call_counts["UpdateItem"] += 1
+            table = self._table(TableName, "UpdateItem")
+            key = self._key_of(table, Key)
+            old = table["items"].get(key)
+            self._check(old, dict(kwargs, ExpressionAttributeNames=ExpressionAttributeNames,
+                                  ExpressionAttributeValues=ExpressionAttributeValues), "UpdateItem")
+            item, updated = self._update(table, Key, UpdateExpression, ExpressionAttributeNames,
+                                         ExpressionAttributeValues)
+
+            response = self._consumed(TableName, kwargs, 1.0)
+            if ReturnValues == "ALL_NEW":
+                response["Attributes"] = copy.deepcopy(item)
+            elif ReturnValues == "UPDATED_NEW":
+                response["Attributes"] = {k: copy.deepcopy(item[k]) for k in updated if k in item}
+            elif ReturnValues == "ALL_OLD" and old is not None:
+                response["Attributes"] = old
+            elif ReturnValues == "UPDATED_OLD" and old is not None:
+                response["Attributes"] = {k: old[k] for k in updated if k in old}
+            return response
+
+    def _update(self, table, Key, UpdateExpression, names, values):
+        key = self._key_of(table, Key)
+        old = table["items"].get(key)
+        item = copy.deepcopy(old) if old is not None else copy.deepcopy(Key)
+        updated = _apply_update(item, UpdateExpression, names, values)
+        table["items"][key] = item
+        return item, updated
+
+    def delete_item(self, TableName, Key, **kwargs):
+        with self._lock:
+            self.call_counts["DeleteItem"] += 1
+            table = self._table(TableName, "DeleteItem")
+            key = self._key_of(table, Key)
+            self._check(table["items"].get(key), kwargs, "DeleteItem")
+            table["items"].pop(key, None)
+            return self._consumed(TableName, kwargs, 1.0)
+
+    # --- batches ----------------------------------------------------------
+    def batch_get_item(self, RequestItems, **kwargs):
+        with self._lock:
+            self.call_counts["BatchGetItem"] += 1
+            responses = {}
+            for table_name, request in RequestItems.items():
+                table = self._table(table_name, "BatchGetItem")
+                found = responses.setdefault(table_name, [])
+                for key in request["Keys"]:
+                    item = table["items"].get(self._key_of(table, key))
+                    if item is not None:
+                        found.append(_project(item, request.get("ProjectionExpression"),
+                                              request.get("ExpressionAttributeNames")))
+            return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        with self._lock:
+            self.call_counts["BatchWriteItem"] += 1
+            for table_name, requests in RequestItems.items():
+                table = self._table(table_name, "BatchWriteItem")
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        table["items"][self._key_of(table, item)] = copy.deepcopy(item)
+                    else:
+                        table["items"].pop(self._key_of(table, request["DeleteRequest"]["Key"]), None)
+            return {"UnprocessedItems": {}}
+
+    # --- transactions -----------------------------------------------------
+    def transact_write_items(self, TransactItems, **kwargs):
+        """All-or-nothing Put/Update/ConditionCheck; cancelled if any condition fails."""
+        with self._lock:
+            self.call_counts["TransactWriteItems"] += 1
+            reasons = []
+            for entry in TransactItems:
+                (action, request), = entry.items()
+                table = self._table(request["TableName"], "TransactWriteItems")
+                item = table["items"].get(self._key_of(table, request.get("Key") or request["Item"]))
+                try:
+                    self._check(item, request, "TransactWriteItems")
+                    reasons.append({"Code": "None"})
+                except self.exceptions.ConditionalCheckFailedException:
+                    reasons.append({"Code": "ConditionalCheckFailed", "Message": "The conditional request failed"})
+            if any(reason["Code"] != "None" for reason in reasons):
+                self.exceptions.raise_error(
+                    "TransactionCanceledException",
+                    "Transaction cancelled, please refer cancellation reasons for specific reasons "
+                    f"[{', '.join(reason['Code'] for reason in reasons)}]",
+                    "TransactWriteItems", CancellationReasons=reasons)
+            for entry in TransactItems:
+                (action, request), = entry.items()
+                table = self._tables[request["TableName"]]
+                if action == "Put":
+                    table["items"][self._key_of(table, request["Item"])] = copy.deepcopy(request["Item"])
+                elif action == "Update":
+                    self._update(table, request["Key"], request["UpdateExpression"],
+                                 request.get("ExpressionAttributeNames"), request.get("ExpressionAttributeValues"))
+            return {}
+
+    # --- reads over many items --------------------------------------------
+    def _page(self, table_name, rows, key_attrs, kwargs, operation):
+        """Apply ExclusiveStartKey/Limit/Filter/Projection to ordered *rows*."""
+        start = kwargs.get("ExclusiveStartKey")
+        if start is not None:
+            start = tuple(_plain(start[k]) for k in key_attrs)
+            rows = [r for r in rows if r[0] > start]
+
+        limit = kwargs.get("Limit")
+        truncated = limit is not None and len(rows) > limit
+        if truncated:
+            rows = rows[:limit]
+
+        node = _condition(kwargs.get("FilterExpression"), kwargs.get("ExpressionAttributeNames"),
+                          kwargs.get("ExpressionAttributeValues"))
+        items = [_project(item, kwargs.get("ProjectionExpression"), kwargs.get("ExpressionAttributeNames"))
+                 for _, item in rows if node is None or _Expression.evaluate(node, item)]
+
+        response = {"Items": items, "Count": len(items), "ScannedCount": len(rows)}
+        if kwargs.get("Select") == "COUNT":
+            del response["Items"]
+        if truncated and rows:
+            last = rows[-1][1]
+            response["LastEvaluatedKey"] = {k: copy.deepcopy(last[k]) for k in key_attrs if k in last}
+        response.update(self._consumed(table_name, kwargs, 0.5 * max(1, len(rows))))
+        return response
+
+    def _index_rows(self, table, index_name):
+        key_attrs = table["indexes"][index_name] if index_name else table["key"]
+        sort_attrs = key_attrs + [k for k in table["key"] if k not in key_attrs]
+        rows = []
+        for item in table["items"].values():
+            if all(k in item for k in key_attrs):
+                rows.append((tuple(_plain(item[k]) for k in sort_attrs), item))
+        rows.sort(key=lambda r: tuple(str(v) for v in r[0]))
+        return rows, sort_attrs
+
+    def scan(self, TableName, Segment=None, TotalSegments=None, IndexName=None, **kwargs):
+        with self._lock:
+            self.call_counts["Scan"] += 1
+            table = self._table(TableName, "Scan")
+            rows, key_attrs = self._index_rows(table, IndexName)
+            if TotalSegments:
+                rows = [r for r in rows
+                        if hash(tuple(str(v) for v in r[0][:len(table["key"])])) % TotalSegments == Segment]
+            return self._page(TableName, [(tuple(str(v) for v in r[0]), r[1]) for r in rows],
+                              key_attrs, self._str_start(kwargs), "Scan")
+
+    @staticmethod
+    def _str_start(kwargs):
+        start = kwargs.get("ExclusiveStartKey")
+        if start is None:
+            return kwargs
+        kwargs = dict(kwargs)
+        kwargs["ExclusiveStartKey"] = {k: {"S": str(_plain(v))} for k, v in start.items()}
+        return kwargs
+
+    def query(self, TableName, KeyConditionExpression, IndexName=None, ScanIndexForward=True, **kwargs):
+        with self._lock:
+            self.call_counts["Query"] += 1
+            table = self._table(TableName, "Query")
+            rows, key_attrs = self._index_rows(table, IndexName)
+            node = _condition(KeyConditionExpression, kwargs.get("ExpressionAttributeNames"),
+                              kwargs.get("ExpressionAttributeValues"))
+            rows = [r for r in rows if _Expression.evaluate(node, r[1])]
+            if not ScanIndexForward:
+                rows.reverse()
+            return self._page(TableName, [(tuple(str(v) for v in r[0]), r[1]) for r in rows],
+                              key_attrs, self._str_start(kwargs), "Query")
+
+    def get_paginator(self, operation):
+        if operation not in ("scan", "query"):
+            raise NotImplementedError(operation)
+        return _Paginator(getattr(self, operation), "ExclusiveStartKey", "LastEvaluatedKey", "Limit")
+
+    # --- test helpers -------------------------------------------------------
+    def items(self, table_name):
+        """All items of *table_name* (deep copies)."""
+        with self._lock:
+            return [copy.deepcopy(i) for i in self._table(table_name, "Scan")["items"].values()]
+
+
+# ----------------------------------------------------------------------
+# Lambda
+# ----------------------------------------------------------------------
+class InMemoryLambda:
+    """Accepts asynchronous (``Event``) invocations and hands their payloads to subscribers."""
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self.exceptions = _Exceptions(["ResourceNotFoundException"])
+        self.call_counts = Counter()
+
+    def subscribe(self, callback):
+        """Call *callback(function_name, event)* for every invocation."""
+        self._subscribers.append(callback)
+
+    def invoke(self, FunctionName, InvocationType="RequestResponse", Payload=b"{}", **kwargs):
+        with self._lock:
+            self.call_counts["Invoke"] += 1
+        if InvocationType != "Event":
+            raise NotImplementedError("only asynchronous invocations are supported")
+        event = json.loads(Payload)
+        for callback in self._subscribers:
+            callback(FunctionName, event)
+        return {"StatusCode": 202}
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+In-process Review Pipeline Runner
+
+Imports the three Lambda ``handler`` modules directly and wires them to the
+in-memory S3/DynamoDB stand-ins from ``fakes.py``. Uploads to the input
+bucket produce synthetic S3 events that are dispatched in-process (FIFO,
+or on a thread pool), so handler logic can be exercised and benchmarked
+without LocalStack, Lambda containers or notification delays.
+
+Usage:
+    python src/tests/local_pipeline.py --reviews 10000 --workers 8
+    python src/tests/local_pipeline.py --input data/reviews_devset.json
+    python src/tests/local_pipeline.py --payload-schema slim --gzip
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import InMemoryDynamoDB, InMemoryLambda, InMemoryS3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.customer_stats import BANNED_INDEX_DEFINITION
+
+LAMBDAS_DIR = os.path.join(os.path.dirname(__file__), "..", "lambdas")
+
+INPUT_BUCKET = "reviews-input"
+PREPROCESSED_BUCKET = "reviews-preprocessed"
+CHECKED_BUCKET = "reviews-checked"
+PROCESSED_BUCKET = "reviews-processed"
+REVIEW_TABLE = "review-metadata"
+STATS_TABLE = "customer-stats"
+SCORE_CACHE_TABLE = "review-score-cache"
+AGGREGATES_TABLE = "review-aggregates"
+
+# bucket -> function it triggers (mirrors setup_s3_notifications.py)
+TRIGGERS = {
+    INPUT_BUCKET: "preprocessing",
+    PREPROCESSED_BUCKET: "profanity_check",
+    CHECKED_BUCKET: "sentiment_analysis",
+}
+
+PARAMS = {
+    "/dic2025/a3/bucket/input": INPUT_BUCKET,
+    "/dic2025/a3/bucket/processed": PROCESSED_BUCKET,
+    "/dic2025/a3/table/review_metadata": REVIEW_TABLE,
+    "/dic2025/a3/table/customer_stats": STATS_TABLE,
+    "/dic2025/a3/table/score_cache": SCORE_CACHE_TABLE,
+    "/dic2025/a3/table/aggregates": AGGREGATES_TABLE,
+}
+
+
+def load_handler(function_name):
+    """Import a fresh copy of ``src/lambdas/<function_name>/handler.py``."""
+    # Handlers create boto3 clients at import time; give them a region
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    path = os.path.join(LAMBDAS_DIR, function_name, "handler.py")
+    spec = importlib.util.spec_from_file_location(f"local_{function_name}_handler", path)
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+class LocalContext:
+    """Minimal stand-in for the Lambda context object."""
+
+    def __init__(self, function_name, timeout_ms=30000):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        self._deadline = time.monotonic() + timeout_ms / 1000.0
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+class LocalPipeline:
+    """The three-stage pipeline running in this process."""
+
+    def __init__(self, workers=0, timeout_ms=30000, quiet=True):
+        self.workers = workers
+        self.timeout_ms = timeout_ms
+        self.quiet = quiet
+        self.s3 = InMemoryS3()
+        self.ddb = InMemoryDynamoDB()
+        self.lambda_client = InMemoryLambda()
+        self.errors = []
+        self.invocations = 0
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+
+        for bucket in (INPUT_BUCKET, PREPROCESSED_BUCKET, CHECKED_BUCKET, PROCESSED_BUCKET):
+            self.s3.create_bucket(Bucket=bucket)
+        self.ddb.create_table(
+            TableName=REVIEW_TABLE,
+            KeySchema=[{"AttributeName": "customerId", "KeyType": "HASH"},
+                       {"AttributeName": "reviewId", "KeyType": "RANGE"}],
+        )
+        self.ddb.create_table(
+            TableName=STATS_TABLE,
+            KeySchema=[{"AttributeName": "customerId", "KeyType": "HASH"}],
+            GlobalSecondaryIndexes=[BANNED_INDEX_DEFINITION],
+        )
+        self.ddb.create_table(
+            TableName=SCORE_CACHE_TABLE,
+            KeySchema=[{"AttributeName": "textHash", "KeyType": "HASH"}],
+        )
+        self.ddb.create_table(
+            TableName=AGGREGATES_TABLE,
+            KeySchema=[{"AttributeName": "shardId", "KeyType": "HASH"}],
+        )
+
+        self.handlers = {}
+        for function_name in TRIGGERS.values():
+            module = load_handler(function_name)
+            self.wire(module)
+            self.handlers[function_name] = module
+
+        for bucket, function_name in TRIGGERS.items():
+            self.s3.subscribe(bucket, lambda event, fn=function_name: self._events.put((fn, event)))
+        # Hand-offs are asynchronous self-invocations; queue them like S3 events
+        self.lambda_client.subscribe(lambda fn, event: self._events.put((fn, event)))
+
+    def wire(self, module):
+        """Point a handler module at the in-memory services (behind its retry policy)."""
+        module.s3 = module.RetryingClient(self.s3, module.retry_policy)
+        if hasattr(module, "ddb"):
+            module.ddb = module.RetryingClient(self.ddb, module.retry_policy)
+        module.lambda_client = module.RetryingClient(self.lambda_client, module.retry_policy)
+        module.get_param = PARAMS.__getitem__
+
+    # ------------------------------------------------------------------
+    def upload(self, review, key=None):
+        """Put one review into the input bucket (queues its S3 event)."""
+        key = key or f"review_{uuid.uuid4()}.json"
+        self.s3.put_object(Bucket=INPUT_BUCKET, Key=key,
+                           Body=json.dumps(review).encode("utf-8"),
+                           ContentType="application/json")
+        return key
+
+    def invoke(self, function_name, event):
+        """Run one handler invocation, recording (not raising) failures."""
+        context = LocalContext(function_name, self.timeout_ms)
+        with self._lock:
+            self.invocations += 1
+        try:
+            return self.handlers[function_name].handler(event, context)
+        except Exception as e:
+            with self._lock:
+                self.errors.append((function_name, event, e))
+            return None
+
+    def run(self):
+        """Dispatch queued events until the pipeline is drained. Returns invocation count."""
+        start = self.invocations
+        output = io.StringIO() if self.quiet else sys.stdout
+        with contextlib.redirect_stdout(output):
+            if self.workers:
+                self._run_threaded()
+            else:
+                while not self._events.empty():
+                    self.invoke(*self._events.get())
+        return self.invocations - start
+
+    def _run_threaded(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            while True:
+                while True:
+                    try:
+                        pending.add(pool.submit(self.invoke, *self._events.get_nowait()))
+                    except queue.Empty:
+                        break
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+
+def synthetic_reviews(count, customers=None, seed=42):
+    """Deterministic synthetic reviews mixing sentiment and profanity."""
+    rng = random.Random(seed)
+    customers = customers or max(1, count // 5)
+    openings = ["I love this product.", "This is terrible, I hate it.", "It is a product.",
+                "Great value and very fast shipping!", "Not good at all, really disappointing.",
+                "This is a fucking bad product, shit."]
+    fillers = ["The box arrived on time.", "My kids use it every day.", "Battery life is fine.",
+               "Would not buy again.", "Quality is excellent for the price."]
+    reviews = []
+    for i in range(count):
+        text = " ".join([rng.choice(openings)] + rng.sample(fillers, rng.randint(0, 3)))
+        reviews.append({
+            "customerId": f"customer_{rng.randrange(customers)}",
+            "reviewId": f"review_{i}",
+            "summary": rng.choice(["Great", "Meh", "Awful", "Five stars"]),
+            "reviewText": text,
+            "overall": rng.randint(1, 5),
+        })
+    return reviews
+
+
+def file_reviews(path, limit=None):
+    """Reviews from a JSONL dataset, mapped to the pipeline's field names."""
+    reviews = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if limit is not None and i >= limit:
+                break
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            raw.setdefault("customerId", raw.get("reviewerID", "unknown"))
+            raw.setdefault("reviewId", f"{raw.get('asin', 'review')}_{i}")
+            reviews.append(raw)
+    return reviews
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the review pipeline in-process against in-memory S3/DynamoDB")
+    parser.add_argument("--reviews", type=int, default=1000, help="number of synthetic reviews")
+    parser.add_argument("--input", help="JSONL file to use instead of synthetic reviews")
+    parser.add_argument("--workers", type=int, default=0, help="thread pool size (0 = sequential FIFO)")
+    parser.add_argument("--payload-schema", default="full",
+                        help="fields passed between stages: full, slim or a comma-separated list")
+    parser.add_argument("--gzip", action="store_true", help="gzip objects in the intermediate buckets")
+    parser.add_argument("--verbose", action="store_true", help="show handler output")
+    args = parser.parse_args()
+    os.environ["PAYLOAD_SCHEMA"] = args.payload_schema
+    os.environ["PAYLOAD_GZIP"] = "1" if args.gzip else "0"
+
+    reviews = file_reviews(args.input, args.reviews) if args.input else synthetic_reviews(args.reviews)
+    pipeline = LocalPipeline(workers=args.workers, quiet=not args.verbose)
+
+    start = time.perf_counter()
+    for review in reviews:
+        pipeline.upload(review)
+    invocations = pipeline.run()
+    elapsed = time.perf_counter() - start
+
+    stats = pipeline.ddb.items(STATS_TABLE)
+    print("=" * 60)
+    print("LOCAL PIPELINE RUN")
+    print("=" * 60)
+    print(f"   Reviews: {len(reviews):,}")
+    print(f"   Handler invocations: {invocations:,} ({len(pipeline.errors)} failed)")
+    print(f"   Elapsed: {elapsed:.2f}s ({len(reviews) / elapsed:,.0f} reviews/s)")
+    print(f"   Processed objects: {len(pipeline.s3.list_objects_v2(Bucket=PROCESSED_BUCKET, MaxKeys=10**9).get('Contents', []))}")
+    print(f"   Banned customers: {sum(1 for item in stats if item.get('banned', {}).get('BOOL'))}")
+    print(f"   S3 calls: {dict(pipeline.s3.call_counts)}")
+    print(f"   S3 bytes per review ({args.payload_schema}{', gzip' if args.gzip else ''}): "
+          f"{sum(pipeline.s3.bytes_in.values()) / len(reviews):,.0f} written, "
+          f"{sum(pipeline.s3.bytes_out.values()) / len(reviews):,.0f} read")
+    for bucket in (INPUT_BUCKET, PREPROCESSED_BUCKET, CHECKED_BUCKET, PROCESSED_BUCKET):
+        print(f"      {bucket:<22}{pipeline.s3.bytes_in[bucket] / len(reviews):>10,.0f} written"
+              f"{pipeline.s3.bytes_out[bucket] / len(reviews):>10,.0f} read")
+    print(f"   DynamoDB calls: {dict(pipeline.ddb.call_counts)}")
+    for function_name, _, error in pipeline.errors[:5]:
+        print(f"   ✗ {function_name}: {error}")
+
+
+if __name__ == "__main__":
+    main()
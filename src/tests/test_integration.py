@@ -140,4 +140,15 @@ class TestReviewPipeline:
         assert item and "sentiment" in item, "Sentiment not stored."
         stats = self.wait_for_ddb(ddb_client, self.STATS_TABLE, {"customerId": {"S": customer_id}}, attr="unpoliteCount")
         assert stats and int(stats["unpoliteCount"]["N"]) >= 1
-        self.cleanup(s3_client, ddb_client, customer_id, review_id, key) 
\ No newline at end of file
+        self.cleanup(s3_client, ddb_client, customer_id, review_id, key)
+
+    def test_scoring_api_sync_invoke(self, lambda_client):
+        event = {"requestContext": {"http": {"method": "POST"}},
+                 "body": json.dumps({"reviews": [{"reviewId": "a", "reviewText": "This is a fucking bad product."},
+                                                 {"reviewId": "b", "reviewText": "I love this product!"}]})}
+        resp = lambda_client.invoke(FunctionName="scoring_api", Payload=json.dumps(event).encode("utf-8"))
+        result = json.loads(resp["Payload"].read())
+        assert result["statusCode"] == 200
+        verdicts = {v["reviewId"]: v for v in json.loads(result["body"])["results"]}
+        assert verdicts["a"]["isUnpolite"] is True and verdicts["a"]["label"] == "negative"
+        assert verdicts["b"]["isUnpolite"] is False and verdicts["b"]["label"] == "positive"
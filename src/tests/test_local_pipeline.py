@@ -0,0 +1,517 @@
+import pytest
+import json
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "infrastructure"))
+
+from local_pipeline import (
+    LocalPipeline, synthetic_reviews, load_handler,
+    INPUT_BUCKET, PREPROCESSED_BUCKET, CHECKED_BUCKET, PROCESSED_BUCKET,
+    REVIEW_TABLE, STATS_TABLE, SCORE_CACHE_TABLE, AGGREGATES_TABLE
+)
+from fakes import InMemoryDynamoDB
+from utils.retry import RetryBudgetExceeded
+from utils.customer_stats import CustomerCounters, list_banned_customers, BANNED_INDEX_DEFINITION
+from utils.ddb_report import pipeline_results, aggregate_results
+from utils.aggregates import read_aggregates
+from utils.reconcile import reconcile_buckets, metadata_gaps
+from backfill_reviews import run_backfill, backfill_event, source_bucket, BackfillCheckpoint
+from utils.sentiment import classify_sentiment, analyze_sentiment
+from utils.profanity import check_profanity
+from utils.text_preprocessing import preprocess
+from utils.vocab import clean_tokens
+
+def review(customer_id, review_id, text):
+    return {
+        "customerId": customer_id,
+        "reviewId": review_id,
+        "summary": "Test summary",
+        "reviewText": text,
+        "overall": 5
+    }
+
+@pytest.fixture
+def pipeline():
+    return LocalPipeline()
+
+def get_review_item(pipeline, customer_id, review_id):
+    return pipeline.ddb.get_item(
+        TableName=REVIEW_TABLE,
+        Key={"customerId": {"S": customer_id}, "reviewId": {"S": review_id}}
+    ).get("Item")
+
+def get_stats_item(pipeline, customer_id):
+    return pipeline.ddb.get_item(
+        TableName=STATS_TABLE,
+        Key={"customerId": {"S": customer_id}}
+    ).get("Item")
+
+def test_full_pipeline_in_process(pipeline):
+    """Test that one upload flows through all three handlers."""
+    key = pipeline.upload(review("c1", "r1", "This is a fucking bad product. I hate it."))
+    assert pipeline.run() == 3
+    assert not pipeline.errors
+
+    processed = json.loads(pipeline.s3.get_object(Bucket=PROCESSED_BUCKET, Key=key)["Body"].read())
+    assert "summary_clean" in processed and "reviewText_clean" in processed
+
+    item = get_review_item(pipeline, "c1", "r1")
+    assert item["isUnpolite"]["BOOL"] is True
+    assert float(item["sentiment"]["N"]) < 0
+    assert "totalLatencyMs" in item and "traceId" in item
+    assert int(get_stats_item(pipeline, "c1")["unpoliteCount"]["N"]) == 1
+
+def test_customer_banning_in_process(pipeline):
+    """Test that a customer is banned after more than 3 unpolite reviews."""
+    for i in range(4):
+        pipeline.upload(review("c2", f"r{i}", "This is a fucking bad review, shit."))
+        pipeline.run()
+    assert get_stats_item(pipeline, "c2")["banned"]["BOOL"] is True
+
+def test_threaded_run_processes_everything():
+    """Test that the thread-pool dispatcher drains the whole pipeline."""
+    pipeline = LocalPipeline(workers=4)
+    reviews = synthetic_reviews(50)
+    for r in reviews:
+        pipeline.upload(r)
+    assert pipeline.run() == 150
+    assert not pipeline.errors
+    listing = pipeline.s3.list_objects_v2(Bucket=PROCESSED_BUCKET)
+    assert listing["KeyCount"] == 50
+    assert all("sentiment" in item for item in pipeline.ddb.items(REVIEW_TABLE))
+
+def test_persistent_result_cache(monkeypatch):
+    """Test that identical texts are scored once and shared through the cache table."""
+    monkeypatch.setenv("RESULT_CACHE_PERSIST", "1")
+    pipeline = LocalPipeline()
+    text = "Great product, works as described. Shit packaging though."
+    for i in range(3):
+        pipeline.upload(review(f"c{i}", f"r{i}", text.replace(" ", "  ") if i else text))
+    pipeline.run()
+    assert not pipeline.errors
+
+    cached = pipeline.ddb.items(SCORE_CACHE_TABLE)
+    assert len(cached) == 1
+    assert cached[0]["isUnpolite"]["BOOL"] is True and "polarity" in cached[0]
+    sentiments = {get_review_item(pipeline, f"c{i}", f"r{i}")["sentiment"]["N"] for i in range(3)}
+    assert len(sentiments) == 1
+    cache = pipeline.handlers["sentiment_analysis"].result_cache
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # A cold container (empty in-process tier) is served from the table
+    cold = LocalPipeline()
+    cold.ddb = pipeline.ddb
+    for module in cold.handlers.values():
+        cold.wire(module)
+    cold.upload(review("c9", "r9", text))
+    cold.run()
+    assert cold.handlers["profanity_check"].result_cache.hits == 1
+
+def test_banned_customers_skip_scoring(monkeypatch):
+    """Test that reviews of banned customers skip the stats update and sentiment."""
+    monkeypatch.setenv("SKIP_BANNED", "1")
+    pipeline = LocalPipeline()
+    for i in range(4):
+        pipeline.upload(review("c3", f"r{i}", "This is a fucking bad review, shit."))
+        pipeline.run()
+    assert get_stats_item(pipeline, "c3")["banned"]["BOOL"] is True
+
+    get_items = pipeline.ddb.call_counts["GetItem"]
+    pipeline.upload(review("c3", "r4", "Another shit review."))
+    pipeline.upload(review("c4", "r5", "A fine product."))
+    pipeline.run()
+    assert not pipeline.errors
+    # Existing-review checks for both, plus one confirmation of the filter hit on c3
+    assert pipeline.ddb.call_counts["GetItem"] - get_items == 3
+    assert pipeline.handlers["profanity_check"].banned_customers.confirmations == 1
+    assert int(get_stats_item(pipeline, "c3")["unpoliteCount"]["N"]) == 4
+    assert "sentiment" not in get_review_item(pipeline, "c3", "r4")
+    assert "sentiment" in get_review_item(pipeline, "c4", "r5")
+
+def test_banned_customers_sparse_index(pipeline):
+    """Test that only banned customers are in the sparse index and are listed by Query."""
+    for customer_id in ("c5", "c6", "c7"):
+        for i in range(4 if customer_id != "c6" else 2):
+            pipeline.upload(review(customer_id, f"{customer_id}_r{i}", "This is a fucking bad review, shit."))
+    pipeline.run()
+    assert "bannedStatus" not in get_stats_item(pipeline, "c6")
+
+    pipeline.ddb.call_counts.clear()
+    assert list_banned_customers(pipeline.ddb, STATS_TABLE, page_size=1) == ["c5", "c7"]
+    assert pipeline.ddb.call_counts["Scan"] == 0
+    assert pipeline.ddb.call_counts["Query"] == 2  # one page per banned customer
+
+def test_pipeline_results_from_tables():
+    """Test that the segmented-scan report matches the items the pipeline wrote."""
+    pipeline = LocalPipeline()
+    for r in synthetic_reviews(60, customers=5):
+        pipeline.upload(r)
+    pipeline.run()
+    reviews = pipeline.ddb.items(REVIEW_TABLE)
+    stats = pipeline.ddb.items(STATS_TABLE)
+
+    pipeline.ddb.call_counts.clear()
+    results = pipeline_results(pipeline.ddb, REVIEW_TABLE, STATS_TABLE, segments=3)
+    assert pipeline.ddb.call_counts["Scan"] == 6
+    summary = results["summary"]
+    assert summary["total_reviews"] == 60
+    assert summary["profane_reviews"] == sum(item["isUnpolite"]["BOOL"] for item in reviews)
+    assert summary["sentiment_counts"]["negative"] == sum(
+        classify_sentiment(float(item["sentiment"]["N"])) == "negative" for item in reviews)
+    assert sum(summary["sentiment_counts"].values()) == 60
+    assert results["banned_customers"] == sorted(
+        item["customerId"]["S"] for item in stats if item["banned"]["BOOL"])
+    assert results["banned_customers"]
+
+def test_aggregate_counters_match_scan():
+    """Test that the sharded aggregate counters agree with a scan of the tables."""
+    pipeline = LocalPipeline(workers=4)
+    for r in synthetic_reviews(80, customers=6):
+        pipeline.upload(r)
+    pipeline.run()
+    assert not pipeline.errors
+    assert 1 < len(pipeline.ddb.items(AGGREGATES_TABLE)) <= 10
+
+    pipeline.ddb.call_counts.clear()
+    counted = aggregate_results(pipeline.ddb, AGGREGATES_TABLE, STATS_TABLE)
+    assert pipeline.ddb.call_counts["Scan"] == 1
+    scanned = pipeline_results(pipeline.ddb, REVIEW_TABLE, STATS_TABLE)
+    for field in ("total_reviews", "sentiment_counts", "profane_reviews", "unscored_reviews"):
+        assert counted["summary"][field] == scanned["summary"][field]
+    assert counted["banned_customers"] == scanned["banned_customers"]
+    assert read_aggregates(pipeline.ddb, AGGREGATES_TABLE)["banned"] == len(scanned["banned_customers"])
+
+def test_hot_customer_counters_under_concurrency():
+    """Test that concurrent increments of a hot customer are sharded and none are lost."""
+    ddb = InMemoryDynamoDB()
+    ddb.create_table(TableName=STATS_TABLE, KeySchema=[{"AttributeName": "customerId", "KeyType": "HASH"}],
+                     GlobalSecondaryIndexes=[BANNED_INDEX_DEFINITION])
+    counters = CustomerCounters(shards=4, hot_rate=5)
+    customers = ["bot"] * 200 + ["regular"] * 3
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda c: counters.record_unpolite(ddb, STATS_TABLE, c), customers))
+
+    items = {item["customerId"]["S"]: item for item in ddb.items(STATS_TABLE)}
+    shards = [item for item in items.values() if item.get("shardOf", {}).get("S") == "bot"]
+    assert shards and "counterShards" in items["bot"]
+    assert int(items["bot"]["unpoliteCount"]["N"]) + sum(int(i["unpoliteCount"]["N"]) for i in shards) == 200
+    assert sum(newly_banned for _, _, newly_banned in results) == 1
+    # Normal customers keep the single-item path
+    assert int(items["regular"]["unpoliteCount"]["N"]) == 3
+    assert "counterShards" not in items["regular"] and items["regular"]["banned"]["BOOL"] is False
+    assert list_banned_customers(ddb, STATS_TABLE) == ["bot"]
+
+def test_sharded_customer_cache_is_bounded():
+    """Test that the per-container cache of sharded customers is an LRU and evictions keep counts right."""
+    ddb = LocalPipeline().ddb
+    counters = CustomerCounters(shards=2, hot_rate=0.5, window=2, maxsize=2)
+    for customer in ("a", "b", "c", "a"):
+        for _ in range(2):
+            counters.record_unpolite(ddb, STATS_TABLE, customer)
+    assert list(counters._sharded) == ["c", "a"]
+
+    count, _, _ = counters.record_unpolite(ddb, STATS_TABLE, "b")
+    assert count == 3 and list(counters._sharded) == ["a", "b"]
+
+class PartialBatchDynamoDB:
+    """Leaves the last key of the first *throttled* BatchGetItem requests unprocessed."""
+
+    def __init__(self, ddb, throttled):
+        self._ddb = ddb
+        self.throttled = throttled
+        self.requests = []
+
+    def __getattr__(self, name):
+        return getattr(self._ddb, name)
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        self.requests.append(RequestItems)
+        if self.throttled <= 0:
+            return self._ddb.batch_get_item(RequestItems=RequestItems, **kwargs)
+        self.throttled -= 1
+        (table, request), = RequestItems.items()
+        response = self._ddb.batch_get_item(RequestItems={table: dict(request, Keys=request["Keys"][:-1])})
+        response["UnprocessedKeys"] = {table: dict(request, Keys=request["Keys"][-1:])}
+        return response
+
+def test_sharded_total_consistent_and_complete():
+    """Test that sharded ban decisions use consistent reads and retry unprocessed keys."""
+    ddb = InMemoryDynamoDB()
+    ddb.create_table(TableName=STATS_TABLE, KeySchema=[{"AttributeName": "customerId", "KeyType": "HASH"}],
+                     GlobalSecondaryIndexes=[BANNED_INDEX_DEFINITION])
+    # The second write within the window makes "bot" hot and sharded
+    partial = PartialBatchDynamoDB(ddb, throttled=3)
+    counters = CustomerCounters(shards=4, hot_rate=0.5, window=2)
+    results = [counters.record_unpolite(partial, STATS_TABLE, "bot") for _ in range(5)]
+
+    assert partial.requests and all(r[STATS_TABLE]["ConsistentRead"] for r in partial.requests)
+    assert [count for count, _, _ in results] == [1, 2, 3, 4, 5]
+    assert [newly for _, _, newly in results] == [False, False, False, True, False]
+    assert partial.throttled == 0 and len(partial.requests) == 4 + 3
+    assert list_banned_customers(ddb, STATS_TABLE) == ["bot"]
+
+    partial.throttled = 3
+    with pytest.raises(RetryBudgetExceeded):
+        counters._sharded_total(partial, STATS_TABLE, "bot", 4, max_rounds=3, base_delay=0)
+
+def test_backfill_rescores_stored_reviews(tmp_path, monkeypatch):
+    """Test that a backfill rescores every stored review once and resumes from its checkpoint."""
+    pipeline = LocalPipeline()
+    reviews = synthetic_reviews(40)
+    for r in reviews:
+        pipeline.upload(r)
+    pipeline.run()
+    stats_before = pipeline.ddb.items(STATS_TABLE)
+
+    # A changed word list: only "disappointing" is profane now
+    monkeypatch.setattr(pipeline.handlers["profanity_check"], "check_profanity", lambda text: "disappointing" in text)
+    dispatched = []
+    def dispatch(keys):
+        dispatched.extend(keys)
+        pipeline.invoke("profanity_check", backfill_event(PREPROCESSED_BUCKET, keys, rescore=True))
+
+    dry = run_backfill(pipeline.s3, PROCESSED_BUCKET, dispatch, dry_run=True)
+    assert dry["keys"] == 40 and not dispatched
+
+    path = str(tmp_path / "backfill.json")
+    done = run_backfill(pipeline.s3, PROCESSED_BUCKET, dispatch, batch_size=7, concurrency=4,
+                        checkpoint=BackfillCheckpoint(path, PROCESSED_BUCKET, "profanity_check"))
+    assert not pipeline.errors
+    assert done["keys"] == 40 and len(set(dispatched)) == 40
+    texts = {r["reviewId"]: r["reviewText"] for r in reviews}
+    for item in pipeline.ddb.items(REVIEW_TABLE):
+        assert item["isUnpolite"]["BOOL"] == ("disappointing" in texts[item["reviewId"]["S"]])
+    assert pipeline.ddb.items(STATS_TABLE) == stats_before
+    assert read_aggregates(pipeline.ddb, AGGREGATES_TABLE)["profane"] == sum(
+        "disappointing" in text for text in texts.values())
+
+    resumed = run_backfill(pipeline.s3, PROCESSED_BUCKET, dispatch,
+                           checkpoint=BackfillCheckpoint(path, PROCESSED_BUCKET, "profanity_check"))
+    assert resumed["keys"] == 0
+
+    # Keys are listed from the function's source bucket or a later stage's, never an earlier one
+    assert source_bucket("profanity_check", PROCESSED_BUCKET) == PREPROCESSED_BUCKET
+    assert source_bucket("sentiment_analysis", CHECKED_BUCKET) == CHECKED_BUCKET
+    with pytest.raises(ValueError):
+        source_bucket("sentiment_analysis", PREPROCESSED_BUCKET)
+
+def test_reconcile_stage_backlog(pipeline):
+    """Test that the bucket merge-join reports the objects stuck at each stage."""
+    for r in synthetic_reviews(10):
+        pipeline.upload(r)
+    pipeline.run()
+    stuck_input = pipeline.upload(review("c8", "r1", "Waiting for preprocessing."))
+    stuck_checked = pipeline.upload(review("c8", "r2", "Waiting for the profanity check."))
+    pipeline.s3.put_object(Bucket=PREPROCESSED_BUCKET, Key=stuck_checked, Body=b"{}")
+
+    report = reconcile_buckets(pipeline.s3, page_size=3)
+    assert report["objects"][INPUT_BUCKET] == 12 and report["objects"][PROCESSED_BUCKET] == 10
+    backlog = {entry["stage"]: entry for entry in report["stages"]}
+    assert backlog["preprocessing"]["backlog"] == 1 and backlog["preprocessing"]["sample"] == [stuck_input]
+    assert backlog["profanity_check"]["backlog"] == 1 and backlog["profanity_check"]["oldest_key"] == stuck_checked
+    assert backlog["sentiment_analysis"]["backlog"] == 0
+    assert backlog["preprocessing"]["oldest_age_seconds"] >= 0
+    assert metadata_gaps(pipeline.ddb, REVIEW_TABLE) == {"rows": 10, "missing_isUnpolite": 0, "missing_sentiment": 0}
+
+class ThrottlingDynamoDB:
+    """Throttles every other DynamoDB write of the wrapped client."""
+
+    def __init__(self, ddb):
+        self._ddb = ddb
+        self.writes = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._ddb, name)
+        if name not in ("put_item", "update_item"):
+            return attr
+
+        def write(**kwargs):
+            self.writes += 1
+            if self.writes % 2:
+                self._ddb.exceptions.raise_error("ProvisionedThroughputExceededException", "Rate exceeded", name)
+            return attr(**kwargs)
+        return write
+
+def test_handlers_retry_throttled_writes(pipeline):
+    """Test that throttled DynamoDB writes are retried without failing the S3 event."""
+    ddb = pipeline.ddb
+    pipeline.ddb = ThrottlingDynamoDB(ddb)
+    for module in pipeline.handlers.values():
+        module.retry_policy.base_delay = 0
+        pipeline.wire(module)
+    for i in range(5):
+        pipeline.upload(review("c9", f"r{i}", "This is a fucking bad review, shit."))
+    pipeline.run()
+
+    assert not pipeline.errors
+    assert int(ddb.get_item(TableName=STATS_TABLE, Key={"customerId": {"S": "c9"}})["Item"]["unpoliteCount"]["N"]) == 5
+    retries = sum(module.retry_policy.metrics["throttle"] for module in pipeline.handlers.values())
+    assert retries * 2 == pipeline.ddb.writes
+
+class ThrottledAggregatesDynamoDB:
+    """Throttles the next *failures* transactions that write to the aggregates table."""
+
+    def __init__(self, ddb):
+        self._ddb = ddb
+        self.failures = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._ddb, name)
+        if name != "transact_write_items":
+            return attr
+
+        def write(TransactItems, **kwargs):
+            tables = {request["TableName"] for entry in TransactItems for request in entry.values()}
+            if AGGREGATES_TABLE in tables and self.failures:
+                self.failures -= 1
+                self._ddb.exceptions.raise_error("ProvisionedThroughputExceededException", "Rate exceeded", name)
+            return attr(TransactItems=TransactItems, **kwargs)
+        return write
+
+def test_aggregate_write_failures_are_retried_exactly_once(pipeline):
+    """Test that records whose aggregate count failed finish the pipeline and are counted once when retried."""
+    ddb = pipeline.ddb
+    pipeline.ddb = ThrottledAggregatesDynamoDB(ddb)
+    for module in pipeline.handlers.values():
+        module.retry_policy.base_delay = 0
+        module.retry_policy.max_attempts = 2
+        pipeline.wire(module)
+    text = "This is a fucking bad review, shit."
+    pipeline.upload(review("c9", "r0", text))
+    pipeline.upload(review("c9", "r1", "I love this product."))
+
+    # Each stage's first attempt gives up on the count; S3 redelivers the event
+    for stage in ("profanity_check", "sentiment_analysis"):
+        pipeline.ddb.failures = 2
+        pipeline.run()
+        assert [name for name, _, _ in pipeline.errors] == [stage]
+        assert isinstance(pipeline.errors[0][2], RetryBudgetExceeded)
+        _, event, _ = pipeline.errors.pop()
+        pipeline.invoke(stage, event)
+        assert not pipeline.errors
+    pipeline.run()
+
+    assert not pipeline.errors
+    assert len(pipeline.s3.list_objects_v2(Bucket=PROCESSED_BUCKET).get("Contents", [])) == 2
+    totals = read_aggregates(ddb, AGGREGATES_TABLE)
+    assert totals["reviews"] == 2 and totals["profane"] == 1 and totals["banned"] == 0
+    labels = [classify_sentiment(analyze_sentiment(t)) for t in (text, "I love this product.")]
+    assert sum(totals[label] for label in ("positive", "neutral", "negative")) == 2
+    for label in set(labels):
+        assert totals[label] == labels.count(label)
+
+class ShrinkingContext:
+    """Lambda context whose remaining time drops by *step_ms* on every query."""
+
+    def __init__(self, function_name, remaining_ms, step_ms):
+        self.function_name = function_name
+        self.aws_request_id = "shrinking"
+        self.remaining_ms = remaining_ms
+        self.step_ms = step_ms
+
+    def get_remaining_time_in_millis(self):
+        remaining, self.remaining_ms = self.remaining_ms, max(0, self.remaining_ms - self.step_ms)
+        return remaining
+
+def test_handler_hands_off_records_near_deadline(pipeline):
+    """Test that records left when time runs short are re-invoked and processed exactly once."""
+    keys = []
+    for i in range(5):
+        key = f"review_{i}.json"
+        keys.append(key)
+        pipeline.s3.put_object(Bucket=PREPROCESSED_BUCKET, Key=key,
+                               Body=json.dumps(review("c8", f"r{i}", "A fine product.")).encode("utf-8"))
+    while not pipeline._events.empty():
+        pipeline._events.get()
+    event = backfill_event(PREPROCESSED_BUCKET, keys)
+    del event["backfill"]
+
+    # Remaining time: 30s at the start, then 20s, 10s and 0s between records (margin 5s)
+    context = ShrinkingContext("profanity_check", 30000, 10000)
+    result = pipeline.handlers["profanity_check"].handler(event, context)
+    assert result == {"status": "handed_off", "processed": 3, "handedOff": 2}
+    assert pipeline.lambda_client.call_counts["Invoke"] == 1
+
+    queued = list(pipeline._events.queue)
+    handed_off = [event for fn, event in queued if fn == "profanity_check"]
+    assert len(handed_off) == 1 and handed_off[0]["handoff"] == {"depth": 1}
+    assert [r["s3"]["object"]["key"] for r in handed_off[0]["Records"]] == keys[3:]
+    pipeline.run()
+
+    assert not pipeline.errors
+    assert pipeline.s3.call_counts["GetObject"] == 10  # each review read once by both functions
+    assert len(pipeline.s3.list_objects_v2(Bucket=PROCESSED_BUCKET).get("Contents", [])) == 5
+    assert all("sentiment" in get_review_item(pipeline, "c8", f"r{i}") for i in range(5))
+
+def test_slim_gzip_payloads_keep_results(monkeypatch):
+    """Test that slim, gzipped inter-stage payloads give the same results with fewer bytes."""
+    reviews = synthetic_reviews(40, customers=5)
+    runs = {}
+    for schema, gzipped in (("full", "0"), ("slim", "1")):
+        monkeypatch.setenv("PAYLOAD_SCHEMA", schema)
+        monkeypatch.setenv("PAYLOAD_GZIP", gzipped)
+        pipeline = LocalPipeline()
+        for i, r in enumerate(reviews):
+            pipeline.upload(r, key=f"review_{i}.json")
+        pipeline.run()
+        assert not pipeline.errors
+        runs[schema] = pipeline
+
+    full, slim = runs["full"], runs["slim"]
+    verdicts = lambda p: sorted((i["reviewId"]["S"], i["isUnpolite"]["BOOL"], i["sentiment"]["N"])
+                                for i in p.ddb.items(REVIEW_TABLE))
+    assert verdicts(slim) == verdicts(full)
+    assert pipeline_results(slim.ddb, REVIEW_TABLE, STATS_TABLE) == pipeline_results(full.ddb, REVIEW_TABLE, STATS_TABLE)
+
+    checked = slim.s3.get_object(Bucket=CHECKED_BUCKET, Key="review_0.json")
+    assert checked["ContentEncoding"] == "gzip"
+    processed = slim.s3.get_object(Bucket=PROCESSED_BUCKET, Key="review_0.json")
+    assert "ContentEncoding" not in processed
+    assert set(json.loads(processed["Body"].read())) == {"customerId", "reviewId", "reviewText", "_trace"}
+    for bucket in (PREPROCESSED_BUCKET, CHECKED_BUCKET):
+        assert slim.s3.bytes_in[bucket] < full.s3.bytes_in[bucket] * 0.6
+
+def test_vocabulary_encoded_token_lists(monkeypatch):
+    """Test that TOKEN_ENCODING=vocab stores token lists as IDs that decode to the plain lists."""
+    text = "Great value and very fast shipping! The box arrived on time, zorblax."
+    monkeypatch.setenv("TOKEN_ENCODING", "vocab")
+    pipeline = LocalPipeline()
+    key = pipeline.upload(review("c1", "r1", text))
+    pipeline.run()
+    assert not pipeline.errors
+
+    processed = json.loads(pipeline.s3.get_object(Bucket=PROCESSED_BUCKET, Key=key)["Body"].read())
+    assert processed["tokenVocab"] == "v1" and "zorblax" in processed["reviewText_clean"]["oov"]
+    assert clean_tokens(processed, "reviewText_clean") == preprocess(text)
+    assert "sentiment" in get_review_item(pipeline, "c1", "r1")
+
+def test_scoring_api_inline_verdicts():
+    """Test that the scoring API returns the pipeline's verdicts inline and rejects bad requests."""
+    api = load_handler("scoring_api")
+
+    def call(body, method="POST"):
+        event = {"requestContext": {"http": {"method": method}}, "body": json.dumps(body), "isBase64Encoded": False}
+        result = api.handler(event, None)
+        return result["statusCode"], json.loads(result["body"])
+
+    reviews = synthetic_reviews(20)
+    status, body = call({"reviews": reviews})
+    assert status == 200 and len(body["results"]) == 20
+    for r, verdict in zip(reviews, body["results"]):
+        assert verdict["reviewId"] == r["reviewId"]
+        assert verdict["isUnpolite"] == check_profanity(r["reviewText"])
+        assert verdict["sentiment"] == analyze_sentiment(r["reviewText"])
+        assert verdict["label"] == classify_sentiment(verdict["sentiment"])
+
+    status, body = call({"reviewText": "This is a fucking bad product."})
+    assert status == 200 and body["isUnpolite"] is True and body["label"] == "negative"
+    assert call([{"reviewText": "I love it."}])[1]["results"][0]["label"] == "positive"
+
+    assert call({"reviews": []})[0] == 400
+    assert call({"summary": "no text"})[0] == 400
+    assert call({"reviews": [{"reviewText": "x"}] * (api.MAX_REVIEWS + 1)})[0] == 400
+    assert api.handler({"requestContext": {"http": {"method": "POST"}}, "body": "{not json"}, None)["statusCode"] == 400
+    assert call({"reviewText": "x"}, method="GET")[0] == 405
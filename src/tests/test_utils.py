@@ -1,12 +1,33 @@
 import pytest
+import gzip
+import bz2
+import lzma
+import json
 import sys
 import os
+import random
+import threading
+import time
+from collections import Counter
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from utils.text_preprocessing import preprocess
-from utils.sentiment import analyze_sentiment
+from utils.sentiment import analyze_sentiment, classify_sentiment
+from utils.review_analyzer import analyze_reviews
+from utils.columnar_output import ColumnarWriter, ColumnarReader
+from utils.jsonl_scanner import scan_reviews, scan_buffer, chunk_offsets, line_batches, prefetch
+from utils.api_accounting import ApiCallAccountant, merge_snapshots, cost_model
+from utils.sketches import HeavyHitterSketch, SpaceSaving, count_min_width
+from utils.group_by import GroupByAggregator, parse_group_by
+from utils.quantiles import KLLSketch, PolarityHistogram
+from utils.near_duplicates import NearDuplicateIndex
+from utils.result_cache import ResultCache, text_key
+from utils.banned_filter import BloomFilter
+from utils.retry import RetryPolicy, RetryingClient, RetryBudgetExceeded, classify
+from utils.tracing import enter_stage, exit_stage, latency_breakdown, s3_metadata
+from utils.vocab import Vocabulary, pack_varints, unpack_varints, clean_tokens, TOKEN_VOCAB_FIELD
 
 def test_text_preprocessing():
     """Test text preprocessing functionality."""
@@ -55,4 +76,525 @@ def test_preprocessing_empty_text():
 def test_sentiment_empty_text():
     """Test sentiment analysis with empty text."""
     result = analyze_sentiment("")
-    assert result == 0.0 
\ No newline at end of file
+    assert result == 0.0 
+
+
+def test_trace_latency_breakdown():
+    """Test per-hop latency derivation from stage stamps."""
+    trace = {
+        "traceId": "abc",
+        "stages": {
+            "preprocessing": {"event": 1000, "enter": 1050, "exit": 1100},
+            "profanity_check": {"event": 1120, "enter": 1300, "exit": 1320},
+            "sentiment_analysis": {"event": 1340, "enter": 1400, "exit": 1450},
+        }
+    }
+    total, hops = latency_breakdown(trace)
+    assert total == 450
+    assert hops == {
+        "upload->preprocessing": 50,
+        "preprocessing": 50,
+        "preprocessing->profanity_check": 200,
+        "profanity_check": 20,
+        "profanity_check->sentiment_analysis": 80,
+        "sentiment_analysis": 50,
+    }
+
+
+def test_trace_id_propagation():
+    """Test that stages reuse the trace ID from the payload or S3 metadata."""
+    review = {}
+    trace = enter_stage(review, "preprocessing", {"eventTime": "1970-01-01T00:00:01.000Z"}, {"trace-id": "t-1"})
+    assert trace["traceId"] == "t-1"
+    assert trace["stages"]["preprocessing"]["event"] == 1000
+    exit_stage(review, "preprocessing")
+    assert s3_metadata(review)["trace-id"] == "t-1"
+    assert enter_stage(review, "profanity_check")["traceId"] == "t-1"
+
+
+def test_api_call_accounting():
+    """Test that instrumented clients tally calls and consumed capacity."""
+    import boto3
+    from botocore.awsrequest import AWSResponse
+
+    client = boto3.client("dynamodb", region_name="us-east-1",
+                          aws_access_key_id="test", aws_secret_access_key="test")
+    accountant = ApiCallAccountant("profanity_check").instrument(client)
+
+    sent = []
+
+    class RawBody:
+        def __init__(self, data):
+            self.data = data
+
+        def stream(self, **kwargs):
+            yield self.data
+
+    def fake_send(request, **kwargs):
+        sent.append(json.loads(request.body))
+        body = b'{"ConsumedCapacity": {"TableName": "customer-stats", "CapacityUnits": 0.5}}'
+        return AWSResponse(request.url, 200, {"content-length": str(len(body))}, RawBody(body))
+
+    client.meta.events.register("before-send.dynamodb.*", fake_send)
+    client.get_item(TableName="customer-stats", Key={"customerId": {"S": "c1"}})
+    accountant.record_reviews()
+
+    assert sent[0]["ReturnConsumedCapacity"] == "TOTAL"
+    entry = accountant.snapshot()["operations"]["dynamodb:GetItem"]
+    assert entry["calls"] == 1 and entry["attempts"] == 1
+    assert entry["capacity_units"] == 0.5
+
+    model = cost_model(merge_snapshots([accountant.snapshot()]))
+    assert model["per_review"]["capacity_units"] == 0.5
+
+
+def test_review_details_columns():
+    """Test that the columnar review details behave like per-review dicts."""
+    reviews = [
+        {"reviewerID": "A1", "reviewText": "I love this product.", "summary": "Great", "overall": 5.0},
+        {"reviewerID": "A2", "reviewText": "This is shit.", "summary": "Bad", "overall": 1.0},
+        {"reviewerID": "A1", "reviewText": "It is a product.", "summary": "", "overall": 3.0},
+    ]
+    details = analyze_reviews(reviews)['review_details']
+    assert len(details) == 3
+    assert details[0]['reviewerID'] == "A1" and details[0]['sentiment'] == 'positive'
+    assert details[1]['is_profane'] is True and details[-1]['is_profane'] is False
+    assert [row['overall'] for row in details] == [5.0, 1.0, 3.0]
+    assert details.reviewer[0] == details.reviewer[2]
+
+    # Non-str IDs share the entry of their str form
+    for reviewer_id in (7, "7", 7, None, "None"):
+        details.append(reviewer_id, "neutral", 0.0, False, 3.0)
+    assert len(details._reviewer_ids) == 4
+    assert details[3]['reviewerID'] == "7" and details.reviewer[3] == details.reviewer[5]
+
+    assert analyze_reviews(reviews, keep_details=False)['review_details'] is None
+
+
+def test_columnar_output_roundtrip(tmp_path):
+    """Test that streamed column files read back through memory maps."""
+    directory = str(tmp_path / "columns")
+    with ColumnarWriter(directory, chunk_rows=2) as writer:
+        writer.append("A1", "positive", 0.5, False, 5.0)
+        writer.append("A2", "negative", -1.0, True, 1.0)
+        writer.append("A1", "neutral", 0.0, False, 3.0)
+        writer.append(7, "neutral", 0.0, False, 3.0)
+        writer.append("7", "neutral", 0.0, False, 3.0)
+
+    with open(os.path.join(directory, "reviewer_ids.txt"), encoding="utf-8") as f:
+        assert f.read().split() == ["A1", "A2", "7"]
+    with ColumnarReader(directory) as reader:
+        assert len(reader) == 5
+        assert reader.row(3)["reviewerID"] == reader.row(4)["reviewerID"] == "7"
+        assert sum(reader.column("is_profane")) == 1
+        assert list(reader.column("polarity")) == [0.5, -1.0, 0.0, 0.0, 0.0]
+        assert reader.row(2) == {"reviewerID": "A1", "sentiment": "neutral", "polarity": 0.0,
+                                 "is_profane": False, "overall": 3.0}
+
+
+def test_columnar_resume_with_torn_reviewer_ids(tmp_path):
+    """Test that resuming drops a torn last line and IDs of discarded rows from reviewer_ids.txt."""
+    directory = str(tmp_path / "columns")
+    with ColumnarWriter(directory, chunk_rows=2) as writer:
+        for reviewer_id in ["A1", "A2", "A1", "A3"]:
+            writer.append(reviewer_id, "neutral", 0.0, False, 3.0)
+    # Crash while writing the IDs of a later, never committed chunk
+    with open(tmp_path / "columns" / "reviewer_ids.txt", "a", encoding="utf-8") as f:
+        f.write("A4\nA5-tor")
+
+    with ColumnarWriter(directory, chunk_rows=2, resume_rows=2) as writer:
+        for reviewer_id in ["A3", "A2", "A6"]:
+            writer.append(reviewer_id, "neutral", 0.0, False, 3.0)
+
+    with ColumnarReader(directory) as reader:
+        assert reader.reviewer_ids == ["A1", "A2", "A3", "A6"]
+        assert [reader.row(i)["reviewerID"] for i in range(len(reader))] == ["A1", "A2", "A3", "A2", "A6"]
+
+
+def test_resume_from_checkpoint(tmp_path, monkeypatch):
+    """Test that an interrupted analysis resumes to the same result."""
+    from utils import review_analyzer
+
+    input_file = tmp_path / "reviews.json"
+    texts = ["I love it.", "This is shit.", "It is a product.", "Terrible, I hate it."]
+    with open(input_file, "w") as f:
+        for i in range(12):
+            f.write(json.dumps({"reviewerID": f"A{i % 3}", "reviewText": texts[i % 4],
+                                "summary": "", "overall": 3.0}) + "\n")
+
+    expected_file = tmp_path / "expected.json"
+    review_analyzer.main(["--input", str(input_file), "--output", str(expected_file)])
+
+    output_file = tmp_path / "out.json"
+    real_analyze_review = review_analyzer.analyze_review
+    calls = []
+
+    def crashing_analyze_review(stats, review, writer=None):
+        calls.append(review)
+        if len(calls) == 8:
+            raise KeyboardInterrupt
+        real_analyze_review(stats, review, writer)
+
+    monkeypatch.setattr(review_analyzer, "analyze_review", crashing_analyze_review)
+    with pytest.raises(KeyboardInterrupt):
+        review_analyzer.main(["--input", str(input_file), "--output", str(output_file),
+                              "--checkpoint-every", "5"])
+    monkeypatch.setattr(review_analyzer, "analyze_review", real_analyze_review)
+
+    checkpoint = json.loads((tmp_path / "out.json.checkpoint").read_text())
+    assert checkpoint["summary"]["total_reviews"] == 5
+
+    review_analyzer.main(["--input", str(input_file), "--output", str(output_file), "--resume"])
+    expected = json.loads(expected_file.read_text())
+    resumed = json.loads(output_file.read_text())
+    assert resumed["summary"] == expected["summary"]
+    assert resumed["customer_profanity_counts"] == expected["customer_profanity_counts"]
+    assert not (tmp_path / "out.json.checkpoint").exists()
+
+
+def test_jsonl_scanner_chunks(tmp_path):
+    """Test field extraction and that byte-range chunks cover every line exactly once."""
+    reviews = [
+        {"reviewerID": "A1", "asin": "X", "reviewText": 'He said \\"hi\\" \u00e9', "summary": "ok", "overall": 5.0},
+        {"reviewerID" : "A2", "reviewText": "spaced key", "summary": None, "overall": 1},
+        {"reviewerID": "A3", "reviewText": "no summary", "overall": 3.0, "helpful": [0, 1]},
+    ] * 20
+    input_file = tmp_path / "reviews.json"
+    with open(input_file, "w", encoding="utf-8") as f:
+        for review in reviews:
+            f.write(json.dumps(review) + "\n\n")
+
+    records = [record for record, _ in scan_reviews(str(input_file))]
+    assert len(records) == len(reviews)
+    assert records[0] == {"reviewerID": "A1", "reviewText": 'He said \\"hi\\" \u00e9', "summary": "ok",
+                          "overall": 5.0, "asin": "X"}
+    assert records[1]["reviewerID"] == "A2" and records[1]["summary"] is None
+    assert "summary" not in records[2] and "helpful" not in records[2]
+
+    chunks = chunk_offsets(str(input_file), 7)
+    assert chunks[0][0] == 0 and chunks[-1][1] == os.path.getsize(input_file)
+    chunked = [record for start, end in chunks for record, _ in scan_reviews(str(input_file), start, end)]
+    assert chunked == records
+
+
+@pytest.mark.parametrize("opener", [gzip.open, bz2.open, lzma.open])
+def test_compressed_input(tmp_path, opener):
+    """Test that compressed files are detected by content and resume at decompressed offsets."""
+    lines = [json.dumps({"reviewerID": f"A{i}", "reviewText": "x" * i, "summary": "s", "overall": 4.0})
+             for i in range(200)]
+    plain_file = tmp_path / "reviews.json"
+    plain_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    compressed_file = tmp_path / "reviews.archive"  # no telling extension
+    with opener(compressed_file, "wb") as f:
+        f.write(plain_file.read_bytes())
+
+    expected = list(scan_reviews(str(plain_file)))
+    assert list(scan_reviews(str(compressed_file))) == expected
+
+    resume_at = expected[120][1]
+    assert list(scan_reviews(str(compressed_file), resume_at)) == expected[121:]
+    batches = list(line_batches(str(compressed_file), batch_bytes=1000))
+    assert all(data.endswith(b"\n") for _, data in batches)
+    assert b"".join(data for _, data in batches) == plain_file.read_bytes()
+
+
+def test_heavy_hitter_sketch_merge():
+    """Test that merged sketches never undercount and keep the heaviest keys."""
+    left, right = HeavyHitterSketch(width=256, capacity=20), HeavyHitterSketch(width=256, capacity=20)
+    truth = {}
+    for i in range(3000):
+        key = f"C{i % 7}" if i % 2 == 0 else f"U{i}"
+        truth[key] = truth.get(key, 0) + 1
+        (left if i % 5 < 2 else right).add(key)
+
+    merged = left.merge(HeavyHitterSketch.from_dict(right.to_dict()))
+    assert all(merged.estimate(key) >= count for key, count in truth.items())
+    assert {key for key, _ in merged.top(7)} == {f"C{i}" for i in range(7)}
+    assert abs(merged.distinct_count() - len(truth)) < 0.05 * len(truth)
+
+
+def test_space_saving_at_realistic_capacity():
+    """Test Space-Saving guarantees and eviction cost with 10,000 counters and mostly unique keys."""
+    rng = random.Random(7)
+    capacity, adds = 10000, 300000
+    stream = [f"hot{rng.randrange(20)}" if rng.random() < 0.1 else f"c{rng.randrange(10**8)}" for _ in range(adds)]
+    truth = Counter(stream)
+
+    sketch = SpaceSaving(capacity)
+    start = time.perf_counter()
+    for key in stream:
+        sketch.add(key)
+    elapsed = time.perf_counter() - start
+
+    floor = min(sketch.counts.values())
+    assert len(sketch.counts) == capacity and sum(sketch.counts.values()) == adds
+    assert all(truth[key] <= count <= truth[key] + floor for key, count in sketch.counts.items())
+    assert all(key in sketch.counts for key, count in truth.items() if count > adds / capacity)
+    assert {key for key, _ in sketch.top(20)} == {f"hot{i}" for i in range(20)}
+    # ~270,000 evictions; a scan of all counters per eviction takes minutes
+    assert elapsed < 10
+
+
+def test_sketch_sized_from_stream_keeps_candidates_few():
+    """Test that a Count-Min sketch sized for the stream keeps low-count customers below the ban threshold."""
+    rng = random.Random(3)
+    expected = 200000
+    stream = [f"c{rng.randrange(150000)}" for _ in range(expected - 50)] + [f"heavy{i % 10}" for i in range(50)]
+    truth = Counter(stream)
+
+    sketch = HeavyHitterSketch.for_stream(expected, error=1.0, capacity=100)
+    assert sketch.dimensions() == {"width": count_min_width(expected, 1.0), "depth": 4, "capacity": 100}
+    for key in stream:
+        sketch.add(key)
+
+    assert sketch.cms.error_bound() <= 1.0
+    assert all(sketch.estimate(f"heavy{i}") >= 5 for i in range(10))
+    candidates = [key for key, count in truth.items() if count <= 3 and sketch.estimate(key) > 3]
+    assert len(candidates) < 0.01 * len(truth)
+
+
+def test_approximate_analysis_matches_exact(tmp_path):
+    """Test that the approximate mode confirms exactly the banned customers of an exact run."""
+    from utils import review_analyzer
+
+    input_file = tmp_path / "reviews.json"
+    with open(input_file, "w", encoding="utf-8") as f:
+        for i in range(60):
+            text = "This is shit" if i % 2 else "Nice and clean"
+            f.write(json.dumps({"reviewerID": f"R{i % 9}", "reviewText": text,
+                                "summary": "", "overall": 3.0}) + "\n")
+
+    review_analyzer.main(["--input", str(input_file), "--output", str(tmp_path / "exact.json")])
+    review_analyzer.main(["--input", str(input_file), "--output", str(tmp_path / "approx.json"), "--approximate",
+                          "--expected-profane", "30", "--sketch-depth", "3", "--sketch-capacity", "5"])
+    exact = json.loads((tmp_path / "exact.json").read_text())
+    approx = json.loads((tmp_path / "approx.json").read_text())
+    assert approx["summary"]["approximate"] is True
+    assert sorted(approx["banned_customers"]) == sorted(exact["banned_customers"])
+    assert approx["customer_profanity_counts"] == {
+        customer: exact["customer_profanity_counts"][customer] for customer in approx["customer_profanity_counts"]
+    }
+
+
+def test_group_by_aggregation():
+    """Test group-by aggregates and that partial aggregates merge to the single-pass result."""
+    specs = parse_group_by(["month", "overall,sentiment", "agreement"])
+    reviews = [
+        ({"overall": 5.0, "unixReviewTime": 1366496171}, 0.8, "positive", False),
+        ({"overall": 1.0, "unixReviewTime": 1366500000}, 0.6, "positive", True),
+        ({"overall": 1.0, "unixReviewTime": 1359778857}, -0.5, "negative", True),
+    ]
+    single, left, right = GroupByAggregator(specs), GroupByAggregator(specs), GroupByAggregator(specs)
+    for i, review in enumerate(reviews):
+        single.add(*review)
+        (left if i < 2 else right).add(*review)
+
+    merged = left.merge(GroupByAggregator.from_dict(json.loads(json.dumps(right.to_dict()))))
+    assert merged.groups == single.groups
+
+    months = {row["key"]: row for row in single.rows("month")}
+    assert months["2013-04"]["count"] == 2
+    assert months["2013-04"]["mean_polarity"] == pytest.approx(0.7)
+    assert months["2013-04"]["profanity_rate"] == 0.5
+    assert sum(months["2013-02"]["histogram"]) == 1
+    assert {row["key"]: row["count"] for row in single.rows("agreement")} == {"agree": 2, "disagree": 1}
+    assert {row["key"] for row in single.rows("overall,sentiment")} == {"5.0|positive", "1.0|positive", "1.0|negative"}
+
+    with pytest.raises(ValueError):
+        parse_group_by(["colour"])
+
+
+def test_polarity_rebucketing_and_quantiles():
+    """Test exact re-bucketing at bin-edge thresholds and approximate merged quantiles."""
+    polarities = [i / 997 - 0.5 for i in range(997)] + [0.0, 0.1, -0.1, 0.05, -0.05, 1.0, -1.0] * 5
+    histogram, left, right = PolarityHistogram(), KLLSketch(k=64), KLLSketch(k=64)
+    for i, polarity in enumerate(polarities):
+        histogram.add(polarity)
+        (left if i % 2 else right).update(polarity)
+
+    for threshold in (0.0, 0.05, 0.1, 0.25):
+        expected = Counter(classify_sentiment(p, threshold, -threshold) for p in polarities)
+        assert histogram.classify_counts(threshold, -threshold) == dict(expected)
+    with pytest.raises(ValueError):
+        histogram.classify_counts(0.123, -0.1)
+
+    merged = left.merge(KLLSketch.from_dict(json.loads(json.dumps(right.to_dict()))))
+    assert merged.n == len(polarities)
+    ordered = sorted(polarities)
+    for fraction in (0.1, 0.5, 0.9):
+        estimate = merged.quantile(fraction)
+        true_rank = sum(p <= estimate for p in ordered) / len(ordered)
+        assert abs(true_rank - fraction) < 0.05
+    with pytest.raises(ValueError):
+        merged.merge(KLLSketch(k=128))
+
+
+def test_near_duplicate_clusters(tmp_path):
+    """Test MinHash/LSH clustering of copy-pasted reviews and counting each cluster once."""
+    template = ("I bought this blender last month and the motor burned out after two weeks of "
+                "light use, the customer service never answered my emails so avoid this brand")
+    texts = [template, template.replace("this brand", "this company"), template + " completely",
+             "The headphones sound clear and the battery easily lasts through a long flight",
+             "Shipping was quick and the package arrived well protected without any damage"]
+
+    index = NearDuplicateIndex()
+    flags = [index.add(preprocess(text.lower()), f"R{i}") for i, text in enumerate(texts)]
+    assert flags == [False, True, True, False, False]
+    assert [sorted(index.labels[i] for i in group) for group in index.groups()] == [["R0", "R1", "R2"]]
+    assert not index.add(preprocess("great product".lower()))  # too short to index
+
+    from utils import review_analyzer
+    input_file = tmp_path / "reviews.json"
+    with open(input_file, "w", encoding="utf-8") as f:
+        for i, text in enumerate(texts):
+            f.write(json.dumps({"reviewerID": f"R{i}", "reviewText": text, "summary": "", "overall": 2.0}) + "\n")
+    output_file = tmp_path / "out.json"
+    review_analyzer.main(["--input", str(input_file), "--output", str(output_file), "--dedupe"])
+    results = json.loads(output_file.read_text())
+    assert results["summary"]["total_reviews"] == 3
+    assert results["summary"]["duplicate_reviews"] == 2
+    assert results["near_duplicates"]["largest_clusters"][0]["size"] == 3
+
+
+def test_result_cache_lru():
+    """Test content-hash keys and LRU eviction of the in-process result cache."""
+    assert text_key("Great  product!") == text_key("great product!\n")
+    assert text_key("great product") != text_key("great products")
+
+    cache = ResultCache(maxsize=2)
+    calls = []
+    score = lambda text: cache.get_or_compute(text, "polarity", lambda: calls.append(text) or 0.5)
+    for text in ("a", "b", "a", "c", "b"):
+        assert score(text) == 0.5
+    # "b" was evicted by "c" (least recently used after "a" was hit)
+    assert calls == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_bloom_filter():
+    """Test that the Bloom filter has no false negatives and few false positives."""
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"customer_{i}")
+    assert all(f"customer_{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other_{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_retry_policy_backoff_and_budget():
+    """Test that throttles are retried with capped jittered backoff and fatal errors are not."""
+    from botocore.exceptions import ClientError
+
+    def error(code, status=400):
+        return ClientError({"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, "PutItem")
+
+    assert classify(error("ProvisionedThroughputExceededException")) == "throttle"
+    assert classify(error("Whatever", 503)) == "transient"
+    assert classify(error("ConditionalCheckFailedException")) == "fatal"
+
+    class FlakyClient:
+        def __init__(self, failures):
+            self.failures = list(failures)
+            self.calls = 0
+
+        def put_item(self, **kwargs):
+            self.calls += 1
+            if self.failures:
+                raise self.failures.pop(0)
+            return {"ok": True}
+
+    sleeps = []
+    policy = RetryPolicy(max_attempts=5, base_delay=0.1, max_delay=0.15, sleep=sleeps.append)
+    client = RetryingClient(FlakyClient([error("ThrottlingException")] * 3), policy)
+    assert client.put_item(TableName="t") == {"ok": True}
+    assert len(sleeps) == 3 and all(0 <= d <= 0.15 for d in sleeps)
+    assert policy.metrics["retries"] == 3 and policy.metrics["throttle"] == 3
+
+    with pytest.raises(ClientError):
+        RetryingClient(FlakyClient([error("ValidationException")]), policy).put_item()
+    with pytest.raises(RetryBudgetExceeded):
+        RetryingClient(FlakyClient([error("SlowDown", 503)] * 9), policy).put_item()
+
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return 500
+
+    # Less time left than the safety margin: give up without sleeping
+    policy.start(Context())
+    sleeps.clear()
+    with pytest.raises(RetryBudgetExceeded):
+        RetryingClient(FlakyClient([error("ThrottlingException")]), policy).put_item()
+    assert sleeps == [] and policy.metrics["gave_up"] == 2
+    # stats_line() reports the current invocation only; metrics keep the container totals
+    assert policy.invocation_metrics == {"attempts": 1, "gave_up": 1}
+    assert policy.stats_line().startswith("Retries: 0 of 1 attempts")
+    policy.start(None)
+    assert policy.stats_line().startswith("Retries: 0 of 0 attempts") and policy.metrics["gave_up"] == 2
+
+
+def test_vocabulary_token_encoding():
+    """Test that lemma lists round-trip through vocabulary IDs, with out-of-vocabulary lemmas spelled out."""
+    numbers = [0, 1, 127, 128, 300, 16383, 16384, 2**31]
+    assert unpack_varints(pack_varints(numbers)) == numbers
+    assert len(pack_varints([127, 128])) == 3
+
+    vocabulary = Vocabulary.load("v1")
+    tokens = preprocess("Great product, the battery arrived broken. Zorblax zorblax gizmo!")
+    encoded = vocabulary.encode(tokens)
+    assert encoded["oov"] == [t for t in dict.fromkeys(tokens) if t not in vocabulary.ids]
+    assert "oov" not in vocabulary.encode(["great", "product"])
+    assert "zorblax" in encoded["oov"] and encoded["oov"].count("zorblax") == 1
+    assert vocabulary.decode(encoded) == tokens
+    assert len(json.dumps(encoded)) < len(json.dumps(tokens))
+
+    review = {"reviewText_clean": encoded, TOKEN_VOCAB_FIELD: "v1", "summary_clean": ["plain", "list"]}
+    assert clean_tokens(review, "reviewText_clean") == tokens
+    assert clean_tokens(review, "summary_clean") == ["plain", "list"]
+
+
+def test_prefetch_early_close_with_full_queue():
+    """Test that closing a prefetch generator early does not hang on a full queue."""
+    def failing():
+        yield 1
+        yield 2
+        raise ValueError("producer failed")
+
+    for source, first in ((iter(range(5)), 0), (failing(), 1)):
+        items = prefetch(source, depth=1)
+        assert next(items) == first
+        time.sleep(0.3)  # let the producer fill the queue and block on its final put
+        closer = threading.Thread(target=items.close, daemon=True)
+        closer.start()
+        closer.join(timeout=5)
+        assert not closer.is_alive()
+
+    with pytest.raises(ValueError):
+        list(prefetch(failing(), depth=1))
+
+
+def test_scan_buffer_parses_in_place():
+    """Test that fields are extracted from the raw bytes, including escapes and unusual lines."""
+    records = [
+        {"reviewerID": "A1", "reviewText": 'He said "\\"reviewerID\\": no" \\\\', "overall": 5.0},
+        {"summary": "ends with a backslash \\", "reviewText": "café ☃ 😀", "overall": -1e3},
+        {"reviewText": "tab\there\nnewline", "unixReviewTime": 1400000000},
+    ]
+    lines = [json.dumps(r) for r in records] + ['{"reviewerID" : "spaced", "overall": 2}', "", "not json at all"]
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    parsed = [record for record, _ in scan_buffer(data)]
+    assert parsed[:3] == records
+    assert parsed[3] == {"reviewerID": "spaced", "overall": 2}
+    assert len(parsed) == 4
+
+
+def test_scan_buffer_skips_nested_duplicate_keys():
+    """Test that only top-level keys are extracted when nested objects reuse their names."""
+    records = [
+        {"style": {"summary": "nested", "overall": 1}, "summary": "top {", "overall": 4.0},
+        {"meta": [{"reviewerID": "inner"}, {"x": "}"}], "reviewText": "a } b", "reviewerID": "outer"},
+        {"reviewerID": "first", "extra": {"reviewerID": "later", "deeper": {"summary": "deep"}}},
+    ]
+    data = "".join(json.dumps(r) + "\n" for r in records).encode("utf-8")
+    parsed = [record for record, _ in scan_buffer(data)]
+    assert parsed == [{field: r[field] for field in ("reviewerID", "reviewText", "summary", "overall") if field in r}
+                      for r in records]
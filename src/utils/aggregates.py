@@ -0,0 +1,100 @@
+import os
+import random
+from collections import Counter
+
+# SSM parameter holding the name of the aggregates table
+AGGREGATES_TABLE_PARAM = "/dic2025/a3/table/aggregates"
+
+# Lambda configuration: number of counter shards (0 disables the counters)
+AGGREGATE_SHARDS_ENV = "AGGREGATE_SHARDS"
+DEFAULT_AGGREGATE_SHARDS = 10
+
+COUNTERS = ("reviews", "profane", "banned", "positive", "neutral", "negative")
+
+# Markers of what the counters reflect: the profanity verdict and sentiment
+# class counted for a review item, and whether a customer-stats row's ban was
+COUNTED_UNPOLITE = "countedUnpolite"
+COUNTED_SENTIMENT = "countedSentiment"
+COUNTED_BAN = "countedBan"
+
+
+class AggregateCounters:
+    """
+    Pipeline-wide counters kept as atomic ``ADD`` updates on *shards* items.
+
+    Every update goes to a randomly chosen shard item (hash key ``shardId``),
+    so concurrent writers spread over *shards* partitions instead of one hot
+    key. Totals are the sum over all shard items (read_aggregates()).
+    Each update is tied to a marker on the item it counts (add()), so
+    records retried after a failure are counted exactly once.
+    """
+
+    def __init__(self, shards=DEFAULT_AGGREGATE_SHARDS):
+        self.shards = shards
+
+    @classmethod
+    def from_env(cls):
+        """Counters with AGGREGATE_SHARDS shards, or None if disabled."""
+        shards = int(os.getenv(AGGREGATE_SHARDS_ENV, DEFAULT_AGGREGATE_SHARDS))
+        return cls(shards) if shards > 0 else None
+
+    def _shard_update(self, table, increments):
+        return {
+            "TableName": table,
+            "Key": {"shardId": {"S": f"totals#{random.randrange(self.shards)}"}},
+            "UpdateExpression": "ADD " + ", ".join(f"#c{i} :c{i}" for i in range(len(increments))),
+            "ExpressionAttributeNames": {f"#c{i}": name for i, name in enumerate(increments)},
+            "ExpressionAttributeValues": {f":c{i}": {"N": str(amount)}
+                                          for i, amount in enumerate(increments.values())},
+        }
+
+    def add(self, ddb, table, item_table, key, marker, value, previous=None, **increments):
+        """
+        Add *increments* (counter name -> amount) to one random shard, once.
+
+        The item *key* of *item_table* records in attribute *marker* what the
+        counters reflect for it. The increments and ``marker = value`` are
+        written in one transaction, on condition that *marker* still holds
+        *previous* (None: not set). A retried record whose first attempt was
+        counted therefore adds nothing, and one that failed before counting
+        adds everything; a rescore passes the old marker and adds the
+        difference. Returns False if the condition failed.
+        """
+        increments = {name: amount for name, amount in increments.items() if amount}
+        if value == previous and not increments:
+            return True
+        values = {":value": value}
+        if previous is None:
+            condition = "attribute_not_exists(#marker)"
+        else:
+            condition = "#marker = :previous"
+            values[":previous"] = previous
+        items = [{"Update": {
+            "TableName": item_table,
+            "Key": key,
+            "UpdateExpression": "SET #marker = :value",
+            "ConditionExpression": condition,
+            "ExpressionAttributeNames": {"#marker": marker},
+            "ExpressionAttributeValues": values,
+        }}]
+        if increments:
+            items.append({"Update": self._shard_update(table, increments)})
+        try:
+            ddb.transact_write_items(TransactItems=items)
+        except ddb.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get("CancellationReasons") or [{}]
+            if reasons[0].get("Code") == "ConditionalCheckFailed":
+                return False
+            raise
+        return True
+
+def read_aggregates(ddb, table):
+    """Counter totals summed over all shard items of *table*."""
+    totals = Counter({name: 0 for name in COUNTERS})
+    paginator = ddb.get_paginator("scan")
+    for page in paginator.paginate(TableName=table):
+        for item in page["Items"]:
+            for name, value in item.items():
+                if name != "shardId":
+                    totals[name] += int(value["N"])
+    return totals
@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+# Opt-in switch: set API_ACCOUNTING=1 in the Lambda environment
+ACCOUNTING_ENV = "API_ACCOUNTING"
+
+# Prefix of the per-invocation log line (parsed by scripts/api_cost_report.py)
+LOG_PREFIX = "[API_ACCOUNTING]"
+
+# ----------------------------------------------------------------------
+# Price model (USD, us-east-1 list prices – adjust for your region)
+# ----------------------------------------------------------------------
+S3_TIER1_PER_1K = 0.005     # PUT, COPY, POST, LIST
+S3_TIER2_PER_1K = 0.0004    # GET, HEAD and everything else
+DDB_WRU_PER_MILLION = 0.625  # on-demand write request units
+DDB_RRU_PER_MILLION = 0.125  # on-demand read request units
+SSM_PER_10K = 0.0           # standard parameters, standard throughput
+
+S3_TIER1_OPERATIONS = {
+    "PutObject", "CopyObject", "PostObject", "ListObjects", "ListObjectsV2",
+    "ListBuckets", "CreateMultipartUpload", "UploadPart", "CompleteMultipartUpload",
+}
+
+DDB_WRITE_OPERATIONS = {
+    "PutItem", "UpdateItem", "DeleteItem", "BatchWriteItem", "TransactWriteItems",
+}
+
+
+def _empty_entry():
+    return {
+        "calls": 0,
+        "attempts": 0,
+        "errors": 0,
+        "request_bytes": 0,
+        "response_bytes": 0,
+        "capacity_units": 0.0,
+    }
+
+
+def _capacity_units(consumed):
+    """Sum CapacityUnits of a ConsumedCapacity value (dict or list of dicts)."""
+    if not consumed:
+        return 0.0
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return float(sum(entry.get("CapacityUnits", 0) for entry in consumed))
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return 0
+
+
+class ApiCallAccountant:
+    """
+    Tally AWS API calls made through instrumented botocore clients.
+
+    Uses the client event system only, so handler code is unchanged:
+    ``provide-client-params`` asks DynamoDB for ``ReturnConsumedCapacity``,
+    ``before-send`` counts HTTP attempts (retries included) and request
+    bytes, ``after-call`` counts logical calls, response bytes and consumed
+    capacity.
+    """
+
+    def __init__(self, stage=None):
+        self.stage = stage
+        self.reviews = 0
+        self.operations = defaultdict(_empty_entry)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, stage=None):
+        """Return an accountant if API_ACCOUNTING is enabled, else None."""
+        if os.getenv(ACCOUNTING_ENV, "").lower() in ("1", "true", "yes"):
+            return cls(stage)
+        return None
+
+    # ------------------------------------------------------------------
+    # Instrumentation
+    # ------------------------------------------------------------------
+    def instrument(self, *clients):
+        """Register the accounting hooks on each botocore client."""
+        for client in clients:
+            service_id = client.meta.service_model.service_id.hyphenize()
+            events = client.meta.events
+            events.register(f"provide-client-params.{service_id}.*", self._request_capacity)
+            events.register(f"before-send.{service_id}.*", self._before_send)
+            events.register(f"after-call.{service_id}.*", self._after_call)
+        return self
+
+    def _key(self, event_name):
+        # event names look like "after-call.dynamodb.GetItem"
+        _, service, operation = event_name.split(".", 2)
+        return f"{service}:{operation}"
+
+    def _request_capacity(self, params, model, **kwargs):
+        if "ReturnConsumedCapacity" in model.input_shape.members:
+            params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+    def _before_send(self, request, event_name, **kwargs):
+        with self._lock:
+            entry = self.operations[self._key(event_name)]
+            entry["attempts"] += 1
+            entry["request_bytes"] += _body_size(request.body)
+
+    def _after_call(self, http_response, parsed, model, event_name, **kwargs):
+        size = parsed.get("ContentLength") if model.has_streaming_output else None
+        if size is None:
+            size = int(http_response.headers.get("content-length") or 0)
+
+        with self._lock:
+            entry = self.operations[self._key(event_name)]
+            entry["calls"] += 1
+            entry["response_bytes"] += size
+            if http_response.status_code >= 300:
+                entry["errors"] += 1
+            entry["capacity_units"] += _capacity_units(parsed.get("ConsumedCapacity"))
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def record_reviews(self, count=1):
+        """Count reviews handled, the denominator of the per-review model."""
+        with self._lock:
+            self.reviews += count
+
+    def reset(self):
+        with self._lock:
+            self.reviews = 0
+            self.operations.clear()
+
+    def snapshot(self):
+        """Plain-dict copy of the current tallies."""
+        with self._lock:
+            return {
+                "stage": self.stage,
+                "reviews": self.reviews,
+                "operations": {op: dict(entry) for op, entry in self.operations.items()},
+            }
+
+    def log_line(self):
+        return f"{LOG_PREFIX} {json.dumps(self.snapshot(), sort_keys=True)}"
+
+
+def merge_snapshots(snapshots):
+    """Merge snapshots (e.g. one per invocation) into per-stage totals."""
+    stages = {}
+    for snap in snapshots:
+        stage = stages.setdefault(snap.get("stage") or "unknown", {
+            "reviews": 0,
+            "operations": defaultdict(_empty_entry),
+        })
+        stage["reviews"] += snap.get("reviews", 0)
+        for op, entry in snap.get("operations", {}).items():
+            total = stage["operations"][op]
+            for field, value in entry.items():
+                total[field] += value
+    return stages
+
+
+def operation_cost(op, entry):
+    """USD cost of the tallied calls of *op* ("service:Operation")."""
+    service, operation = op.split(":", 1)
+    if service == "s3":
+        per_1k = S3_TIER1_PER_1K if operation in S3_TIER1_OPERATIONS else S3_TIER2_PER_1K
+        return entry["attempts"] * per_1k / 1000.0
+    if service == "dynamodb":
+        units = entry["capacity_units"]
+        if operation in DDB_WRITE_OPERATIONS:
+            return units * DDB_WRU_PER_MILLION / 1_000_000.0
+        return units * DDB_RRU_PER_MILLION / 1_000_000.0
+    if service == "ssm":
+        return entry["attempts"] * SSM_PER_10K / 10_000.0
+    return 0.0
+
+
+def cost_model(stages):
+    """
+    Build the per-review cost model from merged stage tallies.
+
+    Returns ``{"stages": {stage: {op: {...per review...}}}, "per_review": {...}}``
+    where every figure is divided by the number of reviews that stage handled.
+    """
+    model = {"stages": {}, "per_review": {"calls": 0.0, "request_bytes": 0.0,
+                                          "response_bytes": 0.0, "capacity_units": 0.0,
+                                          "cost_usd": 0.0}}
+    for stage_name, stage in sorted(stages.items()):
+        reviews = stage["reviews"] or 1
+        ops = {}
+        for op, entry in sorted(stage["operations"].items()):
+            row = {
+                "calls": entry["calls"] / reviews,
+                "attempts": entry["attempts"] / reviews,
+                "request_bytes": entry["request_bytes"] / reviews,
+                "response_bytes": entry["response_bytes"] / reviews,
+                "capacity_units": entry["capacity_units"] / reviews,
+                "cost_usd": operation_cost(op, entry) / reviews,
+            }
+            ops[op] = row
+            for field in model["per_review"]:
+                model["per_review"][field] += row[field]
+        model["stages"][stage_name] = {"reviews": stage["reviews"], "operations": ops}
+    return model
+
+
+def print_cost_model(model):
+    """Print the per-review cost model report."""
+    print("=" * 96)
+    print("PER-REVIEW API COST MODEL")
+    print("=" * 96)
+    print(f"{'stage / operation':<40}{'calls':>9}{'attempts':>10}{'req B':>10}{'resp B':>10}{'CU':>8}{'USD/1M rev':>12}")
+    for stage_name, stage in model["stages"].items():
+        print(f"\n{stage_name} ({stage['reviews']} reviews)")
+        for op, row in stage["operations"].items():
+            print(f"  {op:<38}{row['calls']:>9.2f}{row['attempts']:>10.2f}"
+                  f"{row['request_bytes']:>10.0f}{row['response_bytes']:>10.0f}"
+                  f"{row['capacity_units']:>8.2f}{row['cost_usd'] * 1_000_000:>12.2f}")
+
+    total = model["per_review"]
+    print("\n" + "-" * 96)
+    print(f"{'PIPELINE TOTAL PER REVIEW':<40}{total['calls']:>9.2f}{'':>10}"
+          f"{total['request_bytes']:>10.0f}{total['response_bytes']:>10.0f}"
+          f"{total['capacity_units']:>8.2f}{total['cost_usd'] * 1_000_000:>12.2f}")
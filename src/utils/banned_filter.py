@@ -0,0 +1,117 @@
+import hashlib
+import math
+import os
+import threading
+import time
+
+from .customer_stats import list_banned_customers
+
+# Lambda configuration: whether reviews of banned customers skip the stats
+# update and sentiment scoring, and the seconds between refreshes of the
+# banned-customer filter used to decide that
+SKIP_BANNED_ENV = "SKIP_BANNED"
+BANNED_FILTER_TTL_ENV = "BANNED_FILTER_TTL"
+DEFAULT_BANNED_FILTER_TTL = 60
+
+# Review field set by profanity_check for reviews of banned customers
+BANNED_REVIEW_FIELD = "customerBanned"
+
+
+class BloomFilter:
+    """
+    Bloom filter sized for *capacity* keys at false-positive rate *error_rate*.
+
+    Never reports a false negative. The *num_hashes* bit positions of a key
+    come from one blake2b digest by double hashing.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+
+class BannedCustomers:
+    """
+    Banned customer IDs of the stats table, cached as a Bloom filter.
+
+    The filter is rebuilt from the sparse banned-customer index when it is
+    older than *ttl* seconds. A negative answer needs no DynamoDB call; a positive
+    one is confirmed with a single get_item of the customer's row, so false
+    positives never mark a customer as banned.
+    """
+
+    def __init__(self, ttl=DEFAULT_BANNED_FILTER_TTL, error_rate=0.01):
+        self.ttl = ttl
+        self.error_rate = error_rate
+        self.refreshes = 0
+        self.lookups = 0
+        self.confirmations = 0
+        self._filter = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Filter refreshed every BANNED_FILTER_TTL seconds if SKIP_BANNED is set, else None."""
+        if os.getenv(SKIP_BANNED_ENV, "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(float(os.getenv(BANNED_FILTER_TTL_ENV, DEFAULT_BANNED_FILTER_TTL)))
+
+    def _load(self, ddb, table):
+        customer_ids = list_banned_customers(ddb, table)
+        # Leave room for customers banned by this container until the next refresh
+        bloom = BloomFilter(2 * len(customer_ids) + 1024, self.error_rate)
+        for customer_id in customer_ids:
+            bloom.add(customer_id)
+        return bloom
+
+    def refresh(self, ddb, table, force=False):
+        """Rebuild the filter if it is missing, stale, or *force* is set."""
+        with self._lock:
+            if not force and self._filter is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            self._filter = self._load(ddb, table)
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def add(self, customer_id):
+        """Record a ban made by this container without waiting for a refresh."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(customer_id)
+
+    def is_banned(self, ddb, table, customer_id):
+        """Whether *customer_id* is banned; reads DynamoDB only on a filter hit."""
+        self.refresh(ddb, table)
+        self.lookups += 1
+        if customer_id not in self._filter:
+            return False
+        self.confirmations += 1
+        response = ddb.get_item(TableName=table, Key={"customerId": {"S": customer_id}},
+                                ProjectionExpression="banned")
+        return response.get("Item", {}).get("banned", {}).get("BOOL", False)
+
+    def stats_line(self):
+        size = len(self._filter) if self._filter is not None else 0
+        return (f"Banned filter: {size} banned, {self.lookups} lookups, "
+                f"{self.confirmations} confirmed with DynamoDB, {self.refreshes} refreshes")
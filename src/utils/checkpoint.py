@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+
+from .jsonl_scanner import detect_compression, open_input
+
+# Bytes hashed to recognise an input file again (an appended file keeps its head)
+FINGERPRINT_BYTES = 64 * 1024
+
+
+class SourceChangedError(Exception):
+    """The input file no longer matches the state recorded for it."""
+
+
+def save_json_atomic(path, document):
+    """Write *document* to *path* so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def file_fingerprint(file_path, offset):
+    """Hash of the first bytes (up to *offset*) of *file_path*, decompressed if needed."""
+    length = min(offset, FINGERPRINT_BYTES)
+    with open_input(file_path) as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def source_key(file_path):
+    return os.path.abspath(file_path)
+
+
+def source_entry(file_path, offset):
+    """State recorded for an input file processed up to byte *offset*."""
+    return {"offset": offset, "fingerprint": file_fingerprint(file_path, offset)}
+
+
+def resume_offset(sources, file_path):
+    """
+    Byte offset at which analysis of *file_path* should continue.
+
+    Returns 0 for a file not seen before. A file already seen is resumed
+    where the previous run stopped, which processes only newly appended
+    reviews; SourceChangedError is raised if it was truncated or rewritten.
+    Offsets of compressed files count decompressed bytes, so only their
+    fingerprint is checked.
+    """
+    entry = (sources or {}).get(source_key(file_path))
+    if not entry:
+        return 0
+
+    offset = entry["offset"]
+    size = os.path.getsize(file_path)
+    if size < offset and not detect_compression(file_path):
+        raise SourceChangedError(f"{file_path} is smaller ({size} bytes) than the recorded offset {offset}")
+    if file_fingerprint(file_path, offset) != entry["fingerprint"]:
+        raise SourceChangedError(f"{file_path} was modified before byte {offset}")
+    return offset
@@ -0,0 +1,250 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+
+from .review_details import SENTIMENT_CLASSES, SENTIMENT_CODES
+
+# ----------------------------------------------------------------------
+# On-disk layout (one directory per analysis run)
+#
+#   manifest.json      row count, column types, byte order, labels
+#   polarity.f32       float32 per review
+#   overall.f32        float32 per review (star rating)
+#   sentiment.u8       uint8 code into manifest["sentiment_labels"]
+#   is_profane.u8      uint8 0/1
+#   reviewer.u32       uint32 index into reviewer_ids.txt
+#   reviewer_ids.txt   one reviewerID per line, in first-seen order
+#
+# Columns are appended chunk by chunk; manifest.json is rewritten
+# atomically after each chunk so a reader only ever sees complete rows.
+# ----------------------------------------------------------------------
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+REVIEWER_IDS = "reviewer_ids.txt"
+
+COLUMNS = {
+    "polarity": ("polarity.f32", "f"),
+    "overall": ("overall.f32", "f"),
+    "sentiment": ("sentiment.u8", "B"),
+    "is_profane": ("is_profane.u8", "B"),
+    "reviewer": ("reviewer.u32", "I"),
+}
+
+
+class ColumnarWriter:
+    """Stream per-review results into column files, one chunk at a time."""
+
+    def __init__(self, directory, chunk_rows=65536, resume_rows=None):
+        """
+        Start a fresh output in *directory*, or continue an existing one
+        after its first *resume_rows* rows (anything beyond is discarded).
+        """
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self._reviewer_index = {}
+        self._new_ids = []
+        self._buffers = {name: array(typecode) for name, (_, typecode) in COLUMNS.items()}
+
+        os.makedirs(directory, exist_ok=True)
+        if resume_rows:
+            self._reopen(resume_rows)
+        else:
+            # Start a fresh run: truncate every column file
+            self._files = {name: open(os.path.join(directory, filename), "wb")
+                           for name, (filename, _) in COLUMNS.items()}
+            self._ids_file = open(os.path.join(directory, REVIEWER_IDS), "w", encoding="utf-8")
+        self._write_manifest()
+
+    def _reopen(self, rows):
+        with open(os.path.join(self.directory, MANIFEST), encoding="utf-8") as f:
+            committed = json.load(f)["rows"]
+        if committed < rows:
+            raise ValueError(f"{self.directory} holds {committed} rows, cannot resume after {rows}")
+
+        self.rows = rows
+        self._files = {}
+        for name, (filename, typecode) in COLUMNS.items():
+            f = open(os.path.join(self.directory, filename), "r+b")
+            f.truncate(rows * array(typecode).itemsize)
+            f.seek(0, os.SEEK_END)
+            self._files[name] = f
+
+        # A crash can leave reviewer_ids.txt with a torn last line, or with
+        # IDs of rows past *rows*. Keep exactly the IDs the kept rows use:
+        # indices are assigned in first-seen order, so that is the largest
+        # index in the reviewer column plus one.
+        ids_path = os.path.join(self.directory, REVIEWER_IDS)
+        needed = self._max_reviewer_index(rows) + 1
+        kept = 0
+        with open(ids_path, "r+b") as f:
+            for index in range(needed):
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    raise ValueError(f"{ids_path} holds {index} complete IDs, rows {rows} use {needed}")
+                self._reviewer_index[line[:-1].decode("utf-8")] = index
+                kept += len(line)
+            f.truncate(kept)
+        self._ids_file = open(ids_path, "a", encoding="utf-8")
+
+    def _max_reviewer_index(self, rows, block=1 << 20):
+        """Largest reviewer index in the first *rows* rows (-1 if none), read block by block."""
+        largest = -1
+        f = self._files["reviewer"]
+        f.seek(0)
+        while rows > 0:
+            indices = array("I")
+            indices.fromfile(f, min(block, rows))
+            largest = max(largest, max(indices))
+            rows -= len(indices)
+        f.seek(0, os.SEEK_END)
+        return largest
+
+    def append(self, reviewer_id, sentiment, polarity, is_profane, overall):
+        """Buffer one review's results; flushes every *chunk_rows* rows."""
+        # reviewer_ids.txt holds str IDs (and is read back as such on resume)
+        reviewer_id = str(reviewer_id)
+        index = self._reviewer_index.get(reviewer_id)
+        if index is None:
+            index = len(self._reviewer_index)
+            self._reviewer_index[reviewer_id] = index
+            self._new_ids.append(reviewer_id)
+
+        buffers = self._buffers
+        buffers["reviewer"].append(index)
+        buffers["polarity"].append(polarity)
+        buffers["overall"].append(overall or 0)
+        buffers["sentiment"].append(SENTIMENT_CODES[sentiment])
+        buffers["is_profane"].append(1 if is_profane else 0)
+
+        if len(buffers["polarity"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows to disk and publish them in the manifest."""
+        pending = len(self._buffers["polarity"])
+        if not pending:
+            return
+
+        for name, buffer in self._buffers.items():
+            buffer.tofile(self._files[name])
+            self._files[name].flush()
+            del buffer[:]
+
+        for reviewer_id in self._new_ids:
+            self._ids_file.write(f"{reviewer_id}\n")
+        self._ids_file.flush()
+        self._new_ids = []
+
+        self.rows += pending
+        self._write_manifest()
+
+    def _write_manifest(self):
+        manifest = {
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "columns": {name: {"file": filename, "typecode": typecode}
+                        for name, (filename, typecode) in COLUMNS.items()},
+            "sentiment_labels": list(SENTIMENT_CLASSES),
+            "reviewer_ids": REVIEWER_IDS,
+        }
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._ids_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarReader:
+    """
+    Memory-mapped, zero-copy access to a columnar analysis output.
+
+    ``column(name)`` returns a typed ``memoryview`` over the mapped file,
+    so scans such as ``sum(reader.column('is_profane'))`` never copy the
+    data into Python lists.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest["byteorder"] != sys.byteorder:
+            raise ValueError(f"{directory} was written on a {self.manifest['byteorder']}-endian machine")
+
+        self.rows = self.manifest["rows"]
+        self.sentiment_labels = self.manifest["sentiment_labels"]
+        self._maps = {}
+        self._views = {}
+        self._exports = []
+        self._reviewer_ids = None
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        """Typed memoryview of column *name* (length == number of rows)."""
+        view = self._views.get(name)
+        if view is None:
+            spec = self.manifest["columns"][name]
+            typecode = spec["typecode"]
+            if self.rows == 0:
+                view = memoryview(array(typecode))
+            else:
+                with open(os.path.join(self.directory, spec["file"]), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[name] = mapped
+                itemsize = array(typecode).itemsize
+                raw = memoryview(mapped)
+                sliced = raw[:self.rows * itemsize]
+                view = sliced.cast(typecode)
+                self._exports.extend([view, sliced, raw])
+            self._views[name] = view
+        return view
+
+    @property
+    def reviewer_ids(self):
+        """Table of reviewer IDs indexed by the ``reviewer`` column."""
+        if self._reviewer_ids is None:
+            with open(os.path.join(self.directory, self.manifest["reviewer_ids"]), encoding="utf-8") as f:
+                self._reviewer_ids = [line.rstrip("\n") for line in f]
+        return self._reviewer_ids
+
+    def row(self, index):
+        """One review's results as a dict (same keys as ReviewDetails rows)."""
+        return {
+            "reviewerID": self.reviewer_ids[self.column("reviewer")[index]],
+            "sentiment": self.sentiment_labels[self.column("sentiment")[index]],
+            "polarity": self.column("polarity")[index],
+            "is_profane": bool(self.column("is_profane")[index]),
+            "overall": self.column("overall")[index],
+        }
+
+    def close(self):
+        # Views must be released before their mmap can be closed
+        for view in self._exports:
+            view.release()
+        self._exports.clear()
+        self._views.clear()
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,170 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .retry import RetryBudgetExceeded
+
+# Sparse GSI of the customer-stats table: only banned customers carry the
+# BANNED_STATUS_ATTR key attribute, so the index holds exactly those rows
+# and listing them costs reads proportional to the number of bans.
+BANNED_INDEX = "banned-index"
+BANNED_STATUS_ATTR = "bannedStatus"
+BANNED_STATUS = "BANNED"
+
+# Unpolite reviews after which a customer is banned
+BAN_THRESHOLD = 3
+
+# Lambda configuration: per-container writes per second after which a
+# customer's counter is spread over DEFAULT_COUNTER_SHARDS items (0 never shards)
+HOT_CUSTOMER_RATE_ENV = "HOT_CUSTOMER_RATE"
+DEFAULT_HOT_CUSTOMER_RATE = 10
+DEFAULT_COUNTER_SHARDS = 8
+
+BANNED_INDEX_DEFINITION = {
+    "IndexName": BANNED_INDEX,
+    "KeySchema": [
+        {"AttributeName": BANNED_STATUS_ATTR, "KeyType": "HASH"},
+        {"AttributeName": "customerId", "KeyType": "RANGE"}
+    ],
+    "Projection": {"ProjectionType": "KEYS_ONLY"}
+}
+
+
+class CustomerCounters:
+    """
+    Atomic per-customer unpolite counters that shard themselves for hot customers.
+
+    A normal customer's count is one ``ADD`` on its customer-stats row,
+    whose new value decides the ban. A customer written more than
+    *hot_rate* times per second by this container is switched to *shards*
+    suffix-sharded items (``<customerId>#shard<k>``, marked with
+    ``shardOf``). Its row records ``counterShards``, so every container
+    sends further increments to a random shard. For a sharded customer the
+    ban decision reads and sums the row and all shards. Both per-customer
+    caches keep at most *maxsize* customers; one whose shard count was
+    evicted is written to its row once more, which returns it again.
+    """
+
+    def __init__(self, shards=DEFAULT_COUNTER_SHARDS, hot_rate=DEFAULT_HOT_CUSTOMER_RATE, window=1.0, maxsize=10000):
+        self.shards = shards
+        self.hot_rate = hot_rate
+        self.window = window
+        self.maxsize = maxsize
+        self._recent = OrderedDict()  # customerId -> deque of write times
+        self._sharded = OrderedDict()  # customerId -> counterShards of its row (LRU, at most maxsize)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Counters sharding above HOT_CUSTOMER_RATE writes/s (0 never shards)."""
+        return cls(hot_rate=float(os.getenv(HOT_CUSTOMER_RATE_ENV, DEFAULT_HOT_CUSTOMER_RATE)))
+
+    def _is_hot(self, customer_id):
+        if not self.hot_rate:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            times = self._recent.get(customer_id)
+            if times is None:
+                times = self._recent[customer_id] = deque()
+                if len(self._recent) > self.maxsize:
+                    self._recent.popitem(last=False)
+            else:
+                self._recent.move_to_end(customer_id)
+            times.append(now)
+            while times and times[0] <= now - self.window:
+                times.popleft()
+            return len(times) > self.hot_rate * self.window
+
+    def _sharded_total(self, ddb, table, customer_id, shards, max_rounds=8, base_delay=0.05):
+        # Strongly consistent, so the sum includes this and every other
+        # acknowledged shard ADD; a stale sum could keep a customer under
+        # BAN_THRESHOLD forever. Keys DynamoDB leaves unprocessed (throttling)
+        # are requested again with jittered backoff.
+        keys = [{"customerId": {"S": customer_id}}]
+        keys += [{"customerId": {"S": f"{customer_id}#shard{k}"}} for k in range(shards)]
+        request = {table: {"Keys": keys, "ProjectionExpression": "customerId, unpoliteCount, banned",
+                           "ConsistentRead": True}}
+        total, banned = 0, False
+        for attempt in range(max_rounds):
+            if attempt:
+                time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+            response = ddb.batch_get_item(RequestItems=request)
+            for item in response["Responses"].get(table, []):
+                total += int(item.get("unpoliteCount", {}).get("N", 0))
+                if item["customerId"]["S"] == customer_id:
+                    banned = item.get("banned", {}).get("BOOL", False)
+            request = response.get("UnprocessedKeys")
+            if not request:
+                return total, banned
+        raise RetryBudgetExceeded(f"BatchGetItem: {customer_id} shards still unprocessed after {max_rounds} rounds")
+
+    def record_unpolite(self, ddb, table, customer_id):
+        """
+        Count one unpolite review of *customer_id* and ban it past
+        BAN_THRESHOLD. Returns ``(count, banned, newly_banned)``.
+        """
+        row = {"customerId": {"S": customer_id}}
+        with self._lock:
+            shards = self._sharded.get(customer_id)
+            if shards:
+                self._sharded.move_to_end(customer_id)
+        if shards:
+            ddb.update_item(
+                TableName=table,
+                Key={"customerId": {"S": f"{customer_id}#shard{random.randrange(shards)}"}},
+                UpdateExpression="SET shardOf = :customer ADD unpoliteCount :one",
+                ExpressionAttributeValues={":customer": {"S": customer_id}, ":one": {"N": "1"}}
+            )
+            count, banned = self._sharded_total(ddb, table, customer_id, shards)
+        else:
+            expression = "SET banned = if_not_exists(banned, :false)"
+            values = {":false": {"BOOL": False}, ":one": {"N": "1"}}
+            if self._is_hot(customer_id):
+                expression += ", counterShards = if_not_exists(counterShards, :shards)"
+                values[":shards"] = {"N": str(self.shards)}
+            item = ddb.update_item(TableName=table, Key=row, UpdateExpression=expression + " ADD unpoliteCount :one",
+                                   ExpressionAttributeValues=values, ReturnValues="ALL_NEW")["Attributes"]
+            if "counterShards" in item:
+                shards = int(item["counterShards"]["N"])
+                with self._lock:
+                    self._sharded[customer_id] = shards
+                    self._sharded.move_to_end(customer_id)
+                    if len(self._sharded) > self.maxsize:
+                        self._sharded.popitem(last=False)
+                count, banned = self._sharded_total(ddb, table, customer_id, shards)
+            else:
+                count, banned = int(item["unpoliteCount"]["N"]), item["banned"]["BOOL"]
+
+        if banned or count <= BAN_THRESHOLD:
+            return count, banned, False
+        # Only the first writer to see the count cross the threshold bans
+        try:
+            ddb.update_item(
+                TableName=table, Key=row,
+                UpdateExpression="SET banned = :true, #status = :banned",
+                ConditionExpression="attribute_not_exists(#status)",
+                ExpressionAttributeNames={"#status": BANNED_STATUS_ATTR},
+                ExpressionAttributeValues={":true": {"BOOL": True}, ":banned": {"S": BANNED_STATUS}}
+            )
+        except ddb.exceptions.ConditionalCheckFailedException:
+            return count, True, False
+        return count, True, True
+
+
+def banned_customer_pages(ddb, table, page_size=1000):
+    """Yield lists of banned customer IDs, one Query page of the sparse index at a time."""
+    paginator = ddb.get_paginator("query")
+    for page in paginator.paginate(TableName=table, IndexName=BANNED_INDEX,
+                                   KeyConditionExpression="#status = :banned",
+                                   ExpressionAttributeNames={"#status": BANNED_STATUS_ATTR},
+                                   ExpressionAttributeValues={":banned": {"S": BANNED_STATUS}},
+                                   PaginationConfig={"PageSize": page_size}):
+        yield [item["customerId"]["S"] for item in page["Items"]]
+
+
+def list_banned_customers(ddb, table, page_size=1000):
+    """All banned customer IDs, in customerId order."""
+    return [customer_id for page in banned_customer_pages(ddb, table, page_size) for customer_id in page]
@@ -0,0 +1,102 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from .aggregates import read_aggregates
+from .customer_stats import list_banned_customers
+from .sentiment import classify_sentiment
+
+DEFAULT_SEGMENTS = 4
+
+
+class ScanTotals:
+    """Counts and banned customer IDs folded from the items of one or more segments."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.banned = []
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.banned.extend(other.banned)
+        return self
+
+
+def parallel_scan(ddb, table, fold, segments=DEFAULT_SEGMENTS, **scan_kwargs):
+    """
+    Scan *table* as *segments* parallel segments, one thread each.
+
+    Every segment pages through its share of the table and folds each item
+    into its own ScanTotals with ``fold(totals, item)``, so items are never
+    collected in memory. Returns the merged totals.
+    """
+    def scan_segment(segment):
+        totals = ScanTotals()
+        paginator = ddb.get_paginator("scan")
+        for page in paginator.paginate(TableName=table, Segment=segment, TotalSegments=segments, **scan_kwargs):
+            for item in page["Items"]:
+                fold(totals, item)
+        return totals
+
+    merged = ScanTotals()
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        for totals in pool.map(scan_segment, range(segments)):
+            merged.merge(totals)
+    return merged
+
+
+def _fold_review(totals, item):
+    counts = totals.counts
+    counts["total_reviews"] += 1
+    if "sentiment" in item:
+        counts[classify_sentiment(float(item["sentiment"]["N"]))] += 1
+    else:
+        counts["unscored"] += 1
+    if item.get("isUnpolite", {}).get("BOOL"):
+        counts["profane"] += 1
+
+
+def _fold_customer(totals, item):
+    if "shardOf" in item:  # counter shard of a hot customer, not a customer
+        return
+    totals.counts["customers"] += 1
+    if item.get("banned", {}).get("BOOL"):
+        totals.banned.append(item["customerId"]["S"])
+
+
+def pipeline_results(ddb, review_table, stats_table, segments=DEFAULT_SEGMENTS):
+    """
+    Summary of what the Lambda pipeline wrote to DynamoDB, in the layout of
+    the analysis results file (``summary`` and ``banned_customers``).
+    """
+    reviews = parallel_scan(ddb, review_table, _fold_review, segments,
+                            ProjectionExpression="sentiment, isUnpolite").counts
+    customers = parallel_scan(ddb, stats_table, _fold_customer, segments,
+                              ProjectionExpression="customerId, banned, shardOf")
+    return {
+        'summary': {
+            'total_reviews': reviews["total_reviews"],
+            'sentiment_counts': {label: reviews[label] for label in ('positive', 'neutral', 'negative')},
+            'profane_reviews': reviews["profane"],
+            'unscored_reviews': reviews["unscored"],
+            'customers_with_profanity': customers.counts["customers"],
+        },
+        'banned_customers': sorted(customers.banned),
+    }
+
+
+def aggregate_results(ddb, aggregates_table, stats_table):
+    """
+    The pipeline_results() summary from the sharded aggregate counters and
+    the sparse banned-customer index, without scanning any review.
+    """
+    totals = read_aggregates(ddb, aggregates_table)
+    sentiment_counts = {label: totals[label] for label in ('positive', 'neutral', 'negative')}
+    return {
+        'summary': {
+            'total_reviews': totals["reviews"],
+            'sentiment_counts': sentiment_counts,
+            'profane_reviews': totals["profane"],
+            'unscored_reviews': max(0, totals["reviews"] - sum(sentiment_counts.values())),
+        },
+        'banned_customers': list_banned_customers(ddb, stats_table),
+    }
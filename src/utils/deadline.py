@@ -0,0 +1,56 @@
+import json
+import os
+import time
+
+# Lambda configuration: time (ms) kept free at the end of an invocation;
+# records that might not finish before it are handed to a new invocation
+HANDOFF_MARGIN_MS_ENV = "HANDOFF_MARGIN_MS"
+DEFAULT_HANDOFF_MARGIN_MS = 5000
+
+
+class DeadlineGuard:
+    """
+    Decides between records whether an invocation should stop and hand the
+    rest of its batch off.
+
+    should_hand_off() is called before each record. It measures how long
+    the previous records took and answers True once the remaining time no
+    longer covers the slowest record so far plus *margin_ms*. It never
+    answers True before the first record, so every invocation makes
+    progress.
+    """
+
+    def __init__(self, context, margin_ms=DEFAULT_HANDOFF_MARGIN_MS):
+        self.context = context
+        self.margin_ms = margin_ms
+        self.slowest_ms = 0.0
+        self._last = None
+
+    @classmethod
+    def from_env(cls, context):
+        return cls(context, float(os.getenv(HANDOFF_MARGIN_MS_ENV, DEFAULT_HANDOFF_MARGIN_MS)))
+
+    def should_hand_off(self):
+        now = time.monotonic()
+        if self._last is None:
+            self._last = now
+            return False
+        self.slowest_ms = max(self.slowest_ms, (now - self._last) * 1000)
+        self._last = now
+        if self.context is None:
+            return False
+        return self.context.get_remaining_time_in_millis() < self.margin_ms + self.slowest_ms
+
+
+def hand_off(lambda_client, context, event, records):
+    """
+    Re-enqueue *records* of *event* as an asynchronous invocation of the
+    running function. Other event fields (e.g. ``backfill``) are kept, and
+    ``handoff.depth`` counts the chain of hand-offs.
+    """
+    depth = event.get("handoff", {}).get("depth", 0) + 1
+    payload = dict(event, Records=records, handoff={"depth": depth})
+    lambda_client.invoke(FunctionName=context.function_name, InvocationType="Event",
+                         Payload=json.dumps(payload).encode("utf-8"))
+    print(f"Deadline near: handed {len(records)} records off to {context.function_name} (depth {depth})")
+    return {"status": "handed_off", "processed": len(event["Records"]) - len(records), "handedOff": len(records)}
@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+
+# Polarity histogram: equal-width bins over [-1, 1]
+HISTOGRAM_BINS = 10
+
+# Separator of the parts of a composite group key ("overall,sentiment" -> "5.0|positive")
+KEY_SEPARATOR = "|"
+
+
+def _month(review, sentiment):
+    timestamp = review.get('unixReviewTime')
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime("%Y-%m")
+
+
+def _rating_class(overall):
+    if overall is None:
+        return None
+    if overall >= 4:
+        return 'positive'
+    if overall <= 2:
+        return 'negative'
+    return 'neutral'
+
+
+def _agreement(review, sentiment):
+    rating = _rating_class(review.get('overall'))
+    if rating is None:
+        return None
+    return 'agree' if rating == sentiment else 'disagree'
+
+
+# Group-by keys: name -> function(review, sentiment_class) returning the group value
+GROUP_KEYS = {
+    'asin': lambda review, sentiment: review.get('asin'),
+    'overall': lambda review, sentiment: review.get('overall'),
+    'month': _month,
+    'sentiment': lambda review, sentiment: sentiment,
+    'rating_class': lambda review, sentiment: _rating_class(review.get('overall')),
+    'agreement': _agreement,
+}
+
+
+def parse_group_by(specs):
+    """
+    Normalise ``--group-by`` values such as ``["asin", "overall,sentiment"]``
+    into spec names; a comma-separated spec groups by the combination.
+    """
+    parsed = []
+    for spec in specs or []:
+        keys = [key.strip() for key in spec.split(",") if key.strip()]
+        unknown = [key for key in keys if key not in GROUP_KEYS]
+        if not keys or unknown:
+            raise ValueError(f"unknown group-by key(s) {unknown or spec!r}; choose from {', '.join(GROUP_KEYS)}")
+        name = ",".join(keys)
+        if name not in parsed:
+            parsed.append(name)
+    return parsed
+
+
+class GroupByAggregator:
+    """
+    Streaming hash aggregation of per-review results over several group-by specs.
+
+    Each group holds ``[count, polarity_sum, profane_count, *histogram]``;
+    mean polarity and profanity rate are derived when reporting, so two
+    partial aggregators (e.g. from parallel workers) merge by adding.
+    """
+
+    def __init__(self, specs, bins=HISTOGRAM_BINS):
+        self.specs = list(specs)
+        self.bins = bins
+        self._getters = {spec: [GROUP_KEYS[key] for key in spec.split(",")] for spec in self.specs}
+        self.groups = {spec: {} for spec in self.specs}
+
+    def _bin(self, polarity):
+        return min(max(int((polarity + 1) / 2 * self.bins), 0), self.bins - 1)
+
+    def add(self, review, polarity, sentiment, is_profane):
+        """Fold one review's results into every configured group."""
+        histogram_cell = 3 + self._bin(polarity)
+        for spec, getters in self._getters.items():
+            key = KEY_SEPARATOR.join(str(getter(review, sentiment)) for getter in getters)
+            group = self.groups[spec].get(key)
+            if group is None:
+                group = self.groups[spec][key] = [0, 0.0, 0] + [0] * self.bins
+            group[0] += 1
+            group[1] += polarity
+            if is_profane:
+                group[2] += 1
+            group[histogram_cell] += 1
+
+    def merge(self, other):
+        """Add the partial aggregates of *other* (same specs and bins) into this one."""
+        if other.specs != self.specs or other.bins != self.bins:
+            raise ValueError("cannot merge group-by aggregates with different specs or bins")
+        for spec, groups in other.groups.items():
+            mine = self.groups[spec]
+            for key, values in groups.items():
+                group = mine.get(key)
+                if group is None:
+                    mine[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        group[i] += value
+        return self
+
+    def rows(self, spec):
+        """Report rows of *spec*: key, count, mean polarity, profanity rate and histogram."""
+        for key, group in self.groups[spec].items():
+            count = group[0]
+            yield {
+                'key': key,
+                'count': count,
+                'mean_polarity': group[1] / count,
+                'profanity_rate': group[2] / count,
+                'histogram': group[3:],
+            }
+
+    def to_dict(self):
+        return {'specs': self.specs, 'bins': self.bins, 'groups': self.groups}
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregator = cls(data['specs'], data['bins'])
+        aggregator.groups = {spec: {key: list(values) for key, values in groups.items()}
+                             for spec, groups in data['groups'].items()}
+        return aggregator
@@ -0,0 +1,268 @@
+import bz2
+import gzip
+import json
+import lzma
+import mmap
+import os
+import queue
+import re
+import threading
+from json.decoder import scanstring
+
+# Fields the analyzer actually reads (asin and unixReviewTime for group-by)
+REQUIRED_FIELDS = ("reviewerID", "reviewText", "summary", "overall", "asin", "unixReviewTime")
+
+# Compressed inputs are recognised by their magic bytes, not the file name
+COMPRESSION_FORMATS = (
+    (b"\x1f\x8b", "gzip", gzip.open),
+    (b"BZh", "bz2", bz2.open),
+    (b"\xfd7zXZ\x00", "xz", lzma.open),
+)
+
+# Decompressed bytes per batch handed from the decompression thread to the parser
+BATCH_BYTES = 1 << 20
+
+
+def detect_compression(file_path):
+    """Name of the compression format of *file_path* ("gzip", "bz2", "xz") or None."""
+    with open(file_path, "rb") as f:
+        head = f.read(6)
+    for magic, name, _ in COMPRESSION_FORMATS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_input(file_path):
+    """Open *file_path* for binary reading, transparently decompressing it."""
+    with open(file_path, "rb") as f:
+        head = f.read(6)
+    for magic, _, opener in COMPRESSION_FORMATS:
+        if head.startswith(magic):
+            return opener(file_path, "rb")
+    return open(file_path, "rb")
+
+
+def chunk_offsets(file_path, chunks, start=0):
+    """
+    Split ``file_path[start:]`` into at most *chunks* ``(start, end)`` byte ranges.
+
+    Boundaries are placed at the first line start after each even split
+    point, found with a single ``find`` per boundary, so no pre-scan of
+    the file is needed.
+    """
+    size = os.path.getsize(file_path)
+    if size <= start:
+        return []
+    if chunks <= 1:
+        return [(start, size)]
+
+    span = size - start
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = [start]
+        for i in range(1, chunks):
+            newline = mm.find(b"\n", max(start + span * i // chunks, bounds[-1]))
+            if newline == -1:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+        bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+_NUMBER_RE = re.compile(rb"\s*(-?[0-9][0-9.eE+\-]*)")
+
+
+class _SlowPath(Exception):
+    """The fast path cannot decode this line; parse it in full."""
+
+
+def _string_end(buf, pos, end):
+    """Index of the quote closing the JSON string whose contents start at *pos*."""
+    while True:
+        quote = buf.find(b'"', pos, end)
+        if quote == -1:
+            raise _SlowPath("unterminated string")
+        backslashes = 0
+        while buf[quote - 1 - backslashes] == 0x5C:  # an escaped quote has an odd run of backslashes
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return quote
+        pos = quote + 1
+
+
+def parse_fields(buf, start, end, keys):
+    """
+    Extract the requested fields from the JSON object line ``buf[start:end]``.
+
+    The line is never copied or decoded as a whole: each ``"field":`` key
+    is located with ``find`` on *buf* itself (an ``mmap`` or ``bytes``) and
+    only the bytes of its value are sliced out and decoded (escaped strings
+    through the C ``scanstring`` of the json module). A key can only match
+    outside string values: inside a string every quote is escaped, so
+    ``"field":`` cannot occur there. It could match inside a nested object
+    (e.g. ``"style": {"summary": ...}``), so lines with more than one
+    ``{`` take the slow path; ``json.loads`` is quicker there than
+    tracking the nesting here.
+    """
+    opening = buf.find(b"{", start, end)
+    if buf.find(b"{", opening + 1, end) != -1:
+        raise _SlowPath("nested object")
+    record = {}
+    for field, key in keys:
+        idx = buf.find(key, start, end)
+        if idx == -1:
+            if buf.find(key[:-1], start, end) != -1:  # e.g. '"field" :' – unusual spacing
+                raise _SlowPath(field)
+            continue
+        pos = idx + len(key)
+        while buf[pos] == 0x20:
+            pos += 1
+        if buf[pos] == 0x22:
+            close = _string_end(buf, pos + 1, end)
+            value = buf[pos + 1:close].decode("utf-8")
+            record[field] = scanstring(value + '"', 0)[0] if "\\" in value else value
+        else:
+            number = _NUMBER_RE.match(buf, pos, end)
+            if number is None:
+                raise _SlowPath(field)
+            text = number.group(1)
+            record[field] = float(text) if b"." in text or b"e" in text or b"E" in text else int(text)
+    return record
+
+
+def scan_buffer(buf, start=0, end=None, fields=REQUIRED_FIELDS, base=0):
+    """
+    Yield ``(record, end_offset)`` for the JSON lines in ``buf[start:end]``.
+
+    *buf* is anything with a bytes-like ``find`` and slicing (an ``mmap``
+    or ``bytes``); offsets are reported relative to *base*. Lines are
+    parsed in place by parse_fields(); only lines that need the slow path
+    are copied out and decoded whole.
+    """
+    end = len(buf) if end is None else end
+    keys = [(field, json.dumps(field).encode("utf-8") + b":") for field in fields]
+
+    pos = start
+    while pos < end:
+        newline = buf.find(b"\n", pos, end)
+        line_end = end if newline == -1 else newline
+        next_pos = line_end + 1 if newline != -1 else end
+
+        if buf.find(b"{", pos, line_end) != -1:
+            try:
+                record = parse_fields(buf, pos, line_end, keys)
+            except (_SlowPath, ValueError, IndexError):
+                full = json.loads(buf[pos:line_end].decode("utf-8"))
+                record = {field: full[field] for field in fields if field in full}
+            yield record, base + next_pos
+        pos = next_pos
+
+
+def scan_reviews(file_path, start=0, end=None, fields=REQUIRED_FIELDS):
+    """
+    Memory-mapped JSONL reader yielding ``(record, end_offset)``.
+
+    Lines are located with ``mmap.find`` on the mapped file and parsed in
+    place: only the bytes of the requested *fields* are copied out and
+    decoded, so unused, possibly large fields are never copied or parsed.
+    Records are dicts holding just those fields. Lines the fast path
+    cannot handle fall back to a full ``json.loads``.
+    *start* must be a line start (see chunk_offsets); *end_offset* is the
+    byte just past each line, usable as a resume position.
+
+    Compressed files are read through scan_compressed; their offsets
+    count decompressed bytes.
+    """
+    if detect_compression(file_path):
+        yield from scan_compressed(file_path, start, end, fields)
+        return
+
+    size = os.path.getsize(file_path)
+    end = size if end is None else min(end, size)
+    if start >= end:
+        return
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield from scan_buffer(mm, start, end, fields)
+
+
+def line_batches(file_path, start=0, batch_bytes=BATCH_BYTES):
+    """
+    Decompress *file_path* into ``(offset, data)`` batches of whole lines.
+
+    *offset* is the decompressed byte offset of ``data``; batches before
+    *start* (a line start in the decompressed stream) are skipped.
+    """
+    offset = 0
+    pending = b""
+    with open_input(file_path) as stream:
+        while True:
+            block = stream.read(batch_bytes)
+            data = pending + block
+            cut = data.rfind(b"\n") + 1 if block else len(data)
+            data, pending = data[:cut], data[cut:]
+            if data and offset + len(data) > start:
+                skip = max(start - offset, 0)
+                yield offset + skip, data[skip:]
+            offset += len(data)
+            if not block:
+                return
+
+
+def prefetch(iterable, depth=4):
+    """
+    Run *iterable* in a background thread, buffering up to *depth* items.
+
+    Used to overlap decompression (zlib, bz2 and lzma release the GIL)
+    with parsing and scoring. Exceptions are re-raised in the consumer;
+    closing the generator early stops the producer.
+    """
+    items = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        """Queue *item* unless the consumer has stopped; False if it has."""
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="decompress", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def scan_compressed(file_path, start=0, end=None, fields=REQUIRED_FIELDS):
+    """
+    scan_reviews for compressed files: a decompression thread feeds line
+    batches through a bounded queue while the caller parses and scores.
+    """
+    for offset, data in prefetch(line_batches(file_path, start)):
+        if end is not None and offset >= end:
+            return
+        stop = None if end is None else min(len(data), end - offset)
+        yield from scan_buffer(data, 0, stop, fields, base=offset)
@@ -0,0 +1,149 @@
+import hashlib
+import operator
+from array import array
+
+# MinHash / LSH parameters: 16 bands of 4 rows make reviews with a
+# Jaccard similarity of ~0.5 and above LSH candidates; candidates are then
+# confirmed against the signature-estimated similarity THRESHOLD.
+NUM_PERM = 64
+BANDS = 16
+THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+# Shorter reviews ("Great product") are too generic to call duplicates
+MIN_TOKENS = 5
+
+
+def shingles(tokens, size=SHINGLE_SIZE):
+    """Set of *size*-word shingles of *tokens*."""
+    if len(tokens) < size:
+        size = len(tokens)
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures with *num_perm* 32-bit hash functions.
+
+    One SHAKE-128 call per shingle yields all *num_perm* hash values at
+    once, and the signature is their element-wise minimum, which keeps the
+    per-value work in C instead of one Python expression per function.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        self.num_perm = num_perm
+        self._seed = seed.to_bytes(8, "little")
+
+    def signature(self, shingle_set):
+        """Signature (``array('I')``) of a non-empty set of shingles."""
+        size = 4 * self.num_perm
+        rows = [array("I", hashlib.shake_128(self._seed + shingle.encode("utf-8")).digest(size))
+                for shingle in shingle_set]
+        return array("I", map(min, *rows)) if len(rows) > 1 else rows[0]
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1, grown one element at a time."""
+
+    def __init__(self):
+        self.parent = array("I")
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]  # path halving
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)  # the earliest review stays the root
+
+
+class NearDuplicateIndex:
+    """
+    Online near-duplicate detection over lemma token lists.
+
+    Each indexed review gets a MinHash signature which is split into LSH
+    bands; reviews sharing a band bucket are candidates and are confirmed
+    when their estimated Jaccard similarity reaches *threshold*. Confirmed
+    pairs are joined into clusters with union-find. Work per review is
+    constant, so a corpus is processed in linear time instead of comparing
+    all pairs.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD, min_tokens=MIN_TOKENS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_tokens = min_tokens
+        self.signatures = array("I")
+        self.labels = []
+        self.clusters = UnionFind()
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _similarity(self, signature, other):
+        start = other * self.num_perm
+        stored = self.signatures[start:start + self.num_perm]
+        return sum(map(operator.eq, signature, stored)) / self.num_perm
+
+    def add(self, tokens, label=None):
+        """
+        Index one review's tokens; *label* (e.g. its reviewerID) is kept for
+        reporting. Returns True if the review is a near-duplicate of an
+        earlier one. Reviews shorter than *min_tokens* are not indexed.
+        """
+        if len(tokens) < self.min_tokens:
+            return False
+        signature = self.hasher.signature(shingles(tokens))
+        item = self.clusters.add()
+        self.signatures.extend(signature)
+        self.labels.append(label)
+
+        duplicate = False
+        checked = {item}
+        rows = self.rows
+        for band, buckets in enumerate(self._buckets):
+            key = signature[band * rows:(band + 1) * rows].tobytes()
+            first = buckets.setdefault(key, item)
+            if first not in checked:
+                checked.add(first)
+                if self._similarity(signature, first) >= self.threshold:
+                    self.clusters.union(first, item)
+                    duplicate = True
+        return duplicate
+
+    def groups(self):
+        """Clusters with more than one review, as lists of review indexes."""
+        members = {}
+        for item in range(len(self.labels)):
+            members.setdefault(self.clusters.find(item), []).append(item)
+        return [items for items in members.values() if len(items) > 1]
+
+    def summary(self, top=5, sample=5):
+        """Cluster statistics for the results file."""
+        groups = sorted(self.groups(), key=len, reverse=True)
+        return {
+            'indexed_reviews': len(self.labels),
+            'clusters': len(groups),
+            'clustered_reviews': sum(len(items) for items in groups),
+            'largest_clusters': [
+                {
+                    'size': len(items),
+                    'distinct_reviewers': len({self.labels[i] for i in items}),
+                    'reviewers': sorted({self.labels[i] for i in items})[:sample],
+                }
+                for items in groups[:top]
+            ],
+        }
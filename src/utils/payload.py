@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+
+from .banned_filter import BANNED_REVIEW_FIELD
+from .tracing import TRACE_FIELD
+from .vocab import TOKEN_VOCAB_FIELD
+
+# Lambda configuration: which review fields travel between stages
+# ("full", "slim" or a comma-separated field list) and whether objects
+# written to the intermediate buckets are gzipped
+PAYLOAD_SCHEMA_ENV = "PAYLOAD_SCHEMA"
+PAYLOAD_GZIP_ENV = "PAYLOAD_GZIP"
+
+# The fields profanity_check and sentiment_analysis read
+SLIM_FIELDS = ("customerId", "reviewId", "reviewText")
+# Pipeline bookkeeping, kept whatever the schema
+CONTROL_FIELDS = (TRACE_FIELD, BANNED_REVIEW_FIELD, TOKEN_VOCAB_FIELD)
+
+GZIP_ENCODING = "gzip"
+
+
+class PayloadCodec:
+    """
+    Writes reviews to the next stage's bucket.
+
+    With a field list, only those fields (plus CONTROL_FIELDS) are written;
+    None keeps the whole review, including the preprocessing token lists.
+    With *compress*, intermediate objects are gzipped and marked with
+    ``ContentEncoding: gzip``; the final bucket is always plain JSON.
+    Reading needs no configuration: decode_review() follows the object's
+    ContentEncoding.
+    """
+
+    def __init__(self, fields=None, compress=False):
+        self.fields = None if fields is None else frozenset(fields) | frozenset(CONTROL_FIELDS)
+        self.compress = compress
+
+    @classmethod
+    def from_env(cls):
+        schema = os.getenv(PAYLOAD_SCHEMA_ENV, "full").strip()
+        if schema == "full":
+            fields = None
+        elif schema == "slim":
+            fields = SLIM_FIELDS
+        else:
+            fields = [name.strip() for name in schema.split(",") if name.strip()]
+        return cls(fields, os.getenv(PAYLOAD_GZIP_ENV, "0") == "1")
+
+    def project(self, review):
+        if self.fields is None:
+            return review
+        return {name: value for name, value in review.items() if name in self.fields}
+
+    def encode(self, review, final=False):
+        """``put_object`` arguments (Body, ContentType, ContentEncoding) for *review*."""
+        body = json.dumps(self.project(review)).encode("utf-8")
+        kwargs = {"ContentType": "application/json"}
+        if self.compress and not final:
+            body = gzip.compress(body, mtime=0)
+            kwargs["ContentEncoding"] = GZIP_ENCODING
+        kwargs["Body"] = body
+        return kwargs
+
+
+def decode_review(obj):
+    """The review in a ``get_object`` response, gzipped or not."""
+    body = obj["Body"].read()
+    if obj.get("ContentEncoding") == GZIP_ENCODING:
+        body = gzip.decompress(body)
+    return json.loads(body)
@@ -0,0 +1,192 @@
+import math
+import random
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch: approximate ranks and quantiles of a stream in
+    O(k) memory, mergeable across workers.
+
+    Items live in a hierarchy of compactors; an item at level h stands for
+    2**h stream items. A full compactor sorts itself and promotes every
+    other item (random offset) to the next level. Rank error is about
+    ``1.7 / k`` of the stream length.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self._random = random.Random()
+        self._refresh()
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _refresh(self):
+        self._size = sum(len(items) for items in self.compactors)
+        self._max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        while self._size >= self._max_size:
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    items.sort()
+                    # An odd item out stays at this level
+                    keep = [items.pop()] if len(items) % 2 else []
+                    self.compactors[level + 1].extend(items[self._random.getrandbits(1)::2])
+                    self.compactors[level] = keep
+                    self._refresh()
+                    break
+
+    def merge(self, other):
+        """Fold *other* into this sketch."""
+        if other.k != self.k:
+            raise ValueError("cannot merge KLL sketches of different k")
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._refresh()
+        self._compress()
+        return self
+
+    def _weighted(self):
+        return sorted((value, 1 << level)
+                      for level, items in enumerate(self.compactors) for value in items)
+
+    def rank(self, value):
+        """Approximate fraction of the stream that is <= *value*."""
+        if not self.n:
+            return 0.0
+        weight = sum(len([item for item in items if item <= value]) << level
+                     for level, items in enumerate(self.compactors))
+        return weight / self.n
+
+    def quantiles(self, fractions):
+        """Approximate values at each of *fractions* (0..1), e.g. ``[0.5, 0.99]``."""
+        if not self.n:
+            return [None for _ in fractions]
+        weighted = self._weighted()
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for fraction in fractions:
+            target = fraction * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            results.append(value)
+        return results
+
+    def quantile(self, fraction):
+        return self.quantiles([fraction])[0]
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.compactors = [list(items) for items in data["compactors"]]
+        sketch._refresh()
+        return sketch
+
+
+class PolarityHistogram:
+    """
+    Fixed-bin histogram of polarities in [-1, 1] for exact re-bucketing.
+
+    Bin edges are ``i / resolution``. Positive bins are right-closed
+    ``(a, b]``, negative bins left-closed ``[a, b)``, and exactly 0 has a
+    bin of its own. So for any threshold that is a bin edge (0.1, 0.05,
+    0.25 … with the default resolution of 100) the number of polarities
+    ``> t`` or ``< -t`` is exact, matching classify_sentiment's strict
+    comparisons.
+    """
+
+    def __init__(self, resolution=100):
+        self.resolution = resolution
+        self.negative = [0] * resolution  # negative[i] counts [-(i+1)/r, -i/r)
+        self.zero = 0
+        self.positive = [0] * resolution  # positive[i] counts (i/r, (i+1)/r]
+
+    def _index(self, magnitude):
+        """Index i with i/r < magnitude <= (i+1)/r, compared against the edge floats themselves."""
+        r = self.resolution
+        i = min(max(math.ceil(magnitude * r) - 1, 0), r - 1)
+        while i > 0 and magnitude <= i / r:
+            i -= 1
+        while i < r - 1 and magnitude > (i + 1) / r:
+            i += 1
+        return i
+
+    def add(self, polarity, count=1):
+        if polarity > 0:
+            self.positive[self._index(polarity)] += count
+        elif polarity < 0:
+            self.negative[self._index(-polarity)] += count
+        else:
+            self.zero += count
+
+    @property
+    def total(self):
+        return sum(self.negative) + self.zero + sum(self.positive)
+
+    def _edge(self, magnitude):
+        """Index of the bin edge equal to *magnitude* (0..1)."""
+        i = round(magnitude * self.resolution)
+        if not 0 <= i <= self.resolution or i / self.resolution != magnitude:
+            raise ValueError(f"{magnitude} is not a bin edge (multiples of 1/{self.resolution} in [0, 1])")
+        return i
+
+    def count_above(self, threshold):
+        """Number of polarities > *threshold* (a bin edge >= 0)."""
+        return sum(self.positive[self._edge(threshold):])
+
+    def count_below(self, threshold):
+        """Number of polarities < *threshold* (a bin edge <= 0)."""
+        return sum(self.negative[self._edge(-threshold):])
+
+    def classify_counts(self, positive_threshold, negative_threshold):
+        """Sentiment counts classify_sentiment would give under other thresholds."""
+        positive = self.count_above(positive_threshold)
+        negative = self.count_below(negative_threshold)
+        return {
+            'positive': positive,
+            'neutral': self.total - positive - negative,
+            'negative': negative,
+        }
+
+    def merge(self, other):
+        if other.resolution != self.resolution:
+            raise ValueError("cannot merge histograms of different resolution")
+        self.negative = [a + b for a, b in zip(self.negative, other.negative)]
+        self.positive = [a + b for a, b in zip(self.positive, other.positive)]
+        self.zero += other.zero
+        return self
+
+    def to_dict(self):
+        return {"resolution": self.resolution, "negative": self.negative,
+                "zero": self.zero, "positive": self.positive}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["resolution"])
+        histogram.negative = list(data["negative"])
+        histogram.zero = data["zero"]
+        histogram.positive = list(data["positive"])
+        return histogram
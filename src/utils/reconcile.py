@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+
+from .ddb_report import parallel_scan, DEFAULT_SEGMENTS
+from .jsonl_scanner import prefetch
+
+# Pipeline buckets in stage order; every object keeps its key across stages
+STAGE_BUCKETS = ["reviews-input", "reviews-preprocessed", "reviews-checked", "reviews-processed"]
+# The function that moves an object from each bucket to the next
+STAGE_FUNCTIONS = ["preprocessing", "profanity_check", "sentiment_analysis"]
+
+
+def listing_pages(s3, bucket, page_size=1000):
+    """Yield the ``(key, last_modified)`` pairs of *bucket* one listing page at a time, in key order."""
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, PaginationConfig={"PageSize": page_size}):
+        yield [(obj["Key"], obj["LastModified"]) for obj in page.get("Contents", [])]
+
+
+def parallel_listings(s3, buckets, page_size=1000, depth=4):
+    """
+    One sorted ``(key, last_modified)`` stream per bucket, each listed by its
+    own thread at most *depth* pages ahead of the consumer.
+    """
+    def stream(bucket):
+        for page in prefetch(listing_pages(s3, bucket, page_size), depth):
+            yield from page
+    return [stream(bucket) for bucket in buckets]
+
+
+def merge_listings(streams):
+    """
+    Sorted merge-join of key-ordered streams: yields ``(key, present)`` for
+    every key in any stream, where ``present[i]`` is the LastModified of the
+    key in stream *i* (or None). Memory is one head entry per stream.
+    """
+    heads = [next(stream, None) for stream in streams]
+    while True:
+        live = [head[0] for head in heads if head is not None]
+        if not live:
+            return
+        key = min(live)
+        present = [None] * len(streams)
+        for i, head in enumerate(heads):
+            if head is not None and head[0] == key:
+                present[i] = head[1]
+                heads[i] = next(streams[i], None)
+        yield key, present
+
+
+def _age_seconds(last_modified, now):
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return (now - last_modified).total_seconds()
+
+
+def reconcile_buckets(s3, buckets=STAGE_BUCKETS, stages=STAGE_FUNCTIONS, page_size=1000, sample=5, now=None):
+    """
+    Diff the stage buckets key by key. An object in bucket *i* but not in
+    bucket *i + 1* is in the backlog of ``stages[i]``; its age is taken from
+    the upstream object's LastModified. Returns per-stage backlog counts,
+    oldest ages and sample keys, plus the object count per bucket.
+    """
+    now = now or datetime.now(timezone.utc)
+    report = {
+        "objects": {bucket: 0 for bucket in buckets},
+        "stages": [{"stage": stage, "from": buckets[i], "to": buckets[i + 1], "backlog": 0,
+                    "oldest_age_seconds": None, "oldest_key": None, "sample": []}
+                   for i, stage in enumerate(stages)],
+    }
+    for key, present in merge_listings(parallel_listings(s3, buckets, page_size)):
+        for bucket, last_modified in zip(buckets, present):
+            if last_modified is not None:
+                report["objects"][bucket] += 1
+        for i, entry in enumerate(report["stages"]):
+            if present[i] is None or present[i + 1] is not None:
+                continue
+            entry["backlog"] += 1
+            if len(entry["sample"]) < sample:
+                entry["sample"].append(key)
+            age = _age_seconds(present[i], now)
+            if entry["oldest_age_seconds"] is None or age > entry["oldest_age_seconds"]:
+                entry["oldest_age_seconds"], entry["oldest_key"] = age, key
+    return report
+
+
+def _fold_metadata(totals, item):
+    counts = totals.counts
+    counts["rows"] += 1
+    if "isUnpolite" not in item:
+        counts["missing_isUnpolite"] += 1
+    if "sentiment" not in item:
+        counts["missing_sentiment"] += 1
+
+
+def metadata_gaps(ddb, review_table, segments=DEFAULT_SEGMENTS):
+    """Rows of *review_table* and how many lack ``isUnpolite`` / ``sentiment``."""
+    counts = parallel_scan(ddb, review_table, _fold_metadata, segments,
+                           ProjectionExpression="isUnpolite, sentiment").counts
+    return {name: counts[name] for name in ("rows", "missing_isUnpolite", "missing_sentiment")}
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Bump when a scorer changes so cached results of the old one are not reused
+CACHE_VERSION = "1"
+
+# Lambda configuration: in-process entries per warm container (0 disables
+# the cache) and whether misses go through the DynamoDB table as well
+CACHE_SIZE_ENV = "RESULT_CACHE_SIZE"
+CACHE_PERSIST_ENV = "RESULT_CACHE_PERSIST"
+DEFAULT_LAMBDA_CACHE_SIZE = 10000
+
+# SSM parameter holding the name of the persistent cache table
+CACHE_TABLE_PARAM = "/dic2025/a3/table/score_cache"
+
+
+def normalize_text(text):
+    """Lower-case, whitespace-collapsed form of *text*; every scorer sees the same tokens in both."""
+    return " ".join((text or "").lower().split())
+
+
+def text_key(text):
+    """Content hash of the normalized *text* (and cache version)."""
+    data = f"{CACHE_VERSION}\n{normalize_text(text)}".encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _to_attribute(value):
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    return {"N": repr(float(value))}
+
+
+def _from_attribute(attribute):
+    if "BOOL" in attribute:
+        return attribute["BOOL"]
+    return float(attribute["N"])
+
+
+class ResultCache:
+    """
+    Content-addressed cache of per-text scoring results.
+
+    Entries are keyed by text_key() and hold one value per scorer field
+    (e.g. ``polarity``, ``isUnpolite``). The in-process tier is an LRU of
+    at most *maxsize* texts; with a DynamoDB *table* attached, misses are
+    looked up there and computed results are written back, so warm
+    containers share results.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.persistent = False
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._ddb = None
+        self._table = None
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by RESULT_CACHE_SIZE / RESULT_CACHE_PERSIST, or None if disabled."""
+        maxsize = int(os.getenv(CACHE_SIZE_ENV, DEFAULT_LAMBDA_CACHE_SIZE))
+        persistent = os.getenv(CACHE_PERSIST_ENV, "0").lower() in ("1", "true", "yes")
+        if not maxsize and not persistent:
+            return None
+        cache = cls(maxsize)
+        cache.persistent = persistent
+        return cache
+
+    def attach(self, ddb, table):
+        """Use the DynamoDB *table* (hash key ``textHash``) as the shared tier."""
+        self._ddb = ddb
+        self._table = table
+
+    # ------------------------------------------------------------------
+    # In-process LRU tier
+    # ------------------------------------------------------------------
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put_local(self, key, fields):
+        if not self.maxsize:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = dict(fields)
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            else:
+                entry.update(fields)
+                self._entries.move_to_end(key)
+
+    # ------------------------------------------------------------------
+    # DynamoDB tier
+    # ------------------------------------------------------------------
+    def _get_remote(self, key, field):
+        if self._table is None:
+            return None
+        try:
+            response = self._ddb.get_item(TableName=self._table, Key={"textHash": {"S": key}},
+                                          ProjectionExpression="#f", ExpressionAttributeNames={"#f": field})
+        except Exception as e:
+            print(f"Result cache lookup failed: {e}")
+            return None
+        attribute = response.get("Item", {}).get(field)
+        return None if attribute is None else _from_attribute(attribute)
+
+    def _put_remote(self, key, field, value):
+        if self._table is None:
+            return
+        try:
+            self._ddb.update_item(TableName=self._table, Key={"textHash": {"S": key}},
+                                  UpdateExpression="SET #f = :v",
+                                  ExpressionAttributeNames={"#f": field},
+                                  ExpressionAttributeValues={":v": _to_attribute(value)})
+        except Exception as e:
+            print(f"Result cache write failed: {e}")
+
+    # ------------------------------------------------------------------
+    def get(self, text, field, key=None):
+        """Cached *field* result for *text*, or None."""
+        key = key or text_key(text)
+        entry = self._get_local(key)
+        if entry is not None and field in entry:
+            self.hits += 1
+            return entry[field]
+        value = self._get_remote(key, field)
+        if value is not None:
+            self.hits += 1
+            self._put_local(key, {field: value})
+            return value
+        self.misses += 1
+        return None
+
+    def put(self, text, field, value, key=None):
+        key = key or text_key(text)
+        self._put_local(key, {field: value})
+        self._put_remote(key, field, value)
+
+    def get_or_compute(self, text, field, compute, refresh=False):
+        """
+        *field* result for *text*: from the cache on a hit, else ``compute()``
+        (and cached). With *refresh* the result is always recomputed.
+        """
+        key = text_key(text)
+        value = None if refresh else self.get(text, field, key)
+        if value is None:
+            value = compute()
+            self.put(text, field, value, key)
+        return value
+
+    def stats_line(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"Result cache: {self.hits}/{lookups} hits ({rate:.1f}%), {len(self._entries)} entries"
@@ -0,0 +1,157 @@
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, HTTPClientError
+
+# Error codes worth retrying: the service asked us to slow down ...
+THROTTLING_CODES = {
+    "ThrottlingException", "Throttling", "ThrottledException", "RequestThrottled",
+    "RequestThrottledException", "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded", "TooManyRequestsException", "SlowDown",
+}
+# ... or failed on its side
+TRANSIENT_CODES = {
+    "InternalServerError", "InternalError", "InternalFailure", "ServiceUnavailable",
+    "ServiceUnavailableException", "RequestTimeout", "RequestTimeoutException",
+}
+
+# Lambda configuration
+RETRY_MAX_ATTEMPTS_ENV = "RETRY_MAX_ATTEMPTS"
+RETRY_BASE_DELAY_MS_ENV = "RETRY_BASE_DELAY_MS"
+
+# botocore client config without the SDK's own retries, so that only the
+# RetryPolicy decides (and counts) when a call is attempted again
+NO_SDK_RETRIES = Config(retries={"total_max_attempts": 1, "mode": "standard"})
+
+# Client methods that are not API calls and are passed through unwrapped
+_PASSTHROUGH = {"get_paginator", "get_waiter", "can_paginate", "close", "generate_presigned_url"}
+
+
+def classify(error):
+    """``"throttle"``, ``"transient"`` or ``"fatal"`` for an exception raised by a client call."""
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        if code in THROTTLING_CODES or status == 429:
+            return "throttle"
+        if code in TRANSIENT_CODES or status >= 500:
+            return "transient"
+        return "fatal"
+    if isinstance(error, (BotocoreConnectionError, HTTPClientError)):
+        return "transient"
+    return "fatal"
+
+
+class RetryBudgetExceeded(Exception):
+    """A retryable call did not succeed within the attempts or time left."""
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for throttled and transient errors.
+
+    Attempt *n* (from 0) that fails with a retryable error sleeps a uniform
+    random time in ``[0, min(max_delay, base_delay * 2**n))`` before the next
+    one. Fatal errors are raised at once. With a deadline set by start(),
+    a retry whose sleep would end within *safety_ms* of it is not made, so
+    the handler keeps enough time to fail cleanly. Counts of attempts,
+    retries and give-ups are kept per invocation (reset by start() and
+    reported by stats_line()) and for the container's lifetime in ``metrics``.
+    """
+
+    def __init__(self, max_attempts=8, base_delay=0.05, max_delay=5.0, safety_ms=1000, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.safety_ms = safety_ms
+        self.metrics = Counter()
+        self._sleep = sleep
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Policy configured by RETRY_MAX_ATTEMPTS / RETRY_BASE_DELAY_MS."""
+        return cls(max_attempts=int(os.getenv(RETRY_MAX_ATTEMPTS_ENV, 8)),
+                   base_delay=float(os.getenv(RETRY_BASE_DELAY_MS_ENV, 50)) / 1000.0)
+
+    def start(self, context):
+        """
+        Begin an invocation on this thread: tie the retry budget to its
+        remaining time (None: no deadline) and reset its counts.
+        """
+        remaining = context.get_remaining_time_in_millis() if context is not None else None
+        self._local.deadline = None if remaining is None else time.monotonic() + remaining / 1000.0
+        self._local.metrics = Counter()
+
+    @property
+    def invocation_metrics(self):
+        """Counts since this thread's last start()."""
+        metrics = getattr(self._local, "metrics", None)
+        if metrics is None:
+            metrics = self._local.metrics = Counter()
+        return metrics
+
+    def _count(self, *names):
+        invocation = self.invocation_metrics
+        with self._lock:
+            for name in names:
+                self.metrics[name] += 1
+                invocation[name] += 1
+
+    def call(self, operation, fn, *args, **kwargs):
+        """``fn(*args, **kwargs)``, retried per the policy; *operation* names it in the metrics."""
+        deadline = getattr(self._local, "deadline", None)
+        attempt = 0
+        while True:
+            self._count("attempts")
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if kind == "fatal":
+                    raise
+                attempt += 1
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                if attempt >= self.max_attempts:
+                    self._count("gave_up")
+                    raise RetryBudgetExceeded(f"{operation}: {attempt} attempts failed ({kind}): {e}") from e
+                if deadline is not None and time.monotonic() + delay > deadline - self.safety_ms / 1000.0:
+                    self._count("gave_up")
+                    raise RetryBudgetExceeded(f"{operation}: no time left to retry ({kind}): {e}") from e
+                self._count("retries", kind, f"retries:{operation}")
+                self._sleep(delay)
+
+    def stats_line(self):
+        """Retry counts of this thread's current invocation."""
+        m = self.invocation_metrics
+        per_operation = {name.split(":", 1)[1]: count for name, count in m.items() if name.startswith("retries:")}
+        return (f"Retries: {m['retries']} of {m['attempts']} attempts "
+                f"(throttle={m['throttle']}, transient={m['transient']}, gave up={m['gave_up']}) {per_operation}")
+
+
+class RetryingClient:
+    """
+    boto3 client proxy whose API calls go through a RetryPolicy.
+
+    Anything that is not an API method (``meta``, ``exceptions``,
+    paginators, waiters) is the wrapped client's own.
+    """
+
+    def __init__(self, client, policy):
+        self._client = client
+        self._policy = policy
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name in _PASSTHROUGH or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self._policy.call(name, attr, *args, **kwargs)
+        call.__name__ = name
+        return call
@@ -1,14 +1,41 @@
+import argparse
 import json
 import sys
 import os
-from collections import defaultdict, Counter
+from multiprocessing import Pool
+from collections import defaultdict, deque, Counter
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from utils.text_preprocessing import preprocess
 from utils.profanity import contains_bad_words
-from utils.sentiment import analyze_sentiment
+from utils.sentiment import analyze_sentiment, classify_sentiment
+from utils.review_details import ReviewDetails
+from utils.columnar_output import ColumnarWriter
+from utils.sketches import HeavyHitterSketch, count_min_width
+from utils.group_by import GroupByAggregator, parse_group_by
+from utils.quantiles import KLLSketch, PolarityHistogram
+from utils.near_duplicates import NearDuplicateIndex
+from utils.result_cache import ResultCache
+from utils.jsonl_scanner import (
+    scan_reviews, scan_buffer, chunk_offsets, detect_compression, line_batches, prefetch
+)
+from utils.checkpoint import (
+    SourceChangedError, save_json_atomic, load_json,
+    source_key, source_entry, resume_offset
+)
+
+# Polarity percentiles reported from the quantile sketch
+POLARITY_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# Profane reviews after which a customer is banned
+BAN_THRESHOLD = 3
+
+# --approximate sketch sizing: profane reviews the Count-Min sketch is sized
+# for and the overcount allowed at that stream length
+DEFAULT_EXPECTED_PROFANE = 100000
+DEFAULT_SKETCH_ERROR = 1.0
 
 def load_reviews(file_path):
     """Load reviews from JSONL file."""
@@ -20,60 +47,271 @@ def load_reviews(file_path):
                 reviews.append(json.loads(line))
     return reviews
 
-def classify_sentiment(polarity):
-    """Classify sentiment based on polarity score."""
-    if polarity > 0.1:
-        return 'positive'
-    elif polarity < -0.1:
-        return 'negative'
-    else:
-        return 'neutral'
+def iter_reviews(file_path, start_offset=0, end_offset=None):
+    """
+    Stream reviews from a JSONL file starting at byte *start_offset*.
 
-def analyze_reviews(reviews):
-    """Analyze all reviews and return statistics."""
-    stats = {
-        'total_reviews': len(reviews),
+    Yields ``(review, end_offset)`` where *end_offset* is the byte offset
+    just past the review's line, i.e. where a resumed run would continue.
+    Reviews carry only the fields the analysis reads (see jsonl_scanner).
+    gzip, bz2 and xz files are decompressed on the fly; their offsets
+    count decompressed bytes.
+    """
+    return scan_reviews(file_path, start_offset, end_offset)
+
+def new_stats(keep_details=True, approximate=False, group_by=None, near_duplicates=False, dedupe=False,
+              cache_size=0, sketch_size=None):
+    """
+    Empty analysis statistics.
+
+    With *approximate*, per-customer profanity counts are tracked in a
+    fixed-size HeavyHitterSketch (``stats['customer_sketch']``) instead of
+    an exact dict; confirm_heavy_hitters() later fills in exact counts
+    for the ban candidates and top customers only. *sketch_size* holds
+    the sketch's ``width``, ``depth`` and ``capacity`` (see
+    HeavyHitterSketch.for_stream()). *group_by* specs (see
+    utils.group_by) add per-group aggregates in ``stats['groups']``.
+    *near_duplicates* clusters near-duplicate reviews with MinHash/LSH
+    (``stats['near_duplicates']``); with *dedupe* a review that duplicates
+    an earlier one is not scored or counted, so each cluster counts once.
+    With *cache_size*, scoring results of identical texts are reused from
+    an LRU ResultCache (``stats['result_cache']``).
+    """
+    return {
+        'total_reviews': 0,
         'sentiment_counts': Counter(),
         'profane_reviews': 0,
         'customer_profanity_count': defaultdict(int),
         'banned_customers': set(),
-        'review_details': []
+        'customer_sketch': HeavyHitterSketch(**(sketch_size or {})) if approximate else None,
+        'groups': GroupByAggregator(group_by) if group_by else None,
+        'polarity_sketch': KLLSketch(),
+        'polarity_histogram': PolarityHistogram(),
+        'near_duplicates': NearDuplicateIndex() if near_duplicates or dedupe else None,
+        'dedupe': dedupe,
+        'duplicate_reviews': 0,
+        'result_cache': ResultCache(cache_size) if cache_size else None,
+        'review_details': ReviewDetails() if keep_details else None
+    }
+
+def stats_options(stats):
+    """The new_stats() options *stats* was created with, e.g. to set up worker stats."""
+    return {
+        'approximate': stats['customer_sketch'] is not None,
+        'sketch_size': stats['customer_sketch'].dimensions() if stats['customer_sketch'] is not None else None,
+        'group_by': stats['groups'].specs if stats['groups'] is not None else None,
+        'cache_size': stats['result_cache'].maxsize if stats['result_cache'] is not None else 0
     }
+
+def cached(cache, text, field, compute):
+    """``compute()`` the *field* result for *text*, through *cache* if there is one."""
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(text, field, compute)
+
+def is_profane_text(text, cache=None, tokens=None):
+    """Check one text for profanity (tokenize before checking)."""
+    return cached(cache, text, 'profaneLemmas',
+                  lambda: contains_bad_words(tokens if tokens is not None else preprocess(text.lower())))
+
+def is_profane_review(review_text, summary, cache=None):
+    """Check the review text and summary for profanity."""
+    return is_profane_text(review_text, cache) or is_profane_text(summary, cache)
+
+def analyze_review(stats, review, writer=None):
+    """Score one review and fold it into *stats*."""
+    reviewer_id = review.get('reviewerID', 'unknown')
+    review_text = review.get('reviewText', '')
+    summary = review.get('summary', '')
+    overall = review.get('overall', 0)
     
-    for review in reviews:
-        reviewer_id = review.get('reviewerID', 'unknown')
-        review_text = review.get('reviewText', '')
-        summary = review.get('summary', '')
-        overall = review.get('overall', 0)
-        
-        # Analyze sentiment
-        sentiment_polarity = analyze_sentiment(review_text)
-        sentiment_class = classify_sentiment(sentiment_polarity)
-        stats['sentiment_counts'][sentiment_class] += 1
-        
-        # Check for profanity (tokenize before checking)
+    cache = stats['result_cache']
+    
+    # Near-duplicate detection works on the review lemmas
+    tokens_review = None
+    if stats['near_duplicates'] is not None:
         tokens_review = preprocess(review_text.lower())
-        tokens_summary = preprocess(summary.lower())
-        is_profane = contains_bad_words(tokens_review) or contains_bad_words(tokens_summary)
-        if is_profane:
-            stats['profane_reviews'] += 1
+        if stats['near_duplicates'].add(tokens_review, reviewer_id):
+            stats['duplicate_reviews'] += 1
+            if stats['dedupe']:
+                return
+    stats['total_reviews'] += 1
+    
+    # Analyze sentiment (cache hits skip all text processing)
+    sentiment_polarity = cached(cache, review_text, 'polarity', lambda: analyze_sentiment(review_text))
+    sentiment_class = classify_sentiment(sentiment_polarity)
+    stats['sentiment_counts'][sentiment_class] += 1
+    stats['polarity_sketch'].update(sentiment_polarity)
+    stats['polarity_histogram'].add(sentiment_polarity)
+    
+    # Check for profanity
+    is_profane = is_profane_text(review_text, cache, tokens_review) or is_profane_text(summary, cache)
+    if is_profane:
+        stats['profane_reviews'] += 1
+        if stats['customer_sketch'] is not None:
+            stats['customer_sketch'].add(reviewer_id)
+        else:
             stats['customer_profanity_count'][reviewer_id] += 1
-        
-        # Check if customer should be banned (>3 profane reviews)
-        if stats['customer_profanity_count'][reviewer_id] > 3:
-            stats['banned_customers'].add(reviewer_id)
-        
-        # Store review details for potential further analysis
-        stats['review_details'].append({
-            'reviewerID': reviewer_id,
-            'sentiment': sentiment_class,
-            'polarity': sentiment_polarity,
-            'is_profane': is_profane,
-            'overall': overall
-        })
+            # Check if customer should be banned (>3 profane reviews)
+            if stats['customer_profanity_count'][reviewer_id] > BAN_THRESHOLD:
+                stats['banned_customers'].add(reviewer_id)
+    
+    if stats['groups'] is not None:
+        stats['groups'].add(review, sentiment_polarity, sentiment_class, is_profane)
+    
+    # Store review details for potential further analysis
+    if stats['review_details'] is not None:
+        stats['review_details'].append(reviewer_id, sentiment_class, sentiment_polarity, is_profane, overall)
+    if writer is not None:
+        writer.append(reviewer_id, sentiment_class, sentiment_polarity, is_profane, overall)
+
+def analyze_reviews(reviews, keep_details=True, writer=None, stats=None):
+    """
+    Analyze all reviews and return statistics.
+
+    Per-review results are kept in ``stats['review_details']`` as a compact
+    ReviewDetails column store; pass ``keep_details=False`` to skip them
+    entirely (``stats['review_details']`` is then None). If *writer* (a
+    ColumnarWriter) is given, every review's results are also streamed to it.
+    Pass previous *stats* to continue an earlier analysis.
+    """
+    if stats is None:
+        stats = new_stats(keep_details)
+    
+    for review in reviews:
+        analyze_review(stats, review, writer)
     
     return stats
 
+def merge_stats(stats, other):
+    """Fold the aggregate statistics of *other* (e.g. a worker's) into *stats*."""
+    stats['total_reviews'] += other['total_reviews']
+    stats['sentiment_counts'].update(other['sentiment_counts'])
+    stats['profane_reviews'] += other['profane_reviews']
+    if stats['customer_sketch'] is not None:
+        stats['customer_sketch'].merge(other['customer_sketch'])
+    if stats['groups'] is not None:
+        stats['groups'].merge(other['groups'])
+    stats['polarity_sketch'].merge(other['polarity_sketch'])
+    stats['polarity_histogram'].merge(other['polarity_histogram'])
+    counts = stats['customer_profanity_count']
+    for reviewer_id, count in other['customer_profanity_count'].items():
+        counts[reviewer_id] += count
+        if counts[reviewer_id] > BAN_THRESHOLD:
+            stats['banned_customers'].add(reviewer_id)
+    return stats
+
+def analyze_chunk(task):
+    """Worker: analyze the byte range ``(file_path, start, end, options)`` and return its results document."""
+    file_path, start, end, options = task
+    stats = new_stats(keep_details=False, **options)
+    for review, _ in iter_reviews(file_path, start, end):
+        analyze_review(stats, review)
+    return results_from_stats(stats)
+
+def analyze_batch(task):
+    """Worker: analyze ``(data, options)``, a batch of decompressed JSONL lines, and return its results document."""
+    data, options = task
+    stats = new_stats(keep_details=False, **options)
+    for review, _ in scan_buffer(data):
+        analyze_review(stats, review)
+    return results_from_stats(stats)
+
+def polarity_percentiles(stats, percentiles=POLARITY_PERCENTILES):
+    """Approximate polarity percentiles from the quantile sketch, e.g. ``{'p50': 0.0}``."""
+    values = stats['polarity_sketch'].quantiles([p / 100 for p in percentiles])
+    return {f"p{p}": value for p, value in zip(percentiles, values)}
+
+def results_from_stats(stats, sources=None):
+    """The analysis_results.json document for *stats*."""
+    results = {
+        'summary': {
+            'total_reviews': stats['total_reviews'],
+            'sentiment_counts': dict(stats['sentiment_counts']),
+            'profane_reviews': stats['profane_reviews'],
+            'banned_customers_count': len(stats['banned_customers'])
+        },
+        'banned_customers': list(stats['banned_customers']),
+        'customer_profanity_counts': dict(stats['customer_profanity_count'])
+    }
+    if stats['customer_sketch'] is not None:
+        # Exact counts are only known for the confirmed candidates
+        results['summary']['approximate'] = True
+        results['customer_sketch'] = stats['customer_sketch'].to_dict()
+    if stats['groups'] is not None:
+        results['groups'] = stats['groups'].to_dict()
+    if stats['near_duplicates'] is not None:
+        results['summary']['duplicate_reviews'] = stats['duplicate_reviews']
+        results['summary']['deduplicated'] = stats['dedupe']
+        results['near_duplicates'] = stats['near_duplicates'].summary()
+    results['polarity'] = {
+        'percentiles': polarity_percentiles(stats),
+        'histogram': stats['polarity_histogram'].to_dict(),
+        'sketch': stats['polarity_sketch'].to_dict()
+    }
+    if sources is not None:
+        results['sources'] = sources
+    return results
+
+def stats_from_results(results):
+    """Rebuild aggregate statistics from a saved analysis_results.json document."""
+    stats = new_stats(keep_details=False)
+    if 'customer_sketch' in results:
+        stats['customer_sketch'] = HeavyHitterSketch.from_dict(results['customer_sketch'])
+    if 'groups' in results:
+        stats['groups'] = GroupByAggregator.from_dict(results['groups'])
+    if 'polarity' in results:
+        stats['polarity_sketch'] = KLLSketch.from_dict(results['polarity']['sketch'])
+        stats['polarity_histogram'] = PolarityHistogram.from_dict(results['polarity']['histogram'])
+    summary = results['summary']
+    stats['total_reviews'] = summary['total_reviews']
+    stats['sentiment_counts'].update(summary['sentiment_counts'])
+    stats['profane_reviews'] = summary['profane_reviews']
+    stats['customer_profanity_count'].update(results['customer_profanity_counts'])
+    stats['banned_customers'].update(results['banned_customers'])
+    return stats
+
+def confirm_heavy_hitters(stats, sources, top_k=5):
+    """
+    Second pass of an approximate analysis: exact profanity counts for the
+    candidates only.
+
+    Candidates are the sketch's *top_k* heavy hitters and every customer
+    whose Count-Min estimate exceeds BAN_THRESHOLD; as the estimate never
+    undercounts, no banned customer is missed. The estimate exceeds the
+    true count by more than ``error_bound() = e * profane / width`` with
+    probability at most ``exp(-depth)``, so a customer with at most
+    ``BAN_THRESHOLD - error_bound()`` profane reviews is a candidate with
+    at most that probability. With a bound of BAN_THRESHOLD or more (a
+    sketch too narrow for the stream), that guarantee is void and the
+    candidates approach all customers. All analyzed *sources* are re-read
+    up to their recorded offsets, but only the candidates' reviews are
+    checked for profanity again.
+    """
+    sketch = stats['customer_sketch']
+    bound = sketch.cms.error_bound()
+    print(f"   Count-Min overcount bound: {bound:.2f} (width {sketch.cms.width:,}, depth {sketch.cms.depth})")
+    if bound >= BAN_THRESHOLD:
+        print(f"Warning: the sketch is too narrow for {sketch.cms.total:,} profane reviews; "
+              f"raise --expected-profane or --sketch-width to keep the second pass small")
+    top = {reviewer_id for reviewer_id, _ in sketch.top(top_k)}
+    candidates = set()
+    counts = defaultdict(int)
+    for file_path, entry in sources.items():
+        if not os.path.exists(file_path):
+            print(f"Warning: {file_path} no longer exists, its reviews are not confirmed")
+            continue
+        for review, _ in iter_reviews(file_path, 0, entry['offset']):
+            reviewer_id = review.get('reviewerID', 'unknown')
+            if reviewer_id in top or sketch.estimate(reviewer_id) > BAN_THRESHOLD:
+                candidates.add(reviewer_id)
+                if is_profane_review(review.get('reviewText', ''), review.get('summary', ''), stats['result_cache']):
+                    counts[reviewer_id] += 1
+    stats['customer_profanity_count'] = counts
+    stats['banned_customers'] = {reviewer_id for reviewer_id, count in counts.items() if count > BAN_THRESHOLD}
+    print(f"   Confirmed {len(candidates):,} candidates")
+    return stats
+
 def print_analysis(stats):
     """Print formatted analysis results."""
     print("=" * 60)
@@ -86,6 +324,9 @@ def print_analysis(stats):
     print(f"   Positive Reviews: {stats['sentiment_counts']['positive']}")
     print(f"   Neutral Reviews: {stats['sentiment_counts']['neutral']}")
     print(f"   Negative Reviews: {stats['sentiment_counts']['negative']}")
+    if stats['total_reviews']:
+        percentiles = polarity_percentiles(stats)
+        print(f"   Polarity Percentiles: " + ", ".join(f"{name} {value:+.2f}" for name, value in percentiles.items()))
     
     # Profanity analysis
     print(f"\n🚫 PROFANITY ANALYSIS:")
@@ -94,7 +335,10 @@ def print_analysis(stats):
     
     # Customer analysis
     print(f"\n👥 CUSTOMER ANALYSIS:")
-    print(f"   Customers with Profane Reviews: {len(stats['customer_profanity_count'])}")
+    if stats['customer_sketch'] is not None:
+        print(f"   Customers with Profane Reviews: ~{stats['customer_sketch'].distinct_count()} (approximate)")
+    else:
+        print(f"   Customers with Profane Reviews: {len(stats['customer_profanity_count'])}")
     print(f"   Banned Customers: {len(stats['banned_customers'])}")
     
     if stats['banned_customers']:
@@ -111,39 +355,232 @@ def print_analysis(stats):
         for customer_id, count in top_customers:
             status = "BANNED" if customer_id in stats['banned_customers'] else "Active"
             print(f"   - {customer_id}: {count} profane reviews ({status})")
+    
+    if stats['groups'] is not None:
+        print_groups(stats['groups'])
+    
+    if stats['near_duplicates'] is not None:
+        clusters = stats['near_duplicates'].summary()
+        print(f"\n🧬 NEAR-DUPLICATE REVIEWS:")
+        print(f"   Duplicate Reviews: {stats['duplicate_reviews']}"
+              f" ({'not counted' if stats['dedupe'] else 'counted'} in the statistics above)")
+        print(f"   Clusters: {clusters['clusters']} ({clusters['clustered_reviews']} reviews)")
+        for cluster in clusters['largest_clusters']:
+            print(f"   - {cluster['size']} reviews by {cluster['distinct_reviewers']} reviewers "
+                  f"(e.g. {', '.join(cluster['reviewers'])})")
+
+def print_groups(groups, limit=12):
+    """Print the group-by aggregates (small groupings in key order, large ones by count)."""
+    for spec in groups.specs:
+        rows = list(groups.rows(spec))
+        if len(rows) <= limit:
+            rows.sort(key=lambda row: row['key'])
+        else:
+            rows = sorted(rows, key=lambda row: row['count'], reverse=True)[:limit]
+        print(f"\n🗂️  BY {spec.upper()} ({len(groups.groups[spec])} groups):")
+        for row in rows:
+            print(f"   - {row['key']}: {row['count']} reviews, "
+                  f"mean polarity {row['mean_polarity']:+.3f}, "
+                  f"profanity {row['profanity_rate'] * 100:.1f}%")
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze reviews for sentiment, profanity and banned customers")
+    parser.add_argument("--input", default="data/reviews_devset.json", help="JSONL review file")
+    parser.add_argument("--output", default="data/analysis_results.json", help="summary JSON output file")
+    parser.add_argument("--columns", metavar="DIR",
+                        help="also write per-review results as memory-mappable column files to DIR")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, metavar="N",
+                        help="save a checkpoint every N reviews (0 disables)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--incremental", action="store_true",
+                        help="merge into the existing output, analyzing only reviews not seen before")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="analyze byte-range chunks of the input in N processes")
+    parser.add_argument("--approximate", action="store_true",
+                        help="track per-customer profanity counts in fixed-size sketches; "
+                             "ban candidates are confirmed exactly in a second pass")
+    parser.add_argument("--expected-profane", type=int, default=DEFAULT_EXPECTED_PROFANE, metavar="N",
+                        help="profane reviews the --approximate Count-Min sketch is sized for")
+    parser.add_argument("--sketch-error", type=float, default=DEFAULT_SKETCH_ERROR, metavar="E",
+                        help="overcount of a customer's profane reviews allowed after --expected-profane "
+                             "(the sketch width is e * N / E)")
+    parser.add_argument("--sketch-width", type=int, metavar="W",
+                        help="Count-Min width (default: sized from --expected-profane and --sketch-error)")
+    parser.add_argument("--sketch-depth", type=int, default=4, choices=range(1, 5), metavar="D",
+                        help="Count-Min rows, 1-4; an estimate exceeds the bound with probability exp(-D)")
+    parser.add_argument("--sketch-capacity", type=int, default=1000, metavar="K",
+                        help="Space-Saving counters; customers with more than 1/K of the profane reviews "
+                             "are always among the top customers")
+    parser.add_argument("--group-by", action="append", metavar="KEYS",
+                        help="also aggregate per group of KEYS (asin, overall, month, sentiment, rating_class, "
+                             "agreement; comma-separate keys to combine them); may be repeated")
+    parser.add_argument("--near-duplicates", action="store_true",
+                        help="cluster near-duplicate reviews (MinHash/LSH over review lemmas)")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="count each near-duplicate cluster once (implies --near-duplicates)")
+    parser.add_argument("--cache-size", type=int, default=100000, metavar="N",
+                        help="reuse scoring results of identical texts from an LRU cache of N texts (0 disables)")
+    args = parser.parse_args(argv)
+    args.near_duplicates = args.near_duplicates or args.dedupe
+    if args.near_duplicates and (args.workers > 1 or args.resume or args.incremental or args.approximate):
+        parser.error("--near-duplicates/--dedupe keep one index over the whole input and cannot be combined "
+                     "with --workers, --resume, --incremental or --approximate")
+    try:
+        args.group_by = parse_group_by(args.group_by)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers > 1 and args.columns:
+        parser.error("--columns requires a single worker (rows are written in input order)")
+    if args.expected_profane < 1 or args.sketch_error <= 0 or args.sketch_capacity < 1 or \
+            (args.sketch_width is not None and args.sketch_width < 1):
+        parser.error("--expected-profane, --sketch-error, --sketch-width and --sketch-capacity must be positive")
+    args.sketch_size = {
+        'width': args.sketch_width or count_min_width(args.expected_profane, args.sketch_error),
+        'depth': args.sketch_depth,
+        'capacity': args.sketch_capacity
+    }
+    return args
+
+def analyze_parallel(file_path, offset, stats, workers, checkpoint, checkpoint_every=0):
+    """
+    Analyze ``file_path[offset:]`` in *workers* processes, merging into *stats*.
+
+    Plain files are split into several byte ranges per worker without a
+    pre-scan. Compressed files are decompressed in a background thread
+    whose line batches are handed to the workers; at most two tasks per
+    worker are in flight, so decompression never runs far ahead.
+    Results are merged in file order, so *checkpoint(end_offset)* is
+    called after about every *checkpoint_every* reviews. Returns the
+    final offset.
+    """
+    options = stats_options(stats)
+    if detect_compression(file_path):
+        worker = analyze_batch
+        tasks = (((data, options), start + len(data))
+                 for start, data in prefetch(line_batches(file_path, offset)))
+    else:
+        worker = analyze_chunk
+        tasks = (((file_path, start, end, options), end)
+                 for start, end in chunk_offsets(file_path, workers * 4, start=offset))
+
+    checkpointed = stats['total_reviews']
+    pending = deque()
+
+    def merge_next():
+        nonlocal checkpointed
+        result, end = pending.popleft()
+        merge_stats(stats, stats_from_results(result.get()))
+        if checkpoint_every and stats['total_reviews'] - checkpointed >= checkpoint_every:
+            checkpoint(end)
+            checkpointed = stats['total_reviews']
+        return end
+
+    with Pool(workers) as pool:
+        for task, end in tasks:
+            pending.append((pool.apply_async(worker, (task,)), end))
+            if len(pending) > workers * 2:
+                offset = merge_next()
+        while pending:
+            offset = merge_next()
+    return offset
+
+def load_state(args):
+    """Previous state to continue from: the checkpoint, the last results, or nothing."""
+    if args.resume and os.path.exists(args.checkpoint):
+        print(f"Resuming from checkpoint: {args.checkpoint}")
+        return load_json(args.checkpoint)
+    if args.resume:
+        print(f"No checkpoint found at {args.checkpoint}, starting a new analysis")
+    if args.incremental and os.path.exists(args.output):
+        print(f"Merging with previous results: {args.output}")
+        return load_json(args.output)
+    return None
+
+def main(argv=None):
     """Main function to run the analysis."""
-    file_path = "data/reviews_devset.json"
+    args = parse_args(argv)
+    file_path = args.input
+    args.checkpoint = args.checkpoint or f"{args.output}.checkpoint"
     
     if not os.path.exists(file_path):
         print(f"Error: File {file_path} not found!")
         sys.exit(1)
     
-    print("Loading reviews...")
-    reviews = load_reviews(file_path)
-    print(f"Loaded {len(reviews)} reviews")
+    state = load_state(args)
+    if state and ('customer_sketch' in state) != args.approximate:
+        print("Error: --approximate must match the mode of the run being continued")
+        sys.exit(1)
+    if state and (state.get('groups') or {}).get('specs', []) != args.group_by:
+        print("Error: --group-by must match the groups of the run being continued")
+        sys.exit(1)
+    stats = stats_from_results(state) if state else new_stats(keep_details=False, approximate=args.approximate,
+                                                                group_by=args.group_by,
+                                                                near_duplicates=args.near_duplicates,
+                                                                dedupe=args.dedupe,
+                                                                sketch_size=args.sketch_size)
+    stats['result_cache'] = ResultCache(args.cache_size) if args.cache_size else None
+    if args.near_duplicates:
+        # The near-duplicate index is not checkpointed, so a checkpoint could not be resumed
+        args.checkpoint_every = 0
+    sources = state.get('sources', {}) if state else {}
+    try:
+        offset = resume_offset(sources, file_path)
+    except SourceChangedError as e:
+        print(f"Error: cannot continue previous analysis: {e}")
+        sys.exit(1)
+    
+    writer = None
+    if args.columns:
+        previous = (state or {}).get('columns') or {}
+        resume_rows = previous.get('rows') if previous.get('dir') == args.columns else None
+        writer = ColumnarWriter(args.columns, resume_rows=resume_rows)
+    
+    def snapshot(end_offset):
+        sources[source_key(file_path)] = source_entry(file_path, end_offset)
+        results = results_from_stats(stats, sources)
+        if writer is not None:
+            writer.flush()
+            results['columns'] = {'dir': args.columns, 'rows': writer.rows}
+        return results
     
-    print("Analyzing reviews...")
-    stats = analyze_reviews(reviews)
+    print(f"Analyzing reviews from {file_path} (starting at byte {offset:,})...")
+    analyzed = stats['total_reviews']
+    try:
+        if args.workers > 1:
+            offset = analyze_parallel(file_path, offset, stats, args.workers,
+                                      lambda end: save_json_atomic(args.checkpoint, snapshot(end)),
+                                      args.checkpoint_every)
+        else:
+            for review, offset in iter_reviews(file_path, offset):
+                analyze_review(stats, review, writer)
+                if args.checkpoint_every and (stats['total_reviews'] - analyzed) % args.checkpoint_every == 0:
+                    save_json_atomic(args.checkpoint, snapshot(offset))
+        if args.approximate:
+            sources[source_key(file_path)] = source_entry(file_path, offset)
+            print("Confirming ban candidates with an exact second pass...")
+            confirm_heavy_hitters(stats, sources)
+        results = snapshot(offset)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"Analyzed {stats['total_reviews'] - analyzed} new reviews")
+    if stats['result_cache'] is not None and stats['result_cache'].hits + stats['result_cache'].misses:
+        print(stats['result_cache'].stats_line())
     
     print_analysis(stats)
     
     # Save detailed results to file
-    output_file = "data/analysis_results.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'summary': {
-                'total_reviews': stats['total_reviews'],
-                'sentiment_counts': dict(stats['sentiment_counts']),
-                'profane_reviews': stats['profane_reviews'],
-                'banned_customers_count': len(stats['banned_customers'])
-            },
-            'banned_customers': list(stats['banned_customers']),
-            'customer_profanity_counts': dict(stats['customer_profanity_count'])
-        }, f, indent=2)
+    output_file = args.output
+    save_json_atomic(output_file, results)
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
     
     print(f"\n💾 Detailed results saved to: {output_file}")
+    if args.columns:
+        print(f"💾 Per-review columns saved to: {args.columns}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,89 @@
+import sys
+from array import array
+
+# Small-int codes of the sentiment classes (index = code)
+SENTIMENT_CLASSES = ("positive", "neutral", "negative")
+SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENT_CLASSES)}
+
+
+class ReviewDetails:
+    """
+    Columnar, array-backed store of per-review analysis results.
+
+    Replaces a list of five-key dicts (~600 bytes per review) with typed
+    columns (~14 bytes per review plus one entry per distinct customer):
+
+    - ``polarity`` / ``overall``: ``array('f')``
+    - ``sentiment``: ``array('B')`` of codes into SENTIMENT_CLASSES
+    - ``is_profane``: a bitset in a ``bytearray``
+    - ``reviewerID``: ``array('I')`` of indexes into a table of interned IDs
+
+    Rows are materialised as dicts only when accessed.
+    """
+
+    def __init__(self):
+        self.polarity = array("f")
+        self.overall = array("f")
+        self.sentiment = array("B")
+        self.reviewer = array("I")
+        self._profane_bits = bytearray()
+        self._reviewer_ids = []
+        self._reviewer_index = {}
+
+    def __len__(self):
+        return len(self.polarity)
+
+    def append(self, reviewer_id, sentiment, polarity, is_profane, overall):
+        """Add one review's results."""
+        row = len(self.polarity)
+
+        # IDs are stored as str, so look them up as str (e.g. 123 and "123" are one reviewer)
+        reviewer_id = str(reviewer_id)
+        index = self._reviewer_index.get(reviewer_id)
+        if index is None:
+            index = len(self._reviewer_ids)
+            reviewer_id = sys.intern(reviewer_id)
+            self._reviewer_ids.append(reviewer_id)
+            self._reviewer_index[reviewer_id] = index
+        self.reviewer.append(index)
+
+        self.polarity.append(polarity)
+        self.overall.append(overall or 0)
+        self.sentiment.append(SENTIMENT_CODES[sentiment])
+
+        if row % 8 == 0:
+            self._profane_bits.append(0)
+        if is_profane:
+            self._profane_bits[row >> 3] |= 1 << (row & 7)
+
+    # ------------------------------------------------------------------
+    # Column access
+    # ------------------------------------------------------------------
+    def is_profane(self, row):
+        return bool(self._profane_bits[row >> 3] & (1 << (row & 7)))
+
+    def reviewer_id(self, row):
+        return self._reviewer_ids[self.reviewer[row]]
+
+    def sentiment_class(self, row):
+        return SENTIMENT_CLASSES[self.sentiment[row]]
+
+    # ------------------------------------------------------------------
+    # Lazy row access (same keys as the former per-review dicts)
+    # ------------------------------------------------------------------
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("review details index out of range")
+        return {
+            "reviewerID": self.reviewer_id(row),
+            "sentiment": self.sentiment_class(row),
+            "polarity": self.polarity[row],
+            "is_profane": self.is_profane(row),
+            "overall": self.overall[row],
+        }
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
@@ -119,6 +119,23 @@ def analyze_sentiment(text: str) -> float:
     norm = score / seen
     return max(-1.0, min(1.0, norm))
 
+# ----------------------------------------------------------------------
+# 4.  Classification (polarity -> sentiment class)
+# ----------------------------------------------------------------------
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+def classify_sentiment(polarity: float,
+                       positive_threshold: float = POSITIVE_THRESHOLD,
+                       negative_threshold: float = NEGATIVE_THRESHOLD) -> str:
+    """Classify sentiment based on polarity score."""
+    if polarity > positive_threshold:
+        return 'positive'
+    elif polarity < negative_threshold:
+        return 'negative'
+    else:
+        return 'neutral'
+
 if __name__ == "__main__":
     print(analyze_sentiment("I love this product!"))
 
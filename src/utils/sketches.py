@@ -0,0 +1,264 @@
+import base64
+import hashlib
+import heapq
+import itertools
+import math
+import operator
+import zlib
+from array import array
+
+
+def _digest(key):
+    """Stable 24-byte hash of *key* (identical in every process, unlike hash())."""
+    return hashlib.blake2b(str(key).encode("utf-8"), digest_size=24).digest()
+
+
+def count_min_width(expected, error=1.0):
+    """
+    Width for which a Count-Min sketch holding *expected* adds overcounts
+    by at most *error* (with probability ``1 - exp(-depth)`` per key).
+    """
+    return max(1, math.ceil(math.e * expected / error))
+
+
+def _pack(data):
+    return base64.b64encode(zlib.compress(bytes(data))).decode("ascii")
+
+
+def _unpack(text):
+    return zlib.decompress(base64.b64decode(text))
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch: approximate per-key counts in fixed memory.
+
+    Estimates never undercount; with ``width`` w they overcount by at most
+    ``e/w`` of the total count with probability ``1 - exp(-depth)``. The
+    width therefore follows from the stream length and the overcount that
+    is acceptable (count_min_width()); a fixed width stops meaning
+    anything once the stream is much longer than it.
+    """
+
+    def __init__(self, width=1 << 17, depth=4):
+        if depth > 4:
+            raise ValueError("depth is limited to 4 rows")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _cells(self, digest):
+        width = self.width
+        for row in range(self.depth):
+            yield row, int.from_bytes(digest[4 * row:4 * row + 4], "little") % width
+
+    def add(self, key, count=1, digest=None):
+        """Add *count* to *key*; returns the new estimate for it."""
+        self.total += count
+        estimate = None
+        for row, cell in self._cells(digest or _digest(key)):
+            value = self.rows[row][cell] + count
+            self.rows[row][cell] = value
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key, digest=None):
+        return min(self.rows[row][cell] for row, cell in self._cells(digest or _digest(key)))
+
+    def error_bound(self):
+        """Overcount ``e * total / width`` that an estimate exceeds with probability at most ``exp(-depth)``."""
+        return math.e * self.total / self.width
+
+    def merge(self, other):
+        """Add the counts of *other* (same width and depth) into this sketch."""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge Count-Min sketches of different dimensions")
+        self.total += other.total
+        self.rows = [array("I", map(operator.add, mine, theirs))
+                     for mine, theirs in zip(self.rows, other.rows)]
+        return self
+
+    def to_dict(self):
+        return {"width": self.width, "depth": self.depth, "total": self.total,
+                "rows": [_pack(row) for row in self.rows]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["width"], data["depth"])
+        sketch.total = data["total"]
+        sketch.rows = [array("I", _unpack(row)) for row in data["rows"]]
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters: the (approximately) most frequent keys
+    tracked in at most *capacity* counters.
+
+    Counts may overestimate by at most the smallest tracked count; any key
+    more frequent than ``total / capacity`` is guaranteed to be tracked.
+
+    The smallest counter is found through a lazy min-heap holding one
+    ``(count, seq, key)`` entry per tracked key. Increments leave the heap
+    alone, so an entry's count may be lower than the key's; an eviction
+    pops entries, re-pushing stale ones with their current count, until
+    the top one is current. An eviction is O(log capacity) amortised
+    instead of a scan of every counter.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self._heap = None  # built on the first eviction
+        self._seq = itertools.count()
+
+    def _build_heap(self):
+        self._heap = [(count, next(self._seq), key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def add(self, key, count=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            if self._heap is not None:
+                heapq.heappush(self._heap, (count, next(self._seq), key))
+        else:
+            # Replace the smallest counter; the newcomer inherits its count
+            if self._heap is None:
+                self._build_heap()
+            heap = self._heap
+            while True:
+                floor, _, victim = heap[0]
+                current = counts[victim]
+                if current == floor:
+                    break
+                heapq.heapreplace(heap, (current, next(self._seq), victim))
+            del counts[victim]
+            counts[key] = floor + count
+            heapq.heapreplace(heap, (floor + count, next(self._seq), key))
+
+    def _floor(self):
+        """Upper bound on the count of any key not tracked."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other):
+        """Combine with *other*, keeping the *capacity* largest counters."""
+        mine, theirs = self._floor(), other._floor()
+        combined = {key: self.counts.get(key, mine) + other.counts.get(key, theirs)
+                    for key in self.counts.keys() | other.counts.keys()}
+        top = sorted(combined.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+        self.counts = dict(top)
+        self._heap = None
+        return self
+
+    def top(self, k):
+        """The *k* keys with the largest counts as ``(key, count)`` pairs."""
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["capacity"])
+        sketch.counts = dict(data["counts"])
+        return sketch
+
+
+class HyperLogLog:
+    """Approximate count of distinct keys (~1% error with the default 2^14 registers)."""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key, digest=None):
+        value = int.from_bytes((digest or _digest(key))[16:24], "little")
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": _pack(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["precision"])
+        sketch.registers = bytearray(_unpack(data["registers"]))
+        return sketch
+
+
+class HeavyHitterSketch:
+    """
+    Mergeable approximate per-key counter: a Count-Min sketch for point
+    estimates, Space-Saving for the top keys and a HyperLogLog for the
+    number of distinct keys. Memory is fixed regardless of key count.
+    """
+
+    def __init__(self, width=1 << 17, depth=4, capacity=1000):
+        self.cms = CountMinSketch(width, depth)
+        self.heavy = SpaceSaving(capacity)
+        self.distinct = HyperLogLog()
+
+    @classmethod
+    def for_stream(cls, expected, error=1.0, depth=4, capacity=1000):
+        """A sketch sized for *expected* adds, overcounting by at most *error* (see CountMinSketch)."""
+        return cls(count_min_width(expected, error), depth, capacity)
+
+    def dimensions(self):
+        """``width``, ``depth`` and ``capacity``, e.g. to create sketches this one can merge."""
+        return {"width": self.cms.width, "depth": self.cms.depth, "capacity": self.heavy.capacity}
+
+    def add(self, key, count=1):
+        digest = _digest(key)
+        self.cms.add(key, count, digest)
+        self.heavy.add(key, count)
+        self.distinct.add(key, digest)
+
+    def estimate(self, key):
+        """Upper bound on the count of *key*."""
+        return self.cms.estimate(key)
+
+    def top(self, k):
+        return self.heavy.top(k)
+
+    def distinct_count(self):
+        return self.distinct.count()
+
+    def merge(self, other):
+        self.cms.merge(other.cms)
+        self.heavy.merge(other.heavy)
+        self.distinct.merge(other.distinct)
+        return self
+
+    def to_dict(self):
+        return {"cms": self.cms.to_dict(), "heavy": self.heavy.to_dict(),
+                "distinct": self.distinct.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls.__new__(cls)
+        sketch.cms = CountMinSketch.from_dict(data["cms"])
+        sketch.heavy = SpaceSaving.from_dict(data["heavy"])
+        sketch.distinct = HyperLogLog.from_dict(data["distinct"])
+        return sketch
@@ -25,5 +25,9 @@ def get_param(name):
             return "review-metadata"
         elif "customer_stats" in name:
             return "customer-stats"
+        elif "score_cache" in name:
+            return "review-score-cache"
+        elif "aggregates" in name:
+            return "review-aggregates"
         else:
             raise e 
\ No newline at end of file
@@ -0,0 +1,119 @@
+import math
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Key under which the trace travels inside the review payload
+TRACE_FIELD = "_trace"
+
+# S3 user-metadata key carrying the trace ID between stages
+TRACE_ID_METADATA = "trace-id"
+
+# Pipeline order (used to derive the per-hop breakdown)
+STAGES = ("preprocessing", "profanity_check", "sentiment_analysis")
+
+
+def now_ms():
+    """Current wall-clock time in epoch milliseconds."""
+    return int(time.time() * 1000)
+
+
+def event_time_ms(record):
+    """Return the S3 event time of *record* in epoch milliseconds (None if missing)."""
+    value = record.get("eventTime") if record else None
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1000)
+
+
+def enter_stage(review, stage, record=None, metadata=None):
+    """
+    Stamp the entry of *stage* on *review* and return its trace.
+
+    The trace ID is taken from the payload, then from the S3 object
+    metadata (so uploaders can supply their own correlation ID), and is
+    generated otherwise.
+    """
+    trace = review.get(TRACE_FIELD)
+    if not isinstance(trace, dict):
+        trace_id = (metadata or {}).get(TRACE_ID_METADATA) or uuid.uuid4().hex
+        trace = {"traceId": trace_id, "stages": {}}
+        review[TRACE_FIELD] = trace
+
+    trace["stages"][stage] = {"enter": now_ms(), "event": event_time_ms(record)}
+    return trace
+
+
+def exit_stage(review, stage):
+    """Stamp the exit of *stage* on *review*."""
+    review[TRACE_FIELD]["stages"][stage]["exit"] = now_ms()
+
+
+def s3_metadata(review):
+    """S3 user metadata (string values only) describing the trace so far."""
+    trace = review.get(TRACE_FIELD)
+    if not trace:
+        return {}
+
+    metadata = {TRACE_ID_METADATA: trace["traceId"]}
+    for stage, stamps in trace["stages"].items():
+        prefix = stage.replace("_", "-")
+        for name in ("enter", "exit"):
+            if stamps.get(name) is not None:
+                metadata[f"{prefix}-{name}"] = str(stamps[name])
+    return metadata
+
+
+def latency_breakdown(trace):
+    """
+    Return ``(total_ms, hops)`` for a completed trace.
+
+    *hops* maps each hop to its latency in milliseconds, in pipeline order:
+    the time spent inside every stage plus the S3 write + notification
+    delay between consecutive stages (``upload->preprocessing`` is the
+    notification delay of the original upload).
+    """
+    stages = trace.get("stages", {})
+    hops = {}
+    previous_exit = None
+    start = None
+
+    for stage in STAGES:
+        stamps = stages.get(stage)
+        if not stamps:
+            previous_exit = None
+            continue
+
+        enter = stamps.get("enter")
+        exit_ = stamps.get("exit")
+
+        if stage == STAGES[0]:
+            if stamps.get("event") is not None:
+                hops[f"upload->{stage}"] = enter - stamps["event"]
+                start = stamps["event"]
+            else:
+                start = enter
+        elif previous_exit is not None:
+            hops[f"{STAGES[STAGES.index(stage) - 1]}->{stage}"] = enter - previous_exit
+
+        if exit_ is not None:
+            hops[stage] = exit_ - enter
+        previous_exit = exit_
+
+    last = stages.get(STAGES[-1], {}).get("exit")
+    total = last - start if start is not None and last is not None else None
+    return total, hops
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
@@ -0,0 +1,108 @@
+import base64
+import os
+import threading
+
+# Lambda configuration: how preprocessing stores the *_clean token lists
+# ("list" of lemma strings, or "vocab" IDs) and which vocabulary it encodes with
+TOKEN_ENCODING_ENV = "TOKEN_ENCODING"
+VOCAB_VERSION_ENV = "VOCAB_VERSION"
+DEFAULT_VOCAB_VERSION = "v1"
+
+# Versioned vocabularies shipped with utils: vocab/<version>.txt, one lemma
+# per line, the line number being its ID. A version is never edited once
+# objects encoded with it may exist; changes go into a new version.
+VOCAB_DIR = os.path.join(os.path.dirname(__file__), "vocab")
+
+# Review field holding the version the *_clean fields were encoded with
+TOKEN_VOCAB_FIELD = "tokenVocab"
+
+
+def pack_varints(numbers):
+    """Unsigned LEB128: 7 bits per byte, high bit set on all but the last byte of a number."""
+    out = bytearray()
+    for n in numbers:
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+    return bytes(out)
+
+
+def unpack_varints(data):
+    numbers, n, shift = [], 0, 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(n)
+            n, shift = 0, 0
+    if shift:
+        raise ValueError("truncated varint")
+    return numbers
+
+
+class Vocabulary:
+    """
+    Encodes token lists as lemma IDs.
+
+    encode() returns ``{"ids": <base64 varints>, "oov": [...]}``. A lemma
+    in the vocabulary is its line number; the *k*-th distinct lemma that is
+    not gets ID ``len(vocabulary) + k`` and is spelled out in ``oov``
+    (omitted when empty). The most frequent lemmas come first in the file,
+    so most IDs take one byte.
+    """
+
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, version, words):
+        self.version = version
+        self.words = list(words)
+        self.ids = {word: i for i, word in enumerate(self.words)}
+
+    @classmethod
+    def load(cls, version=DEFAULT_VOCAB_VERSION):
+        """The vocabulary *version* from VOCAB_DIR (read once per container)."""
+        with cls._lock:
+            vocabulary = cls._loaded.get(version)
+            if vocabulary is None:
+                path = os.path.join(VOCAB_DIR, f"{os.path.basename(version)}.txt")
+                with open(path, encoding="utf-8") as f:
+                    vocabulary = cls(version, [line.strip() for line in f if line.strip()])
+                cls._loaded[version] = vocabulary
+        return vocabulary
+
+    @classmethod
+    def from_env(cls):
+        """The VOCAB_VERSION vocabulary when TOKEN_ENCODING=vocab, else None."""
+        if os.getenv(TOKEN_ENCODING_ENV, "list") != "vocab":
+            return None
+        return cls.load(os.getenv(VOCAB_VERSION_ENV, DEFAULT_VOCAB_VERSION))
+
+    def encode(self, tokens):
+        oov = {}
+        ids = []
+        for token in tokens:
+            token_id = self.ids.get(token)
+            if token_id is None:
+                token_id = len(self.words) + oov.setdefault(token, len(oov))
+            ids.append(token_id)
+        encoded = {"ids": base64.b64encode(pack_varints(ids)).decode("ascii")}
+        if oov:
+            encoded["oov"] = list(oov)
+        return encoded
+
+    def decode(self, encoded):
+        size = len(self.words)
+        oov = encoded.get("oov", [])
+        return [self.words[i] if i < size else oov[i - size]
+                for i in unpack_varints(base64.b64decode(encoded["ids"]))]
+
+
+def clean_tokens(review, field):
+    """The lemma list of ``review[field]`` (e.g. ``reviewText_clean``), however it is stored."""
+    value = review.get(field)
+    if isinstance(value, dict):
+        return Vocabulary.load(review[TOKEN_VOCAB_FIELD]).decode(value)
+    return value or []